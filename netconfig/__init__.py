@@ -1,4 +1,4 @@
-# == Copyright: 2017-2021, CCX Technologies
+# == Copyright: 2017-2026, CCX Technologies
 
 from .__version__ import __version__
 
@@ -6,17 +6,35 @@ from .ethtool import EthTool
 from .iface import Iface
 from .mdio import mdio_read_reg
 from .netlink import monitor_state_change
+from .netlink import StateMonitor
+from .netlink import Subscription
+from .netlink import NetlinkTransport
 from .sysctl import sysctl_read
 from .sysctl import sysctl_write
+from .sysctl import sysctl_read_tree
+from .sysctl import SysctlSession
+from .sysctl import SysctlProfile
 from .aiproute import AIPRoute
+from .aiortnl import AIORtnl
+from .snapshot import RouteTable
+from .snapshot import NeighbourTable
+from .snapshot import LinkStats
+from .snapshot import TcSnapshot
+from .neighbours import NeighbourCache
 from .wgroute import WGRoute
 from .iwroute import IWRoute
 from .route_tables import get_rt_protocol_id
 from .route_tables import get_rt_table_id
+from .route_tables import get_rt_protocol_ids
+from .route_tables import get_rt_table_ids
 from .arpreq import arpreq
 
 __all__ = [
         "__version__", "EthTool", "Iface", "mdio_read_reg",
-        "monitor_state_change", "sysctl_read", "sysctl_write", "AIPRoute",
-        "WGRoute", "IWRoute", "get_rt_protocol_id", "get_rt_table_id", "arpreq"
+        "monitor_state_change", "StateMonitor", "Subscription",
+        "NetlinkTransport", "sysctl_read", "sysctl_write", "sysctl_read_tree",
+        "SysctlSession", "SysctlProfile", "AIPRoute", "AIORtnl", "RouteTable",
+        "NeighbourTable", "NeighbourCache", "LinkStats", "TcSnapshot",
+        "WGRoute", "IWRoute", "get_rt_protocol_id", "get_rt_table_id",
+        "get_rt_protocol_ids", "get_rt_table_ids", "arpreq"
 ]
@@ -0,0 +1,297 @@
+#!/usr/bin/python
+# Copyright: 2026, CCX Technologies
+"""A native asyncio rtnetlink socket.
+
+Requests are written straight to a non-blocking netlink socket driven by
+the event loop, and the replies are matched back to them by sequence
+number, so any number of coroutines can have requests in flight on one
+socket without a thread hop or a lock. Errors are raised as the same
+NetlinkError IPRoute raises.
+"""
+
+import sys
+import time
+import asyncio
+from functools import partial
+
+from pyroute2.netlink.exceptions import NetlinkError
+
+from . import codec
+from . import rtnl
+from .netlink import NetlinkTransport
+
+# =================== from linux headers ========================
+
+RTM_DELLINK = 17
+
+ENOBUFS = 105
+
+# ===============================================================
+
+
+class AIORtnl:
+    """An rtnetlink socket for coroutines.
+
+    The socket is opened, and a task started to read from it, by the
+    first request.
+
+    Args:
+        loop: the event loop, defaults to the current loop
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.seq = 0
+        self.transport = None
+
+        # seq: (future, list of replies)
+        self._requests: dict = {}
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.close()
+
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+        self.transport = NetlinkTransport(loop=loop)
+        self._task = loop.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        self._fail(ConnectionError("Netlink socket is closed"))
+
+    def _fail(self, exc: Exception):
+        requests, self._requests = self._requests, {}
+        for future, _ in requests.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def _handle(self, data: bytes):
+        for msg_type, _, seq, _, offset, end in codec.iter_nlmsg(data):
+            try:
+                future, replies = self._requests[seq]
+            except KeyError:
+                # the request was cancelled
+                continue
+
+            if future.done():
+                continue
+
+            if msg_type == codec.NLMSG_ERROR:
+                code = codec.nlmsg_error(data, offset)
+                if code:
+                    future.set_exception(NetlinkError(code))
+                else:
+                    future.set_result(replies)
+
+            elif msg_type == codec.NLMSG_DONE:
+                future.set_result(replies)
+
+            else:
+                replies.append((msg_type, data, offset, end))
+
+    async def _run(self):
+        while True:
+            try:
+                datagrams = await self.transport.recv()
+            except OSError as exc:
+                if exc.errno == ENOBUFS:
+                    # replies were lost, so fail everything waiting
+                    self.transport.drain()
+                    self._fail(exc)
+                    continue
+
+                self._fail(exc)
+                raise
+
+            for data in datagrams:
+                self._handle(data)
+
+    async def request(
+            self, msg_type: int, payload: bytes, flags: int = rtnl.NLM_F_ACK
+    ) -> list:
+        """Sends a request and waits for the kernel's answer.
+
+        Returns:
+            a list of the replies before the ACK (or NLMSG_DONE for a
+            dump), as tuples of (msg_type, data, payload_offset, msg_end)
+
+        Raises:
+            NetlinkError: if the kernel returned an error
+        """
+
+        self.start()
+
+        self.seq = self.seq % 0xFFFFFFFF + 1
+        seq = self.seq
+
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+        future = loop.create_future()
+        self._requests[seq] = (future, [])
+
+        try:
+            self.transport.send(
+                    codec.pack_nlmsg(
+                            msg_type, rtnl.NLM_F_REQUEST | flags, seq, 0,
+                            payload
+                    )
+            )
+            return await future
+
+        finally:
+            self._requests.pop(seq, None)
+
+    async def get_link(
+            self, index: int = 0, name: str | None = None
+    ) -> dict | None:
+        """Returns an interface from rtnl.parse_link, by index or by name,
+        or None if it doesn't exist."""
+
+        try:
+            replies = await self.request(
+                    rtnl.RTM_GETLINK, rtnl.pack_getlink(index, name)
+            )
+        except NetlinkError:
+            return None
+
+        for msg_type, data, offset, end in replies:
+            if msg_type == rtnl.RTM_NEWLINK:
+                return rtnl.parse_link(data, offset, end)
+
+        return None
+
+    async def set_link(
+            self,
+            index: int,
+            flags: int = 0,
+            change: int = 0,
+            attrs: bytes = b""
+    ) -> None:
+        """Changes an interface's flags (those set in change) and
+        attributes, from packed rtattrs."""
+
+        await self.request(
+                rtnl.RTM_NEWLINK,
+                codec.pack_ifinfomsg(index=index, flags=flags, change=change)
+                + attrs
+        )
+
+    async def delete_link(self, name: str) -> None:
+        await self.request(
+                RTM_DELLINK,
+                codec.pack_ifinfomsg() +
+                codec.pack_string(rtnl.IFLA_IFNAME, name)
+        )
+
+
+async def _benchmark_backend(backend: str, count: int, concurrency: int):
+    from .aiproute import AIPRoute  # pylint: disable=import-outside-toplevel
+
+    aipr = AIPRoute(backend=backend)
+    try:
+        device_id = await aipr.get_id("lo")
+
+        async def worker(calls: int):
+            for _ in range(calls):
+                await aipr.get_up(device_id)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+                *(worker(count // concurrency) for _ in range(concurrency))
+        )
+        return count / (time.perf_counter() - started)
+
+    finally:
+        aipr.close()
+
+
+async def _benchmark_latency(backend: str, count: int, up_ttl: float):
+    from .aiproute import AIPRoute  # pylint: disable=import-outside-toplevel
+
+    aipr = AIPRoute(backend=backend, up_ttl=up_ttl)
+    try:
+        # get_id and get_name are timed without the link cache in front
+        calls = {
+                "get_up": partial(aipr.get_up, 1),
+                "get_name": partial(aipr._run, aipr._get_name, 1),
+                "get_id": partial(aipr._run, aipr._get_id, "lo"),
+        }
+        if up_ttl:
+            calls = {"get_up": calls["get_up"]}
+
+        latency = {}
+        for name, call in calls.items():
+            await call()
+
+            started = time.perf_counter()
+            for _ in range(count):
+                await call()
+            latency[name] = (time.perf_counter() - started) / count
+
+        return latency
+
+    finally:
+        aipr.close()
+
+
+def benchmark(count: int = 20000, concurrency: int = 16) -> dict:
+    """Times AIPRoute.get_up on the loopback interface with each backend.
+
+    Returns:
+        a dictionary of backend: calls per second
+    """
+
+    return {
+            backend: asyncio.run(
+                    _benchmark_backend(backend, count, concurrency)
+            )
+            for backend in ("executor", "native")
+    }
+
+
+def benchmark_latency(count: int = 5000, up_ttl: float = 1.0) -> dict:
+    """Times one call at a time of the link getters on the loopback
+    interface, with each backend and with get_up cached for up_ttl.
+
+    Returns:
+        a dictionary of (backend, getter): seconds per call
+    """
+
+    latency = {}
+    for backend in ("executor", "native"):
+        for ttl in (0.0, up_ttl):
+            for name, seconds in asyncio.run(
+                    _benchmark_latency(backend, count, ttl)
+            ).items():
+                key = f"{backend}, ttl {ttl}s" if ttl else backend
+                latency[(key, name)] = seconds
+
+    return latency
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 20000
+    concurrency = int(argv[2]) if len(argv) > 2 else 16
+
+    for backend, rate in benchmark(count, concurrency).items():
+        print(f"{backend:>8}: {rate:9.0f} get_up/s")
+
+    for (backend, name), seconds in benchmark_latency(count // 4).items():
+        print(f"{backend:>20} {name:>8}: {seconds * 1e6:7.1f}us")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,7 +1,15 @@
-# Copyright: 2020-2025, CCX Technologies
+#!/usr/bin/python
+# Copyright: 2020-2026, CCX Technologies
 
-import asyncio
+import os
+import sys
 import time
+import ctypes
+import socket
+import asyncio
+import random
+import threading
+from collections import Counter
 from functools import partial
 import netaddr
 from pyroute2 import IPRoute  # noqa pylint: disable=no-name-in-module, import-error
@@ -11,69 +19,538 @@ except ImportError:
     IPLinkRequest = dict
 from pyroute2.netlink.exceptions import NetlinkError
 
+from .netlink import LinkCache
+from .netlink import RTM_NEWLINK
+from .netlink import RTM_DELLINK
+from . import codec
+from . import rtnl
+from .rtnl import RtnlSocket
+from .rtnl import DEFAULT_WINDOW
+from .rtnl import diff_addresses
+from .route_tables import get_rt_table_ids
+from .snapshot import RouteTable
+from .snapshot import NeighbourTable
+from .snapshot import LinkStats
+from .snapshot import TcSnapshot
+from .neighbours import NeighbourCache
+from .aiortnl import AIORtnl
+from .route_tables import get_rt_protocol_ids
+
 # =================== from linux headers ========================
 
 IFF_UP = 1 << 0
 IFF_LOWER_UP = 1 << 16
 
+EBADF = 9
+EBUSY = 16
+EEXIST = 17
+ENODEV = 19
+EOPNOTSUPP = 95
+EADDRNOTAVAIL = 99
+
+# ===============================================================
+
+DEFAULT_POOL_SIZE = 4
+CONFIRM_TIMEOUT = 5.0
+
+BACKEND_EXECUTOR = "executor"
+BACKEND_NATIVE = "native"
+BACKENDS = (BACKEND_EXECUTOR, BACKEND_NATIVE)
+
+
+class RetryPolicy():
+    """How to retry a call that fails with a transient netlink error.
+
+    Args:
+        attempts: the total number of attempts
+        delay: seconds to wait before the first retry
+        backoff: multiplier applied to the delay after each retry
+        max_delay: the longest delay between attempts
+        jitter: fraction to randomise each delay by, ie. 0.1 for +/- 10%
+        codes: the netlink error codes to retry on
+    """
+
+    def __init__(
+            self,
+            attempts: int = 10,
+            delay: float = 2.0,
+            backoff: float = 1.0,
+            max_delay: float = 20.0,
+            jitter: float = 0.0,
+            codes: tuple = (EBUSY, )
+    ):
+        self.attempts = attempts
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.codes = codes
+
+    def get_delay(self, retry: int) -> float:
+        delay = min(self.delay * self.backoff**retry, self.max_delay)
+
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+
+        return delay
+
+
+# the getters which use the executor thread's own RtnlSocket, rather than
+# a socket from the pool, so don't need a pool lock
+LINK_GETTERS = {"_get_id", "_get_name", "_get_up"}
+
+# the blocking methods that make cached link state stale, which is
+# forgotten however they're run
+LINK_CHANGES = {
+        "_add_device", "_add_device_id", "_delete_device", "_set_device_name",
+        "_set_up", "_run_routine"
+}
+
+RETRY_POLICIES = {
+        "set_master": RetryPolicy(attempts=10, delay=2.0),
+        "add_device": RetryPolicy(attempts=2, delay=2.0),
+        "set_device_name": RetryPolicy(attempts=2, delay=2.0),
+        "add_route": RetryPolicy(attempts=2, delay=0.25, codes=(EEXIST, )),
+}
+
+# the blocking method that runs each batched call
+BATCH_OPERATIONS = {
+        "get_id": "_get_id",
+        "get_name": "_get_name",
+        "get_up": "_get_up",
+        "get_stats": "_get_stats",
+        "get_arp_cache": "_get_arp_cache",
+        "add_device": "_add_device_id",
+        "delete_device": "_delete_device",
+        "set_master": "_set_master",
+        "set_stp": "_set_stp",
+        "set_address": "_set_address",
+        "sync_addresses": "_sync_addresses",
+        "flush_address": "_flush_address",
+        "replace_address": "_replace_address",
+        "set_mac": "_set_mac",
+        "set_device_name": "_set_device_name",
+        "set_mtu": "_set_mtu",
+        "set_up": "_set_up",
+        "flush_rules": "_flush_rules",
+        "delete_rule": "_delete_rule",
+        "add_rule": "_add_rule",
+        "flush_routes": "_flush_routes",
+        "delete_route": "_delete_route",
+        "add_route": "_add_route",
+        "replace_tc": "_replace_tc",
+        "delete_tc": "_delete_tc",
+        "add_filter_tc": "_add_filter_tc",
+        "run_routine": "_run_routine",
+}
+
+# the coroutine which replaces a blocking method with the native backend,
+# everything else still runs in the executor
+NATIVE_OPERATIONS = {
+        "_get_id": "_aio_get_id",
+        "_get_name": "_aio_get_name",
+        "_get_up": "_aio_get_up",
+        "_delete_device": "_aio_delete_device",
+        "_set_master": "_aio_set_master",
+        "_set_mac": "_aio_set_mac",
+        "_set_mtu": "_aio_set_mtu",
+        "_set_up": "_aio_set_up",
+}
+
+
+class BatchOperation():
+    """A call to run as part of a batch, see AIPRoute.batch.
+
+    Arguments which are themselves a BatchOperation are replaced by that
+    operation's result when the batch runs, ie. to use the device id
+    returned by an earlier add_device.
+
+    Args:
+        name: the AIPRoute method to call, from BATCH_OPERATIONS
+    """
+
+    def __init__(self, name: str, *args, **kwargs):
+        if name not in BATCH_OPERATIONS:
+            raise ValueError(f"{name} can't be batched")
+
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+        self.done = False
+        self.result = None
+        self.error = None
+        self.elapsed = None
+
+    def __repr__(self):
+        return f"<BatchOperation {self.name} {self.args} {self.kwargs}>"
+
+    def resolve(self) -> tuple:
+        """Returns the arguments with earlier results filled in."""
+
+        def _value(arg):
+            return arg.result if isinstance(arg, BatchOperation) else arg
+
+        return (
+                [_value(arg) for arg in self.args],
+                {key: _value(arg) for key, arg in self.kwargs.items()}
+        )
+
+
+class Batch():
+    """Records AIPRoute calls to run together in one executor job.
+
+    Has a method for each entry in BATCH_OPERATIONS, which takes the same
+    arguments as the AIPRoute coroutine and returns the BatchOperation.
+    Used as an async context manager the batch runs on exit, unless the
+    block raised.
+    """
+
+    def __init__(self, aipr):
+        self.aipr = aipr
+        self.operations = []
+
+    def __getattr__(self, name):
+        if name not in BATCH_OPERATIONS:
+            raise AttributeError(name)
+
+        return partial(self.add, name)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *args):
+        if exc_type is None:
+            await self.run()
+
+    def add(self, name: str, *args, **kwargs) -> BatchOperation:
+        operation = BatchOperation(name, *args, **kwargs)
+        self.operations.append(operation)
+        return operation
+
+    async def run(self) -> list:
+        return await self.aipr.run_batch(self.operations)
+
+    def timing(self) -> list:
+        """Returns a list of (name, seconds) for the operations run."""
+
+        return [
+                (operation.name, operation.elapsed)
+                for operation in self.operations
+                if operation.elapsed is not None
+        ]
+
 
 class AIPRoute():
+    """Coroutine wrappers for pyroute2's IPRoute.
+
+    The blocking IPRoute calls are run in an executor on a pool of
+    sockets, each with its own lock, so independent calls (ie. a read
+    while a slow write is retrying) can run in parallel. The first socket
+    and its lock are also available as self.ipr and self.lock.
+
+    Interface names and indexes are cached, the cache is kept current by
+    a link event subscription which starts with the first lookup. The
+    same subscription is used to confirm that devices have been added,
+    deleted or renamed.
+
+    Calls which can fail with transient errors (ie. a busy device) are
+    retried according to a RetryPolicy. The wait between attempts is an
+    asyncio sleep with the socket released, so other calls can continue,
+    and the number of retries for each call is counted in self.retries.
+
+    With the native backend the simple link calls (see NATIVE_OPERATIONS)
+    are sent on an AIORtnl socket from the event loop instead, without an
+    executor or a lock, and any number can be in flight at once.
+
+    get_id, get_name and get_up send a hand packed RTM_GETLINK, without
+    the statistics, on the executor thread's own socket (so they never
+    wait for a pool lock) and read the one field they need from the
+    reply. The results of get_up can also be cached for up_ttl seconds,
+    for health checks which poll it far more often than it changes.
+
+    Args:
+        loop: the event loop, defaults to the current loop
+        executor: the executor to run the blocking calls in
+        pool_size: the number of IPRoute sockets to keep open
+        confirm_timeout: seconds to wait for the kernel to confirm
+            a device was added, deleted or renamed
+        retry_policies: a dictionary of RetryPolicy to override the
+            defaults in RETRY_POLICIES, keyed by method name
+        backend: "executor" to run every call in the executor, or
+            "native" to send the simple link calls from the event loop
+        up_ttl: seconds to cache the result of get_up for, 0 to disable
+    """
 
     NetlinkError = NetlinkError
 
-    def __init__(self, loop=None, executor=None):
+    def __init__(
+            self,
+            loop=None,
+            executor=None,
+            pool_size=DEFAULT_POOL_SIZE,
+            confirm_timeout=CONFIRM_TIMEOUT,
+            retry_policies=None,
+            backend=BACKEND_EXECUTOR,
+            up_ttl=0.0
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}")
+
         self.loop = asyncio.get_event_loop() if loop is None else loop
         self.executor = executor
+        self.confirm_timeout = confirm_timeout
+
+        self.retry_policies = dict(RETRY_POLICIES)
+        self.retry_policies.update(retry_policies or {})
+        self.retries = Counter()
         self.ipr = IPRoute()
         self.lock = asyncio.Lock()
 
+        self.pool = [self.ipr] + [IPRoute() for _ in range(1, pool_size)]
+        self.locks = [self.lock] + [
+                asyncio.Lock() for _ in range(1, pool_size)
+        ]
+        # the calls waiting for or holding each socket, and when the
+        # call holding it started
+        self._pending = [0] * pool_size
+        self._started = [0.0] * pool_size
+
+        self.links = LinkCache(self.loop)
+        self.neighbours = NeighbourCache(self.loop)
+        self._stats = None
+
+        self.aiortnl = None
+        if backend == BACKEND_NATIVE:
+            self.aiortnl = AIORtnl(self.loop)
+
+        self.up_ttl = up_ttl
+        # device id: (expiry time, up)
+        self._up_cache: dict = {}
+        # device id: the operations sync_tc last set it up with
+        self._tc_operations: dict = {}
+
+        # the link getters use a small socket of their own in each
+        # executor thread
+        self._local = threading.local()
+        self._link_sockets: list = []
+
     def close(self):
-        if not self.ipr.closed:
-            self.ipr.close()
+        self.links.close()
+        self.neighbours.close()
+
+        if self.aiortnl is not None:
+            self.aiortnl.close()
 
-    def _get_id(self, device_name: str) -> int:
+        while self._link_sockets:
+            self._link_sockets.pop().close()
+
+        for ipr in self.pool:
+            if not ipr.closed:
+                ipr.close()
+
+    def _reconnect(self, index: int) -> IPRoute:
         try:
-            device_ids = self.ipr.link_lookup(ifname=device_name)
+            self.pool[index].close()
+        except OSError:
+            pass
 
-        except OSError as exc:
-            # sometimes calling this will lose the link for some reason
-            if exc.errno == 9:
-                self.ipr.close()
-                self.ipr = IPRoute()
-                device_ids = self.ipr.link_lookup(ifname=device_name)
+        self.pool[index] = IPRoute()
+        if index == 0:
+            self.ipr = self.pool[0]
+
+        return self.pool[index]
+
+    def _call(self, index: int | None, func, *args, **kwargs):
+        ipr = None if index is None else self.pool[index]
 
         try:
-            return device_ids[0]
-        except IndexError:
-            return 0
+            return func(ipr, *args, **kwargs)
+
+        except OSError as exc:
+            # sometimes a socket will lose the link for some reason,
+            # nothing was sent so reconnect and try again
+            if exc.errno != EBADF:
+                raise
+
+        # it could have been this thread's link socket or the pool's
+        self._reset_link_socket()
+        if index is not None:
+            ipr = self._reconnect(index)
+
+        return func(ipr, *args, **kwargs)
+
+    def _acquire(self) -> int:
+        # prefer an idle socket
+        for index, lock in enumerate(self.locks):
+            if not lock.locked():
+                return index
+
+        # otherwise wait on the one whose call started last, a slow write
+        # will usually have been running the longest, and of those the one
+        # with the fewest calls waiting
+        return min(
+                range(len(self.locks)),
+                key=lambda i: (-self._started[i], self._pending[i])
+        )
+
+    async def _retry(self, name: str, func, *args, **kwargs):
+        policy = self.retry_policies[name]
+
+        for attempt in range(1, policy.attempts + 1):
+            try:
+                return await self._run(func, *args, **kwargs)
+            except NetlinkError as exc:
+                if exc.code not in policy.codes or attempt >= policy.attempts:
+                    raise
+
+            self.retries[name] += 1
+            await asyncio.sleep(policy.get_delay(attempt - 1))
+
+        return None
+
+    def _raise_error(self, name: str, exc: Exception, *args, **kwargs):
+        """Raises the exception a failed call is reported as."""
 
-    def _get_name(self, device_id: int) -> str:
+        if name == "add_device":
+            if isinstance(exc, NetlinkError) and exc.code == EEXIST:
+                raise FileExistsError(
+                        f"Device {args[0]} already exists"
+                ) from exc
+
+        elif name == "set_master":
+            policy = self.retry_policies["set_master"]
+            if isinstance(exc, NetlinkError) and exc.code in policy.codes:
+                raise RuntimeError(
+                        f"Device busy in {policy.attempts} attempts"
+                ) from exc
+
+            if isinstance(exc, (NetlinkError, OSError)):
+                raise RuntimeError(
+                        f"Failed to add {args[0]} to bridge {args[1]}: {exc}"
+                ) from exc
+
+        elif name == "add_route":
+            if isinstance(exc, NetlinkError):
+                if exc.code == EEXIST:
+                    raise FileExistsError(
+                            f"Route {kwargs} already exists"
+                    ) from exc
+
+                raise RuntimeError(
+                        f"Failed to add route {kwargs}: {exc}"
+                ) from exc
+
+        raise exc
+
+    async def _wait_for_link(self, future: asyncio.Future):
         try:
-            links = self.ipr.get_links(device_id)
-        except NetlinkError:
+            return await asyncio.wait_for(future, self.confirm_timeout)
+        except asyncio.TimeoutError:
             return None
 
+    async def _run(self, func, *args, **kwargs):
         try:
-            return links[0].get_attr('IFLA_IFNAME')
-        except (IndexError, KeyError):
-            return None
+            return await self._dispatch(func, *args, **kwargs)
+        finally:
+            if func.__name__ in LINK_CHANGES:
+                self._forget(func.__name__, args, kwargs)
+
+    async def _dispatch(self, func, *args, **kwargs):
+        if self.aiortnl is not None:
+            native = NATIVE_OPERATIONS.get(func.__name__)
+            if native is not None:
+                return await getattr(self, native)(
+                        self.aiortnl, *args, **kwargs
+                )
+
+        if func.__name__ in LINK_GETTERS:
+            return await self.loop.run_in_executor(
+                    self.executor,
+                    partial(self._call, None, func, *args, **kwargs)
+            )
+
+        index = self._acquire()
+        self._pending[index] += 1
 
-    def _get_up(self, device_id: int) -> bool:
         try:
-            links = self.ipr.get_links(device_id)
-        except NetlinkError:
-            return False
+            async with self.locks[index]:
+                self._started[index] = time.monotonic()
+                return await self.loop.run_in_executor(
+                        self.executor,
+                        partial(self._call, index, func, *args, **kwargs)
+                )
+        finally:
+            self._pending[index] -= 1
+
+    def _link_socket(self) -> RtnlSocket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = RtnlSocket(window=1)
+            self._local.sock = sock
+            self._link_sockets.append(sock)
+
+        return sock
+
+    def _reset_link_socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            return
+
+        self._local.sock = None
+        if sock in self._link_sockets:
+            self._link_sockets.remove(sock)
 
         try:
-            ifi_flags = links[0]['flags']
-        except (IndexError, KeyError):
+            sock.close()
+        except OSError:
+            pass
+
+    def _get_id(self, ipr: IPRoute, device_name: str) -> int:
+        link = self._link_socket().get_link(name=device_name)
+        if link is None:
+            return 0
+
+        data, offset, _ = link
+        return rtnl.link_index(data, offset)
+
+    def _get_name(self, ipr: IPRoute, device_id: int) -> str:
+        link = self._link_socket().get_link(device_id)
+        if link is None:
+            return None
+
+        return rtnl.link_name(*link)
+
+    def _get_up(self, ipr: IPRoute, device_id: int) -> bool:
+        link = self._link_socket().get_link(device_id)
+        if link is None:
             return False
 
+        data, offset, _ = link
+        ifi_flags = rtnl.link_flags(data, offset)
+
         return (ifi_flags & (IFF_UP | IFF_LOWER_UP)) == (IFF_UP | IFF_LOWER_UP)
 
-    def _get_stats(self, device_id: int) -> bool:
+    async def _aio_get_id(self, aiortnl: AIORtnl, device_name: str) -> int:
+        link = await aiortnl.get_link(name=device_name)
+        return 0 if link is None else link["index"]
+
+    async def _aio_get_name(self, aiortnl: AIORtnl, device_id: int) -> str:
+        link = await aiortnl.get_link(device_id)
+        return None if link is None else link["name"]
+
+    async def _aio_get_up(self, aiortnl: AIORtnl, device_id: int) -> bool:
+        link = await aiortnl.get_link(device_id)
+        if link is None:
+            return False
+
+        return (link["flags"] & (IFF_UP | IFF_LOWER_UP)) == (
+                IFF_UP | IFF_LOWER_UP
+        )
+
+    def _get_stats(self, ipr: IPRoute, device_id: int) -> bool:
         try:
-            stats = self.ipr.stats("get", ifindex=device_id)
+            stats = ipr.stats("get", ifindex=device_id)
         except NetlinkError:
             return None
 
@@ -83,10 +560,10 @@ class AIPRoute():
             return None
 
     def _get_arp_cache(
-            self, device_id: int, stale_timeout: int = 60
+            self, ipr: IPRoute, device_id: int, stale_timeout: int = 60
     ) -> dict | None:
         try:
-            response = self.ipr.get_neighbours(ifindex=device_id)
+            response = ipr.get_neighbours(ifindex=device_id)
         except NetlinkError:
             return None
 
@@ -109,59 +586,48 @@ class AIPRoute():
 
         return cache
 
-    def _delete_device(self, device_name: str) -> None:
+    def _delete_device(self, ipr: IPRoute, device_name: str) -> bool:
         try:
-            self.ipr.link('del', ifname=device_name)
+            ipr.link('del', ifname=device_name)
         except NetlinkError as exc:
             if exc.code == 19:
                 # if it doesn't exist that's okay
-                pass
-            elif exc.code == 95:
+                return False
+            if exc.code == 95:
                 # newer kernels can return operation not
                 # supported instead of no such device
-                pass
-            else:
-                raise
-        else:
-            for _ in range(0, 10):
-                _id = self._get_id(device_name)
-                if not _id:
-                    break
-            else:
-                raise RuntimeError(f"Failed to remove {device_name}")
-
-    def _set_master(self, device_id: int, master_id: int) -> None:
-
-        for i in range(0, 10):
-            try:
-                self.ipr.link('set', index=device_id, master=master_id)
+                return False
+            raise
 
-            except NetlinkError as exc:
-                if exc.code == 16:  # device busy
-                    pass
-                else:
-                    raise RuntimeError(
-                            f"Failed to add {device_id}"
-                            f" to bridge {master_id}: {exc}"
-                    ) from exc
+        return True
 
-            except OSError as exc:
-                raise RuntimeError(
-                        f"Failed to add {device_id} to bridge"
-                        f" {master_id}: {exc}"
-                ) from exc
+    def _set_master(
+            self, ipr: IPRoute, device_id: int, master_id: int
+    ) -> None:
+        ipr.link('set', index=device_id, master=master_id)
 
-            else:
-                break
+    async def _aio_delete_device(
+            self, aiortnl: AIORtnl, device_name: str
+    ) -> bool:
+        try:
+            await aiortnl.delete_link(device_name)
+        except NetlinkError as exc:
+            if exc.code in (ENODEV, EOPNOTSUPP):
+                return False
+            raise
 
-            time.sleep(2)
+        return True
 
-        else:
-            raise RuntimeError(f"Device busy in {i} attempts")
+    async def _aio_set_master(
+            self, aiortnl: AIORtnl, device_id: int, master_id: int
+    ) -> None:
+        await aiortnl.set_link(
+                device_id, attrs=codec.pack_u32(rtnl.IFLA_MASTER, master_id)
+        )
 
-    def _set_stp(self, device_id: int, stp: int) -> None:
+    def _set_stp(self, ipr: IPRoute, device_id: int, stp: int) -> None:
         try:
-            self.ipr.link(
+            ipr.link(
                     'set',
                     **IPLinkRequest(
                             {
@@ -177,56 +643,85 @@ class AIPRoute():
                     f"Failed to set {device_id} stp to {stp}"
             ) from exc
 
-    def _add_device(self, device_name: str, device_type: str, **kwargs) -> int:
-        try:
-            self.ipr.link(
-                    'add', ifname=device_name, kind=device_type, **kwargs
-            )
-        except NetlinkError as exc:
-            if exc.code == 17:
-                raise FileExistsError(
-                        f"Device {device_name} already exists"
-                ) from exc
+    def _add_device(
+            self, ipr: IPRoute, device_name: str, device_type: str, **kwargs
+    ) -> None:
+        ipr.link('add', ifname=device_name, kind=device_type, **kwargs)
 
-            if exc.code == 16:
-                # device busy
-                time.sleep(2)
-                self.ipr.link(
-                        'add', ifname=device_name, kind=device_type, **kwargs
-                )
-            else:
-                raise
+    def _add_device_id(
+            self, ipr: IPRoute, device_name: str, device_type: str, **kwargs
+    ) -> int:
+        self._add_device(ipr, device_name, device_type, **kwargs)
 
-        for _ in range(0, 10):
-            _id = self._get_id(device_name)
-            if _id:
-                break
-        else:
+        device_id = self._get_id(ipr, device_name)
+        if not device_id:
             raise RuntimeError(f"Failed to add {device_name}")
 
-        return _id
+        return device_id
 
-    def _flush_address(self, device_id) -> None:
-        self.ipr.flush_addr(index=device_id)
+    def _flush_address(self, ipr: IPRoute, device_id) -> None:
+        ipr.flush_addr(index=device_id)
 
-    def _set_address(self, device_id: int, address: netaddr.IPNetwork) -> None:
-        self.ipr.flush_addr(index=device_id)
+    def _get_addresses(self, ipr: IPRoute, device_id: int) -> list:
+        addresses = []
+        for msg in ipr.get_addr(index=device_id):
+            # IFA_ADDRESS is the peer address on point to point links
+            address = msg.get_attr('IFA_LOCAL') or msg.get_attr('IFA_ADDRESS')
+            addresses.append(
+                    netaddr.IPNetwork(f"{address}/{msg['prefixlen']}")
+            )
+
+        return addresses
 
-        if bool(address.ip) and bool(address.prefixlen):
-            self.ipr.addr(
+    def _sync_addresses(
+            self, ipr: IPRoute, device_id: int, desired: list
+    ) -> dict:
+        desired = list(desired)
+        current = self._get_addresses(ipr, device_id)
+
+        _, delete, _ = diff_addresses(current, desired)
+
+        for address in delete:
+            try:
+                ipr.addr(
+                        'del',
+                        index=device_id,
+                        address=str(address.ip),
+                        mask=address.prefixlen
+                )
+            except NetlinkError as exc:
+                # already deleted, along with its primary
+                if exc.code != EADDRNOTAVAIL:
+                    raise
+
+        if delete:
+            # deleting an IPv4 primary can take its secondaries with it
+            current = self._get_addresses(ipr, device_id)
+
+        add, _, unchanged = diff_addresses(current, desired)
+
+        for address in add:
+            ipr.addr(
                     'add',
                     index=device_id,
                     address=str(address.ip),
                     mask=address.prefixlen
             )
 
+        return {"added": add, "deleted": delete, "unchanged": unchanged}
+
+    def _set_address(
+            self, ipr: IPRoute, device_id: int, address: netaddr.IPNetwork
+    ) -> None:
+        self._sync_addresses(ipr, device_id, [address])
+
     def _replace_address(
-            self, device_id: int, old_address: netaddr.IPNetwork,
-            new_address: netaddr.IPNetwork
+            self, ipr: IPRoute, device_id: int,
+            old_address: netaddr.IPNetwork, new_address: netaddr.IPNetwork
     ) -> None:
         if bool(old_address.ip) and bool(old_address.prefixlen):
             try:
-                self.ipr.addr(
+                ipr.addr(
                         'del',
                         index=device_id,
                         address=str(old_address.ip),
@@ -238,43 +733,39 @@ class AIPRoute():
                 pass
 
         if bool(new_address.ip) and bool(new_address.prefixlen):
-            self.ipr.addr(
+            ipr.addr(
                     'add',
                     index=device_id,
                     address=str(new_address.ip),
                     mask=new_address.prefixlen
             )
 
-    def _set_mac(self, device_id: int, mac: netaddr.EUI) -> None:
+    def _set_mac(
+            self, ipr: IPRoute, device_id: int, mac: netaddr.EUI
+    ) -> None:
         if mac:
-            info = self.ipr.get_links(device_id)[0]
+            info = ipr.get_links(device_id)[0]
             existing_mac = netaddr.EUI(info.get_attr("IFLA_ADDRESS"))
             if existing_mac != mac:
-                self.ipr.link('set', index=device_id, address=str(mac))
+                ipr.link('set', index=device_id, address=str(mac))
 
-    def _set_device_name(self, device_id: int, device_name: str) -> None:
+    def _set_device_name(
+            self, ipr: IPRoute, device_id: int, device_name: str
+    ) -> None:
         if not device_name:
             return
 
-        try:
-            self.ipr.link("set", index=device_id, ifname=device_name)
-        except NetlinkError as exc:
-            if exc.code == 16:
-                # device busy
-                time.sleep(2)
-                self.ipr.link("set", index=device_id, ifname=device_name)
-            else:
-                raise
+        ipr.link("set", index=device_id, ifname=device_name)
 
-    def _set_mtu(self, device_id: int, mtu: int) -> None:
-        self.ipr.link('set', index=device_id, mtu=mtu)
+    def _set_mtu(self, ipr: IPRoute, device_id: int, mtu: int) -> None:
+        ipr.link('set', index=device_id, mtu=mtu)
 
-    def _set_up(self, device_id: int, state: bool) -> None:
+    def _set_up(self, ipr: IPRoute, device_id: int, state: bool) -> None:
         if state:
-            self.ipr.link('set', index=device_id, state='up')
+            ipr.link('set', index=device_id, state='up')
         else:
             try:
-                self.ipr.link('set', index=device_id, state='down')
+                ipr.link('set', index=device_id, state='down')
 
             except NetlinkError as exc:
                 if exc.code == 19:
@@ -283,21 +774,58 @@ class AIPRoute():
                 else:
                     raise
 
-    def _flush_rules(self, **kwargs) -> None:
+    async def _aio_set_mac(
+            self, aiortnl: AIORtnl, device_id: int, mac: netaddr.EUI
+    ) -> None:
+        if mac:
+            link = await aiortnl.get_link(device_id)
+            if link is None:
+                raise NetlinkError(ENODEV)
+
+            if netaddr.EUI(link["address"]) != mac:
+                await aiortnl.set_link(
+                        device_id,
+                        attrs=codec.pack_rtattr(
+                                rtnl.IFLA_ADDRESS,
+                                netaddr.EUI(mac).packed
+                        )
+                )
+
+    async def _aio_set_mtu(
+            self, aiortnl: AIORtnl, device_id: int, mtu: int
+    ) -> None:
+        await aiortnl.set_link(
+                device_id, attrs=codec.pack_u32(rtnl.IFLA_MTU, mtu)
+        )
+
+    async def _aio_set_up(
+            self, aiortnl: AIORtnl, device_id: int, state: bool
+    ) -> None:
         try:
-            self.ipr.flush_rules(**kwargs)
+            await aiortnl.set_link(
+                    device_id, flags=IFF_UP if state else 0, change=IFF_UP
+            )
+
+        except NetlinkError as exc:
+            # if device doesn't exist ignore it when setting it down
+            if state or exc.code != ENODEV:
+                raise
+
+    def _flush_rules(self, ipr: IPRoute, **kwargs) -> None:
+        try:
+            ipr.flush_rules(**kwargs)
         except (OSError, NetlinkError):
             pass
 
-    def _delete_rule(self, **kwargs) -> None:
+    def _delete_rule(self, ipr: IPRoute, **kwargs) -> None:
         try:
-            self.ipr.rule('delete', **kwargs)
+            ipr.rule('delete', **kwargs)
         except NetlinkError:
             pass
 
-    def _add_rule(self, **kwargs) -> None:
+    def _add_rule(self, ipr: IPRoute, **kwargs) -> None:
         try:
-            self.ipr.rule('add', **kwargs)
+            ipr.rule('add', **kwargs)
         except NetlinkError as exc:
             if exc.code == 17:
                 pass
@@ -306,62 +834,114 @@ class AIPRoute():
                         f"Failed to add rule {kwargs}: {exc}"
                 ) from exc
 
-    def _flush_routes(self, **kwargs) -> None:
+    def _flush_routes(self, ipr: IPRoute, **kwargs) -> None:
         try:
-            self.ipr.flush_routes(**kwargs)
+            ipr.flush_routes(**kwargs)
         except (OSError, NetlinkError):
             pass
 
-    def _delete_route(self, **kwargs) -> None:
+    def _delete_route(self, ipr: IPRoute, **kwargs) -> None:
         try:
-            self.ipr.route('delete', **kwargs)
+            ipr.route('delete', **kwargs)
         except NetlinkError:
             pass
 
-    def _add_route(self, **kwargs) -> None:
-        try:
-            self.ipr.route('add', **kwargs)
-        except NetlinkError as exc:
-            if exc.code == 17:
-                time.sleep(0.250)
-                try:
-                    self.ipr.route('add', **kwargs)
-                except NetlinkError as exce:
-                    if exce.code == 17:
-                        raise FileExistsError(
-                                f"Route {kwargs} already exists"
-                        ) from exce
-
-                    raise RuntimeError(
-                            f"Failed to add route {kwargs}: {exce}"
-                    ) from exce
-            else:
-                raise RuntimeError(
-                        f"Failed to add route {kwargs}: {exc}"
-                ) from exc
+    def _add_route(self, ipr: IPRoute, **kwargs) -> None:
+        ipr.route('add', **kwargs)
 
     def _replace_tc(
-            self, kind: str, device_id: int, handle: int, **kwargs
+            self, ipr: IPRoute, kind: str, device_id: int, handle: int,
+            **kwargs
     ) -> None:
-        self.ipr.tc("replace", kind, device_id, handle, **kwargs)
+        ipr.tc("replace", kind, device_id, handle, **kwargs)
 
     def _delete_tc(
-            self, kind: str, device_id: int, handle: int, **kwargs
+            self, ipr: IPRoute, kind: str, device_id: int, handle: int,
+            **kwargs
     ) -> None:
         try:
-            self.ipr.tc("del", kind, device_id, handle, **kwargs)
+            ipr.tc("del", kind, device_id, handle, **kwargs)
         except NetlinkError:
             pass
 
-    def _add_filter_tc(self, kind: str, device_id: int, **kwargs) -> None:
-        self.ipr.tc("add-filter", kind, device_id, **kwargs)
+    def _add_filter_tc(
+            self, ipr: IPRoute, kind: str, device_id: int, **kwargs
+    ) -> None:
+        ipr.tc("add-filter", kind, device_id, **kwargs)
 
-    def _run_routine(self, routine):
+    def _run_routine(self, ipr: IPRoute, routine):
         try:
-            routine(self.ipr)
+            routine(ipr)
         except NetlinkError as exc:
             raise RuntimeError(f"Netlink error in {routine}: {exc}") from exc
 
+    def _run_batch(self, ipr: IPRoute, operations: list):
+        for operation in operations:
+            if operation.done:
+                continue
+
+            func = getattr(self, BATCH_OPERATIONS[operation.name])
+            args, kwargs = operation.resolve()
+            started = time.monotonic()
+
+            try:
+                operation.result = func(ipr, *args, **kwargs)
+
+            except OSError as exc:
+                if exc.errno == EBADF:
+                    # nothing was sent, _call will reconnect and
+                    # resume from this operation
+                    raise
+
+                operation.error = exc
+                return operation
+
+            except (NetlinkError, RuntimeError, ValueError) as exc:
+                operation.error = exc
+                return operation
+
+            finally:
+                operation.elapsed = time.monotonic() - started
+
+            operation.done = True
+
+        return None
+
+    def _forget(self, method: str, args: tuple, kwargs: dict):
+        # the link events may not have arrived yet, or have been lost,
+        # so drop what a call to one of LINK_CHANGES has made stale
+
+        def _argument(position, name):
+            return args[position] if len(args) > position else kwargs.get(name)
+
+        if method == "_set_up":
+            self._up_cache.pop(_argument(0, "device_id"), None)
+
+        elif method in ("_add_device", "_add_device_id", "_delete_device"):
+            device_id = self.links.forget(name=_argument(0, "device_name"))
+            self._up_cache.pop(device_id, None)
+
+        elif method == "_set_device_name":
+            self.links.forget(
+                    index=_argument(0, "device_id"),
+                    name=_argument(1, "device_name")
+            )
+
+        elif method == "_run_routine":
+            # a routine can change anything
+            self.links.clear()
+            self._up_cache.clear()
+
+    def _rtnl(self, window: int, name: str, *args):
+        with RtnlSocket(window) as rtnl:
+            return getattr(rtnl, name)(*args)
+
+    def _netlink_errors(self, failures: list) -> list:
+        return [
+                (key, NetlinkError(code, os.strerror(code)))
+                for key, code in failures
+        ]
+
     def get_attr(self, attr_name: str, attrs) -> object:
         if attrs is None:
             return None
@@ -401,46 +981,86 @@ class AIPRoute():
         if not device_name:
             return 0
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor, partial(self._get_id, device_name)
-            )
+        self.links.start()
+
+        device_id = self.links.get_index(device_name)
+        if device_id is not None:
+            return device_id
+
+        generation = self.links.generation
+        device_id = await self._run(self._get_id, device_name)
+        if device_id:
+            self.links.learn(device_name, device_id, generation)
+
+        return device_id
 
     async def get_name(self, device_id: int) -> str:
         if device_id <= 0:
             return None
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor, partial(self._get_name, device_id)
-            )
+        self.links.start()
+
+        device_name = self.links.get_name(device_id)
+        if device_name is not None:
+            return device_name
+
+        generation = self.links.generation
+        device_name = await self._run(self._get_name, device_id)
+        if device_name:
+            self.links.learn(device_name, device_id, generation)
+
+        return device_name
 
     async def get_up(self, device_id: int) -> str:
         if device_id <= 0:
             return None
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor, partial(self._get_up, device_id)
-            )
+        if self.up_ttl > 0:
+            expiry, up = self._up_cache.get(device_id, (0.0, None))
+            if expiry > self.loop.time():
+                return up
+
+        up = await self._run(self._get_up, device_id)
+
+        if self.up_ttl > 0:
+            self._up_cache[device_id] = (self.loop.time() + self.up_ttl, up)
+
+        return up
 
     async def get_stats(self, device_id: int) -> str:
         if device_id <= 0:
             return None
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor, partial(self._get_stats, device_id)
-            )
+        return await self._run(self._get_stats, device_id)
+
+    async def get_all_stats(self) -> LinkStats:
+        """Returns the counters of every interface, from one RTM_GETSTATS
+        dump rather than a request per interface.
+
+        The previous call's sample is kept, so the result's rate() gives
+        each interface's rates since then.
+        """
+
+        self._stats = await LinkStats.from_dump(self._stats, self.loop)
+        return self._stats
 
     async def delete_device(self, device_name: str) -> None:
         if not device_name:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._delete_device, device_name)
-            )
+        self.links.start()
+        deleted = self.links.wait_for(device_name, RTM_DELLINK)
+
+        try:
+            if not await self._run(self._delete_device, device_name):
+                return
+
+            if await self._wait_for_link(deleted) is None:
+                if await self._run(self._get_id, device_name):
+                    raise RuntimeError(f"Failed to remove {device_name}")
+
+        finally:
+            self.links.discard(device_name, deleted)
 
     async def add_device(
             self, device_name: str, device_type: str, **kwargs
@@ -448,34 +1068,47 @@ class AIPRoute():
         if not device_name or not device_type:
             return None
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor,
-                    partial(
-                            self._add_device, device_name, device_type,
-                            **kwargs
-                    )
+        self.links.start()
+        added = self.links.wait_for(device_name, RTM_NEWLINK)
+
+        try:
+            await self._retry(
+                    "add_device", self._add_device, device_name, device_type,
+                    **kwargs
             )
 
+            device_id = await self._wait_for_link(added)
+            if device_id is None:
+                device_id = await self._run(self._get_id, device_name)
+
+        except NetlinkError as exc:
+            self._raise_error("add_device", exc, device_name, device_type)
+
+        finally:
+            self.links.discard(device_name, added)
+
+        if not device_id:
+            raise RuntimeError(f"Failed to add {device_name}")
+
+        return device_id
+
     async def set_master(self, device_id: int, master_id: int) -> None:
         if device_id <= 0 or master_id < 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._set_master, device_id, master_id)
+        try:
+            await self._retry(
+                    "set_master", self._set_master, device_id, master_id
             )
 
+        except (NetlinkError, OSError) as exc:
+            self._raise_error("set_master", exc, device_id, master_id)
+
     async def set_stp(self, device_id: int, stp: bool) -> None:
         if device_id <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._set_stp, device_id, 1 if stp else 0)
-            )
+        await self._run(self._set_stp, device_id, 1 if stp else 0)
 
     async def set_address(
             self, device_id: int, address: netaddr.IPNetwork
@@ -483,20 +1116,60 @@ class AIPRoute():
         if device_id <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._set_address, device_id, address)
-            )
+        await self._run(self._set_address, device_id, address)
+
+    async def sync_addresses(self, device_id: int, desired: list) -> dict:
+        """Makes an interface's addresses match a list of addresses.
+
+        The current addresses are read once, and only the differences are
+        deleted or added, so addresses that already match are never
+        removed. IPv6 link local addresses are left alone.
+
+        Args:
+            device_id: the interface index
+            desired: the addresses, as netaddr.IPNetwork or strings
+
+        Returns:
+            a dictionary with lists of the addresses "added" and "deleted"
+            and the number "unchanged"
+        """
+
+        if device_id <= 0:
+            return None
+
+        return await self._run(self._sync_addresses, device_id, desired)
+
+    async def sync_addresses_many(
+            self, desired: dict, window: int = DEFAULT_WINDOW
+    ) -> dict:
+        """Makes the addresses of many interfaces match, like
+        sync_addresses, from one dump with the changes pipelined.
+
+        Args:
+            desired: a dictionary of interface index: list of addresses
+            window: the most requests to have waiting for an ACK
+
+        Returns:
+            a dictionary of interface index: the same dictionary as
+            sync_addresses, with (address, NetlinkError) for the addresses
+            which "failed"
+        """
+
+        summary = await self.loop.run_in_executor(
+                self.executor,
+                partial(self._rtnl, window, "sync_addresses", desired)
+        )
+
+        for changes in summary.values():
+            changes["failed"] = self._netlink_errors(changes["failed"])
+
+        return summary
 
     async def flush_address(self, device_id: int) -> None:
         if device_id <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._flush_address, device_id)
-            )
+        await self._run(self._flush_address, device_id)
 
     async def replace_address(
             self, device_id: int, old_address: netaddr.IPNetwork,
@@ -505,100 +1178,281 @@ class AIPRoute():
         if device_id <= 0:
             return netaddr.IPNetwork('0.0.0.0/0')
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(
-                            self._replace_address, device_id, old_address,
-                            new_address
-                    )
-            )
+        await self._run(
+                self._replace_address, device_id, old_address, new_address
+        )
         return new_address
 
     async def set_mtu(self, device_id: int, mtu: int) -> None:
         if device_id <= 0 or mtu <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._set_mtu, device_id, mtu)
-            )
+        await self._run(self._set_mtu, device_id, mtu)
 
     async def set_mac(self, device_id: int, mac: netaddr.EUI) -> None:
         if device_id <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._set_mac, device_id, mac)
-            )
+        await self._run(self._set_mac, device_id, mac)
 
     async def set_device_name(self, device_id: int, device_name: str) -> None:
-        if device_id <= 0:
+        if device_id <= 0 or not device_name:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._set_device_name, device_id, device_name)
+        self.links.start()
+        renamed = self.links.wait_for(device_name, RTM_NEWLINK, device_id)
+
+        try:
+            await self._retry(
+                    "set_device_name", self._set_device_name, device_id,
+                    device_name
             )
 
+            if await self._wait_for_link(renamed) is None:
+                if await self._run(self._get_name, device_id) != device_name:
+                    raise RuntimeError(
+                            f"Failed to rename {device_id} to {device_name}"
+                    )
+
+        finally:
+            self.links.discard(device_name, renamed)
+
     async def set_up(self, device_id: int, state: bool) -> None:
         if device_id <= 0:
             return
 
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._set_up, device_id, state)
-            )
+        self._up_cache.pop(device_id, None)
+        await self._run(self._set_up, device_id, state)
 
     async def get_arp_cache(
             self, device_id: int, stale_timeout: int = 60
     ) -> dict:
+        """Returns {mac: ip address} of an interface's neighbours that were
+        confirmed within the last stale_timeout seconds.
+
+        The first call starts a NeighbourCache, which keeps every
+        interface's neighbours in memory from netlink events, so later
+        calls don't dump the table. As the kernel doesn't send an event
+        when a neighbour is confirmed, the cache is dumped again at least
+        every half stale_timeout.
+        """
+
         if device_id <= 0:
             return None
 
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._get_arp_cache, device_id, stale_timeout)
+        try:
+            await self.neighbours.refresh(stale_timeout / 2)
+        except OSError:
+            return await self._run(
+                    self._get_arp_cache, device_id, stale_timeout
             )
 
+        return self.neighbours.get_arp_cache(device_id, stale_timeout)
+
+    def iter_links(self):
+        """Streams the interfaces as they're dumped, as dictionaries.
+
+        Unlike the IPRoute dumps the whole table is never held in
+        memory, and breaking out of the loop ends the dump, ie.
+            async for link in aipr.iter_links():
+                if link["name"] == "eth0":
+                    break
+        """
+
+        return rtnl.iter_links(self.loop)
+
+    def iter_addresses(self, device_id: int | None = None, family: int = 0):
+        """Streams the addresses as (index, netaddr.IPNetwork) tuples, see
+        iter_links."""
+
+        return rtnl.iter_addresses(device_id, family, self.loop)
+
+    def iter_routes(self, table: int | None = None, family: int = 0):
+        """Streams the routes as dictionaries, see iter_links."""
+
+        return rtnl.iter_routes(table, family, self.loop)
+
+    def iter_neighbours(self, device_id: int | None = None, family: int = 0):
+        """Streams the neighbours as dictionaries, see iter_links."""
+
+        return rtnl.iter_neighbours(device_id, family, self.loop)
+
+    async def get_route_table(
+            self, table: int | None = 254, family: int = socket.AF_INET
+    ) -> RouteTable:
+        """Returns a compact snapshot of a routing table, with longest
+        prefix match lookups, built while streaming the dump."""
+
+        return await RouteTable.from_dump(table, family, self.loop)
+
+    async def get_neighbour_table(
+            self, device_id: int | None = None, family: int = socket.AF_INET
+    ) -> NeighbourTable:
+        """Returns a compact snapshot of the neighbour (ARP / NDP) table,
+        built while streaming the dump."""
+
+        return await NeighbourTable.from_dump(device_id, family, self.loop)
+
     async def flush_rules(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._flush_rules, **kwargs)
-            )
+        await self._run(self._flush_rules, **kwargs)
 
     async def delete_rule(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._delete_rule, **kwargs)
-            )
+        await self._run(self._delete_rule, **kwargs)
 
     async def add_rule(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._add_rule, **kwargs)
-            )
+        await self._run(self._add_rule, **kwargs)
+
+    async def sync_rules(
+            self,
+            desired: list,
+            protocol: int | str | None = None,
+            window: int = DEFAULT_WINDOW,
+            family: int | None = None
+    ) -> dict:
+        """Makes the policy routing rules match a list of rules.
+
+        The rules are dumped once and only the differences are written,
+        pipelined like add_routes, so nothing is written if the rules
+        already match. Rules are matched on their priority and selectors
+        (src, dst, tos, fwmark, fwmask, iifname and oifname), a rule with
+        a different table or action is replaced by adding the new rule
+        before deleting the old one. The kernel's default rules are never
+        deleted, and only rules of the families and protocols in desired
+        are deleted, so removing every rule needs protocol and family.
+
+        Args:
+            desired: a list of dictionaries with the same keywords as
+                add_rule, each must have a priority, tables and protocols
+                can be given by name
+            protocol: only delete rules with this protocol, instead of
+                the protocols in desired
+            window: the most requests to have waiting for an ACK
+            family: only delete rules of this family, socket.AF_UNSPEC
+                for both IPv4 and IPv6, instead of the families in desired
+
+        Returns:
+            a dictionary with lists of the rules "added", "replaced" and
+            "deleted", the number "unchanged" and (rule, NetlinkError)
+            for the rules which "failed"
+        """
+
+        tables = await get_rt_table_ids(
+                {
+                        rule["table"]
+                        for rule in desired
+                        if isinstance(rule.get("table"), str)
+                }
+        )
+        protocols = await get_rt_protocol_ids(
+                {
+                        rule["protocol"]
+                        for rule in desired
+                        if isinstance(rule.get("protocol"), str)
+                } | ({protocol} if isinstance(protocol, str) else set())
+        )
+
+        resolved = []
+        for rule in desired:
+            rule = dict(rule)
+            if isinstance(rule.get("table"), str):
+                rule["table"] = tables[rule["table"]]
+            if isinstance(rule.get("protocol"), str):
+                rule["protocol"] = protocols[rule["protocol"]]
+            resolved.append(rule)
+
+        summary = await self.loop.run_in_executor(
+                self.executor,
+                partial(
+                        self._rtnl, window, "sync_rules", resolved,
+                        protocols.get(protocol, protocol), family
+                )
+        )
+
+        summary["failed"] = self._netlink_errors(summary["failed"])
+        return summary
 
     async def flush_routes(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._flush_routes, **kwargs)
-            )
+        await self._run(self._flush_routes, **kwargs)
 
     async def delete_route(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._delete_route, **kwargs)
-            )
+        await self._run(self._delete_route, **kwargs)
 
     async def add_route(self, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor, partial(self._add_route, **kwargs)
-            )
+        try:
+            await self._retry("add_route", self._add_route, **kwargs)
+        except NetlinkError as exc:
+            self._raise_error("add_route", exc, **kwargs)
+
+    async def add_routes(
+            self, routes: list, window: int = DEFAULT_WINDOW
+    ) -> list:
+        """Adds many routes, pipelined on a separate netlink socket.
+
+        Up to window requests are sent before waiting for their ACKs, so
+        large tables load far faster than with add_route. Routes that
+        fail aren't retried.
+
+        Args:
+            routes: a list of dictionaries with the same keywords as
+                add_route (dst, gateway, oif, table, priority, etc.)
+            window: the most requests to have waiting for an ACK
+
+        Returns:
+            a list of (route, NetlinkError) for the routes which failed
+        """
+
+        failures = await self.loop.run_in_executor(
+                self.executor,
+                partial(self._rtnl, window, "add_routes", routes)
+        )
+
+        return self._netlink_errors(failures)
+
+    async def sync_routes(
+            self,
+            table: int,
+            desired: list,
+            proto: int | None = None,
+            window: int = DEFAULT_WINDOW,
+            family: int | None = None
+    ) -> dict:
+        """Makes a routing table match a list of routes.
+
+        The table is dumped once and only the differences are written,
+        pipelined like add_routes, so nothing is written if the table
+        already matches. Routes are matched on their destination, prefix
+        length, metric and tos, and are replaced if the gateway, protocol,
+        scope or type (or the oif and prefsrc, if given) differ. Routes
+        added by the kernel are never deleted, and only routes of the
+        families and protocols in desired are deleted, so emptying a
+        table needs proto and family.
+
+        Args:
+            table: the routing table id
+            desired: a list of dictionaries with the same keywords as
+                add_route, the table is filled in
+            proto: only delete routes with this protocol id, instead of
+                the protocols in desired
+            window: the most requests to have waiting for an ACK
+            family: only delete routes of this family, socket.AF_UNSPEC
+                for both IPv4 and IPv6, instead of the families in desired
+
+        Returns:
+            a dictionary with lists of the routes "added", "replaced" and
+            "deleted", the number "unchanged" and (route, NetlinkError)
+            for the routes which "failed"
+        """
+
+        summary = await self.loop.run_in_executor(
+                self.executor,
+                partial(
+                        self._rtnl, window, "sync_routes", table, desired,
+                        proto, family
+                )
+        )
+
+        summary["failed"] = self._netlink_errors(summary["failed"])
+        return summary
 
     async def replace_tc(
             self,
@@ -607,34 +1461,303 @@ class AIPRoute():
             handle: int = None,
             **kwargs
     ) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(
-                            self._replace_tc, kind, device_id, handle, **kwargs
-                    )
-            )
+        await self._run(self._replace_tc, kind, device_id, handle, **kwargs)
+
+    async def apply_tc(
+            self, operations: list, window: int = DEFAULT_WINDOW
+    ) -> list:
+        """Sends many tc requests, pipelined on a separate netlink socket.
+
+        Up to window requests are sent before waiting for their ACKs, so
+        thousands of filters are installed far faster than with
+        add_filter_tc. They're sent in order, so qdiscs and classes
+        should come before the filters attached to them. Requests that
+        fail aren't retried.
+
+        Args:
+            operations: a list of (command, kind, device_id, kwargs)
+                with the same arguments as IPRoute.tc, ie.
+                ("add-filter", "u32", 3, {"parent": 0x10000, ...})
+            window: the most requests to have waiting for an ACK
+
+        Returns:
+            a list of (operation, NetlinkError) for the operations which
+            failed
+        """
+
+        failures = await self.loop.run_in_executor(
+                self.executor, partial(self._rtnl, window, "tc", operations)
+        )
+
+        return self._netlink_errors(failures)
+
+    async def get_tc_snapshot(
+            self, device_id: int | None = None
+    ) -> TcSnapshot:
+        """Returns the qdiscs, classes and filters with their statistics,
+        of one interface or of all of them, from dumps."""
+
+        return await TcSnapshot.from_dump(device_id, self.loop)
+
+    async def sync_tc(
+            self,
+            operations: list,
+            previous: list | None = None,
+            device_id: int | None = None,
+            window: int = DEFAULT_WINDOW
+    ) -> dict:
+        """Makes the traffic control tree match the one operations set
+        up, sending only the operations for what's different.
+
+        The tree is dumped once and compared with TcSnapshot.plan, then
+        the deletes, changes and adds are pipelined like apply_tc. The
+        operations of each interface are kept if they all succeed, to be
+        the previous operations of the next sync. A qdisc whose kind
+        can't be changed in place, ie. htb, has to be deleted to change
+        its options.
+
+        Args:
+            operations: a list of (command, kind, device_id, kwargs) like
+                apply_tc takes, creating the whole tree of each interface
+                in them, the interfaces of the last sync which aren't in
+                them are emptied
+            previous: the operations the tree was last set up with, so
+                entries whose options the kernel dumps differently than
+                they're sent, ie. htb classes, aren't changed every time,
+                defaults to those of the last sync
+            device_id: only dump and change this interface
+            window: the most requests to have waiting for an ACK
+
+        Returns:
+            a dictionary with lists of the operations "added", "changed"
+            and "deleted", the number "unchanged" and (operation,
+            NetlinkError) for the operations which "failed"
+        """
+
+        if device_id is None:
+            devices = {index for _, _, index, _ in operations}
+            devices.update(self._tc_operations)
+        else:
+            devices = {device_id}
+            operations = [o for o in operations if o[2] == device_id]
+
+        if previous is None:
+            previous = [
+                    operation for index in devices
+                    for operation in self._tc_operations.get(index, ())
+            ]
+
+        snapshot = await self.get_tc_snapshot(device_id)
+        add, change, delete, unchanged = snapshot.plan(
+                operations, previous, devices
+        )
+        failures = await self.apply_tc(delete + change + add, window)
+
+        failed = {operation[2] for operation, _ in failures}
+        for index in devices - failed:
+            self._tc_operations[index] = [
+                    operation for operation in operations
+                    if operation[2] == index
+            ]
+
+        return {
+                "added": add,
+                "changed": change,
+                "deleted": delete,
+                "unchanged": unchanged,
+                "failed": failures,
+        }
 
     async def delete_tc(
             self, kind: str, device_id: int, handle: int, **kwargs
     ) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(
-                            self._delete_tc, kind, device_id, handle, **kwargs
-                    )
-            )
+        await self._run(self._delete_tc, kind, device_id, handle, **kwargs)
 
     async def add_filter_tc(self, kind: str, device_id: int, **kwargs) -> None:
-        async with self.lock:
-            await self.loop.run_in_executor(
-                    self.executor,
-                    partial(self._add_filter_tc, kind, device_id, **kwargs)
-            )
+        await self._run(self._add_filter_tc, kind, device_id, **kwargs)
 
     async def run_routine(self, routine):
-        async with self.lock:
-            return await self.loop.run_in_executor(
-                    self.executor, partial(self._run_routine, routine)
+        return await self._run(self._run_routine, routine)
+
+    def batch(self) -> Batch:
+        """Returns a Batch of calls to run in a single executor job.
+
+        ie.
+            async with aipr.batch() as batch:
+                port = batch.add_device("vlan10", "vlan", link=2, vlan_id=10)
+                batch.set_mtu(port, 9000)
+                batch.set_up(port, True)
+        """
+
+        return Batch(self)
+
+    async def run_batch(self, operations: list) -> list:
+        """Runs a list of BatchOperation in one executor job.
+
+        The operations run in order on one socket with its lock held, and
+        stop at the first failure. A failure the call's RetryPolicy allows
+        for is retried after a sleep with the lock released, resuming from
+        the failed operation. Each operation's result, error and elapsed
+        time are set as it runs.
+
+        Unlike the coroutines the arguments aren't checked first, so
+        ie. a device id of 0 is passed through to the kernel.
+
+        Returns:
+            the operations
+
+        Raises:
+            the first failure, mapped as the coroutine would map it
+        """
+
+        attempts = Counter()
+
+        while True:
+            try:
+                failed = await self._run(self._run_batch, operations)
+            finally:
+                for operation in operations:
+                    method = BATCH_OPERATIONS[operation.name]
+                    if method in LINK_CHANGES and (
+                            operation.done or operation.error is not None
+                    ):
+                        self._forget(method, *operation.resolve())
+
+            if failed is None:
+                return operations
+
+            exc = failed.error
+            policy = self.retry_policies.get(failed.name)
+            attempts[failed] += 1
+
+            if policy is None or not isinstance(exc, NetlinkError) or (
+                    exc.code not in policy.codes
+                    or attempts[failed] >= policy.attempts
+            ):
+                args, kwargs = failed.resolve()
+                self._raise_error(failed.name, exc, *args, **kwargs)
+
+            failed.error = None
+            self.retries[failed.name] += 1
+            await asyncio.sleep(policy.get_delay(attempts[failed] - 1))
+
+
+async def _benchmark_pool(
+        pool_size: int, duration: float, delay: float, readers: int,
+        writers: int
+) -> dict:
+    aipr = AIPRoute(pool_size=pool_size)
+    try:
+        bridge = await aipr.add_device("benchbr0", "bridge")
+        ports = [
+                await aipr.add_device(
+                        f"bench{i}", "veth", peer=f"bench{i}p"
+                ) for i in range(writers)
+        ]
+
+        def slow_set_master(ipr, device_id, master_id):
+            aipr._set_master(ipr, device_id, master_id)
+            # hold the socket, like a kernel busy with a large bridge
+            time.sleep(delay)
+
+        latencies = []
+        writes = 0
+        deadline = time.perf_counter() + duration
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await aipr.get_stats(1)
+                latencies.append(time.perf_counter() - started)
+
+        async def writer(port):
+            nonlocal writes
+            master = bridge
+            while time.perf_counter() < deadline:
+                await aipr._run(slow_set_master, port, master)
+                master = 0 if master else bridge
+                writes += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(
+                *(reader() for _ in range(readers)),
+                *(writer(port) for port in ports)
+        )
+        elapsed = time.perf_counter() - started
+
+        for i in range(writers):
+            await aipr.delete_device(f"bench{i}")
+        await aipr.delete_device("benchbr0")
+
+    finally:
+        aipr.close()
+
+    latencies.sort()
+    return {
+            "reads_per_sec": len(latencies) / elapsed,
+            "writes_per_sec": writes / elapsed,
+            "ops_per_sec": (len(latencies) + writes) / elapsed,
+            "p50_latency": latencies[len(latencies) // 2],
+            "p99_latency": latencies[int(len(latencies) * 0.99)],
+            "max_latency": latencies[-1],
+    }
+
+
+def benchmark_pool(
+        duration: float = 2.0,
+        delay: float = 0.01,
+        readers: int = 8,
+        writers: int = 2,
+        pool_sizes=(1, DEFAULT_POOL_SIZE)
+) -> dict:
+    """Measures the throughput of a mixed workload: readers calling
+    get_stats on the loopback interface, and writers each moving a veth
+    in and out of a bridge with set_master, taking delay seconds each
+    time, all running concurrently for duration seconds.
+
+    This must already be running in a scratch network namespace.
+
+    Returns:
+        a dictionary of pool size: a dictionary of the reads, writes and
+        operations per second, and the latency percentiles of get_stats
+    """
+
+    return {
+            pool_size: asyncio.run(
+                    _benchmark_pool(
+                            pool_size, duration, delay, readers, writers
+                    )
             )
+            for pool_size in pool_sizes
+    }
+
+
+def main(argv):
+    duration = float(argv[0]) if argv else 2.0
+    delay = float(argv[1]) if len(argv) > 1 else 0.01
+    readers = int(argv[2]) if len(argv) > 2 else 8
+    writers = int(argv[3]) if len(argv) > 3 else 2
+
+    # run in a new network namespace, so nothing here is disturbed
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.unshare(rtnl.CLONE_NEWNET) != 0:
+        raise OSError(ctypes.get_errno(), "Failed to create a namespace")
+
+    print(
+            f"{readers} get_stats readers and {writers} set_master writers"
+            f" taking {delay * 1e3:.0f}ms each"
+    )
+    for pool_size, result in benchmark_pool(
+            duration, delay, readers, writers
+    ).items():
+        print(
+                f"pool of {pool_size}: {result['ops_per_sec']:7.0f} ops/s"
+                f" ({result['reads_per_sec']:.0f} reads/s,"
+                f" {result['writes_per_sec']:.0f} writes/s),"
+                f" get_stats p50 {result['p50_latency'] * 1e6:.0f} us,"
+                f" p99 {result['p99_latency'] * 1e6:.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,14 +1,15 @@
 #!/usr/bin/python
-# Copyright: 2022-2025, CCX Technologies
+# Copyright: 2022-2026, CCX Technologies
 
 import socket
 import time
 import asyncio
-from struct import pack, unpack
 
 import netaddr
 import async_timeout
 
+from . import codec
+
 READ_SIZE = 1024
 
 
@@ -28,21 +29,13 @@ async def arpreq(
         # it doesn't understand socket.AF_RAW / socket.SOCK_RAW
         loop = asyncio.get_event_loop()
 
-        frame_list = [
-                pack('!6B',
-                     *(0xFF, ) * 6),
-                _socket.getsockname()[4],
-                pack('!H', 0x0806),
-                pack('!HHBB', 0x0001, 0x0800, 0x0006, 0x0004),
-                pack('!H', 0x0001),
-                _socket.getsockname()[4],
-                pack('!4B', *src_ipaddr.words),
-                pack('!6B',
-                     *(0, ) * 6),
-                pack('!4B', *dst_ipaddr.words)
-        ]
+        hw_addr = _socket.getsockname()[4]
+        dst_pt = bytes(dst_ipaddr.packed)
 
-        frame: bytes = b''.join(frame_list)
+        frame: bytes = codec.pack_arp(
+                codec.ARPOP_REQUEST, hw_addr, bytes(src_ipaddr.packed),
+                b'\0' * 6, dst_pt, b'\xff' * 6
+        )
 
         _socket.send(frame)
         send_time = time.time()
@@ -56,27 +49,12 @@ async def arpreq(
 
             recv_time = time.time()
 
-            proto_type = int.from_bytes(frame[12:14], "big")
-            if proto_type != 0x0806:
-                continue
-
-            op = int.from_bytes(frame[20:22], "big")
-            if op != 2:
+            arp = codec.parse_arp(frame)
+            if arp is None or arp[0] != codec.ARPOP_REPLY:
                 continue
 
-            arp_headers = frame[18:20]
-            hw_size, pt_size = [
-                    int.from_bytes(h, "big")
-                    for h in unpack('!1s1s', arp_headers)
-            ]
-            total_addresses_byte = hw_size * 2 + pt_size * 2
-            arp_addrs = frame[22:22 + total_addresses_byte]
-            src_hw, src_pt, _, _ = unpack(
-                    '!%ss%ss%ss%ss' % (hw_size, pt_size, hw_size, pt_size),
-                    arp_addrs
-            )
-
-            if src_pt == pack('!4B', *dst_ipaddr.words):
+            _, src_hw, src_pt, _, _ = arp
+            if src_pt == dst_pt:
                 return netaddr.EUI(int.from_bytes(src_hw, "big"))
 
             if (recv_time - send_time) > (timeout + 2):
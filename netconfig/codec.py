@@ -0,0 +1,345 @@
+#!/usr/bin/python
+# Copyright: 2026, CCX Technologies
+"""Precompiled structures and offset based parsers for netlink and ARP.
+
+The iterators work on offsets into the original buffer so that no
+intermediate slices are created while walking messages and attributes,
+nested attributes are walked by passing the offsets of the parent.
+"""
+
+import sys
+import time
+import struct
+
+# =================== from linux headers ========================
+
+NLMSG_ALIGNTO = 4
+
+NLMSG_NOOP = 0x1  # Nothing
+NLMSG_ERROR = 0x2  # Error
+NLMSG_DONE = 0x3  # End of a dump
+NLMSG_OVERRUN = 0x4  # Data lost
+
+NLA_F_NESTED = 1 << 15
+NLA_F_NET_BYTEORDER = 1 << 14
+NLA_TYPE_MASK = ~(NLA_F_NESTED | NLA_F_NET_BYTEORDER) & 0xFFFF
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+
+ARPHRD_ETHER = 1
+
+ARPOP_REQUEST = 1
+ARPOP_REPLY = 2
+
+# ===============================================================
+
+NLMSGHDR = struct.Struct("=LHHLL")
+NLMSGERR = struct.Struct("=i")
+RTATTR = struct.Struct("=HH")
+IFINFOMSG = struct.Struct("=BxHiII")
+RTMSG = struct.Struct("=BBBBBBBBI")
+IFADDRMSG = struct.Struct("=BBBBI")
+NDMSG = struct.Struct("=BxxxiHBB")
+NDA_CACHEINFO = struct.Struct("=LLLL")
+IF_STATS_MSG = struct.Struct("=BxxxII")
+TCMSG = struct.Struct("=BxxxiIII")
+GNET_STATS_BASIC = struct.Struct("=QI")
+GNET_STATS_RATE_EST = struct.Struct("=II")
+GNET_STATS_QUEUE = struct.Struct("=IIIII")
+U32_SEL = struct.Struct("=BBBx12x")
+U32_KEY = struct.Struct("!II")
+U32_KEY_OFF = struct.Struct("=ii")
+
+ETHHDR = struct.Struct("!6s6sH")
+ARPHDR = struct.Struct("!HHBBH")
+ARP_IPV4 = struct.Struct("!6s4s6s4s")
+
+U8 = struct.Struct("=B")
+U16 = struct.Struct("=H")
+U32 = struct.Struct("=L")
+U64 = struct.Struct("=Q")
+S32 = struct.Struct("=i")
+BE16 = struct.Struct("!H")
+
+_PADDING = (b"", b"\0\0\0", b"\0\0", b"\0")
+
+
+def align(length: int) -> int:
+    return (length + NLMSG_ALIGNTO - 1) & ~(NLMSG_ALIGNTO - 1)
+
+
+def iter_nlmsg(data, offset: int = 0, end: int | None = None):
+    """Iterates over the netlink messages in a buffer.
+
+    Yields:
+        tuples of (msg_type, flags, seq, pid, payload_offset, msg_end)
+    """
+
+    if end is None:
+        end = len(data)
+
+    while offset + NLMSGHDR.size <= end:
+        msg_len, msg_type, flags, seq, pid = NLMSGHDR.unpack_from(
+                data, offset
+        )
+
+        # This check comes from NLMSG_OK
+        if msg_len < NLMSGHDR.size or offset + msg_len > end:
+            break
+
+        yield (
+                msg_type, flags, seq, pid, offset + NLMSGHDR.size,
+                offset + msg_len
+        )
+
+        offset += align(msg_len)
+
+
+def iter_rtattr(data, offset: int, end: int):
+    """Iterates over the attributes between two offsets.
+
+    Yields:
+        tuples of (rta_type, data_offset, data_end), with the nested and
+        byte order flags masked out of rta_type
+    """
+
+    while offset + RTATTR.size <= end:
+        rta_len, rta_type = RTATTR.unpack_from(data, offset)
+
+        # This check comes from RTA_OK
+        if rta_len < RTATTR.size or offset + rta_len > end:
+            break
+
+        yield (
+                rta_type & NLA_TYPE_MASK, offset + RTATTR.size,
+                offset + rta_len
+        )
+
+        offset += align(rta_len)
+
+
+def rtattr_offsets(data, offset: int, end: int) -> dict:
+    """Returns a dictionary of rta_type: (data_offset, data_end)."""
+
+    return {
+            rta_type: (start, stop)
+            for rta_type, start, stop in iter_rtattr(data, offset, end)
+    }
+
+
+def get_string(data, start: int, end: int) -> str:
+    value = bytes(data[start:end])
+    return value.split(b"\0", 1)[0].decode("utf-8")
+
+
+def get_u32(data, start: int, end: int) -> int:
+    return U32.unpack_from(data, start)[0]
+
+
+def nlmsg_error(data, payload_offset: int) -> int:
+    """Returns the positive errno from an NLMSG_ERROR, 0 for an ACK."""
+
+    return -NLMSGERR.unpack_from(data, payload_offset)[0]
+
+
+def pack_nlmsg(
+        msg_type: int, flags: int, seq: int, pid: int, payload: bytes
+) -> bytes:
+    return NLMSGHDR.pack(
+            NLMSGHDR.size + len(payload), msg_type, flags, seq, pid
+    ) + payload
+
+
+def pack_rtattr(rta_type: int, payload: bytes) -> bytes:
+    rta_len = RTATTR.size + len(payload)
+    return RTATTR.pack(rta_len, rta_type) + payload + _PADDING[rta_len % 4]
+
+
+def pack_nested(rta_type: int, *attrs: bytes) -> bytes:
+    return pack_rtattr(rta_type | NLA_F_NESTED, b"".join(attrs))
+
+
+def pack_string(rta_type: int, value: str) -> bytes:
+    return pack_rtattr(rta_type, value.encode("utf-8") + b"\0")
+
+
+def pack_u32(rta_type: int, value: int) -> bytes:
+    return pack_rtattr(rta_type, U32.pack(value))
+
+
+def pack_ifinfomsg(
+        family: int = 0,
+        ifi_type: int = 0,
+        index: int = 0,
+        flags: int = 0,
+        change: int = 0
+) -> bytes:
+    return IFINFOMSG.pack(family, ifi_type, index, flags, change)
+
+
+def pack_rtmsg(
+        family: int = 0,
+        dst_len: int = 0,
+        src_len: int = 0,
+        tos: int = 0,
+        table: int = 0,
+        protocol: int = 0,
+        scope: int = 0,
+        rtm_type: int = 0,
+        flags: int = 0
+) -> bytes:
+    return RTMSG.pack(
+            family, dst_len, src_len, tos, table, protocol, scope, rtm_type,
+            flags
+    )
+
+
+def pack_ifaddrmsg(
+        family: int = 0,
+        prefixlen: int = 0,
+        flags: int = 0,
+        scope: int = 0,
+        index: int = 0
+) -> bytes:
+    return IFADDRMSG.pack(family, prefixlen, flags, scope, index)
+
+
+def pack_ndmsg(
+        family: int = 0,
+        index: int = 0,
+        state: int = 0,
+        flags: int = 0,
+        ndm_type: int = 0
+) -> bytes:
+    return NDMSG.pack(family, index, state, flags, ndm_type)
+
+
+def pack_if_stats_msg(
+        family: int = 0, index: int = 0, filter_mask: int = 0
+) -> bytes:
+    return IF_STATS_MSG.pack(family, index, filter_mask)
+
+
+def pack_tcmsg(
+        family: int = 0,
+        index: int = 0,
+        handle: int = 0,
+        parent: int = 0,
+        info: int = 0
+) -> bytes:
+    return TCMSG.pack(family, index, handle, parent, info)
+
+
+def pack_arp(
+        op: int, src_hw: bytes, src_ip: bytes, dst_hw: bytes, dst_ip: bytes,
+        eth_dst: bytes
+) -> bytes:
+    """Builds an Ethernet frame containing an IPv4 ARP packet."""
+
+    return (
+            ETHHDR.pack(eth_dst, src_hw, ETH_P_ARP) +
+            ARPHDR.pack(ARPHRD_ETHER, ETH_P_IP, 6, 4, op) +
+            ARP_IPV4.pack(src_hw, src_ip, dst_hw, dst_ip)
+    )
+
+
+def parse_arp(frame):
+    """Parses an Ethernet frame containing an ARP packet.
+
+    Returns:
+        a tuple of (op, src_hw, src_pt, dst_hw, dst_pt) or None if the
+        frame isn't an ARP packet
+    """
+
+    if len(frame) < ETHHDR.size + ARPHDR.size:
+        return None
+
+    if BE16.unpack_from(frame, 12)[0] != ETH_P_ARP:
+        return None
+
+    _, _, hw_size, pt_size, op = ARPHDR.unpack_from(frame, ETHHDR.size)
+
+    offset = ETHHDR.size + ARPHDR.size
+    if len(frame) < offset + 2 * (hw_size + pt_size):
+        return None
+
+    src_hw = bytes(frame[offset:offset + hw_size])
+    offset += hw_size
+    src_pt = bytes(frame[offset:offset + pt_size])
+    offset += pt_size
+    dst_hw = bytes(frame[offset:offset + hw_size])
+    offset += hw_size
+    dst_pt = bytes(frame[offset:offset + pt_size])
+
+    return op, src_hw, src_pt, dst_hw, dst_pt
+
+
+def _benchmark_dump(count: int) -> bytes:
+    # like a link dump: an ifinfomsg, a name, some u32s and a nested
+    # attribute two levels deep, as IFLA_LINKINFO has
+    return b"".join(
+            pack_nlmsg(
+                    16, 0x2, 1, 0,
+                    pack_ifinfomsg(index=i, flags=1) +
+                    pack_string(3, f"bench{i}") + pack_u32(4, 1500) +
+                    pack_u32(13, 1000) + pack_nested(
+                            18, pack_string(1, "vlan"),
+                            pack_nested(2, pack_rtattr(1, U16.pack(i & 0xFFF)))
+                    )
+            ) for i in range(count)
+    )
+
+
+def _walk(data, offset: int, end: int) -> int:
+    attrs = 0
+    for rta_type, start, stop in iter_rtattr(data, offset, end):
+        attrs += 1
+        if rta_type in (18, 2):
+            attrs += _walk(data, start, stop)
+
+    return attrs
+
+
+def benchmark(count: int = 100000) -> dict:
+    """Times walking a dump of count link messages, with every nested
+    attribute, and parsing count ARP replies.
+
+    Returns:
+        a dictionary of messages per second for "nlmsg" and "arp"
+    """
+
+    data = memoryview(_benchmark_dump(count))
+
+    started = time.perf_counter()
+    for _, _, _, _, offset, end in iter_nlmsg(data):
+        _walk(data, offset + IFINFOMSG.size, end)
+    nlmsg = count / (time.perf_counter() - started)
+
+    frame = pack_arp(
+            ARPOP_REPLY, b"\x02" * 6, b"\x0a\x00\x00\x01", b"\x02" * 6,
+            b"\x0a\x00\x00\x02", b"\xff" * 6
+    )
+
+    started = time.perf_counter()
+    for _ in range(count):
+        parse_arp(frame)
+    arp = count / (time.perf_counter() - started)
+
+    return {"nlmsg": nlmsg, "arp": arp}
+
+
+def main(argv):
+    counts = [int(arg) for arg in argv] or [10000, 100000, 1000000]
+
+    for count in counts:
+        result = benchmark(count)
+        print(
+                f"{count:>8} messages:"
+                f" nlmsg {result['nlmsg']:>10.0f} msgs/sec,"
+                f" arp {result['arp']:>10.0f} frames/sec"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
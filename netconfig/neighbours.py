@@ -0,0 +1,299 @@
+# Copyright: 2026, CCX Technologies
+
+import time
+import asyncio
+
+from . import codec
+from . import rtnl
+from .netlink import NetlinkTransport
+
+# =================== from linux headers ========================
+
+RTMGRP_NEIGH = 4
+
+RTM_NEWNEIGH = 28
+RTM_DELNEIGH = 29
+
+ENOBUFS = 105
+
+# ===============================================================
+
+# the kernel only sends events when a neighbour changes state, not each
+# time it's confirmed, so the confirmed times are refreshed this often
+RESYNC_INTERVAL = 30.0
+# and never more often than this, however fresh they're asked to be
+MIN_RESYNC_INTERVAL = 1.0
+
+
+class NeighbourCache:
+    """The neighbour (ARP / NDP) tables of every interface, in memory.
+
+    The tables are dumped once when started, then kept current from
+    RTM_NEWNEIGH / RTM_DELNEIGH events, and dumped again every
+    resync_interval seconds or if events are lost (ENOBUFS). The interval
+    is shortened by refresh, for callers that need fresher confirmed
+    times. Entries are indexed by interface index, MAC address and IP
+    address.
+
+    Args:
+        loop: the event loop, defaults to the current loop
+        resync_interval: seconds between full dumps
+    """
+
+    def __init__(self, loop=None, resync_interval=RESYNC_INTERVAL):
+        self.loop = loop
+        self.resync_interval = resync_interval
+
+        # index: {address: (mac, state, confirmed, received)}
+        self.entries: dict = {}
+        # mac: set of (index, address)
+        self.macs: dict = {}
+        # address: set of index
+        self.addresses: dict = {}
+
+        self.resyncs = 0
+        self.resynced = None
+        self.transport = None
+        self._task = None
+        self._ready = None
+        self._wakeup = None
+        self._waiters: list = []
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Subscribes to neighbour events and waits for the first dump."""
+
+        if not self.running:
+            self.close()
+
+            loop = asyncio.get_event_loop() if self.loop is None else self.loop
+            self._ready = loop.create_future()
+            self.transport = NetlinkTransport(RTMGRP_NEIGH, loop=loop)
+            self._task = loop.create_task(self._run())
+
+        await asyncio.shield(self._ready)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.cancel()
+
+        self.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.macs.clear()
+        self.addresses.clear()
+
+    def _remove(self, index: int, address: str):
+        entry = self.entries.get(index, {}).pop(address, None)
+        if entry is None:
+            return
+
+        if not self.entries[index]:
+            del self.entries[index]
+
+        indexes = self.addresses.get(address)
+        if indexes is not None:
+            indexes.discard(index)
+            if not indexes:
+                del self.addresses[address]
+
+        mac = entry[0]
+        if mac is not None:
+            keys = self.macs.get(mac)
+            if keys is not None:
+                keys.discard((index, address))
+                if not keys:
+                    del self.macs[mac]
+
+    def _store(self, neighbour: dict, received: float):
+        index, address, mac = (
+                neighbour["index"], neighbour["dst"], neighbour["lladdr"]
+        )
+        if address is None:
+            return
+
+        self._remove(index, address)
+
+        self.entries.setdefault(index, {})[address] = (
+                mac, neighbour["state"], neighbour["confirmed"], received
+        )
+        self.addresses.setdefault(address, set()).add(index)
+        if mac is not None:
+            self.macs.setdefault(mac, set()).add((index, address))
+
+    def _apply(self, data: bytes, received: float):
+        for msg_type, _, _, _, offset, end in codec.iter_nlmsg(data):
+            if msg_type == RTM_NEWNEIGH:
+                self._store(rtnl.parse_neighbour(data, offset, end), received)
+
+            elif msg_type == RTM_DELNEIGH:
+                neighbour = rtnl.parse_neighbour(data, offset, end)
+                self._remove(neighbour["index"], neighbour["dst"])
+
+    async def _resync(self):
+        # events that arrive during the dump are buffered by the
+        # transport, and applied on top of it afterwards
+        for attempt in range(1, rtnl.DUMP_ATTEMPTS + 1):
+            self.clear()
+
+            try:
+                async for neighbour in rtnl.iter_neighbours(loop=self.loop):
+                    self._store(neighbour, time.monotonic())
+                break
+
+            except InterruptedError:
+                if attempt >= rtnl.DUMP_ATTEMPTS:
+                    # keep what was dumped, the events will catch up
+                    break
+
+        self.resyncs += 1
+
+    async def _receive(self, loop) -> list | None:
+        """Waits for events until the next resync is due, or refresh
+        asks for one.
+
+        Returns:
+            a list of (received, datagram), or None to resync
+        """
+
+        timeout = self.resynced + self.resync_interval - loop.time()
+        if timeout <= 0:
+            return None
+
+        self._wakeup = loop.create_future()
+        recv = loop.create_task(self.transport.recv_timestamped())
+        try:
+            await asyncio.wait(
+                    (recv, self._wakeup),
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            if not recv.done():
+                recv.cancel()
+                await asyncio.wait((recv, ))
+
+        if recv.cancelled():
+            # woken up or timed out, so check if a resync is due
+            return []
+
+        try:
+            return recv.result()
+        except OSError as exc:
+            if exc.errno == ENOBUFS:
+                # events were lost, so dump everything again
+                self.transport.drain()
+                return None
+
+            raise
+
+    async def _run(self):
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+
+        try:
+            while True:
+                await self._resync()
+                self.resynced = loop.time()
+
+                if not self._ready.done():
+                    self._ready.set_result(None)
+
+                waiters, self._waiters = self._waiters, []
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+                while True:
+                    datagrams = await self._receive(loop)
+                    if datagrams is None:
+                        break
+
+                    for received, data in datagrams:
+                        self._apply(data, received)
+
+        except Exception as exc:
+            if not self._ready.done():
+                self._ready.set_exception(exc)
+            for waiter in self._waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            raise
+
+        finally:
+            self.clear()
+
+    async def refresh(self, max_age: float):
+        """Keeps the confirmed times within max_age seconds of the
+        kernel's, by dumping at least that often from now on, and now if
+        the last dump is older.
+
+        The kernel doesn't send an event when a neighbour is confirmed,
+        so without this a stale_timeout shorter than the resync interval
+        would report neighbours that are still being confirmed as stale.
+        """
+
+        await self.start()
+
+        max_age = max(max_age, MIN_RESYNC_INTERVAL)
+        self.resync_interval = min(self.resync_interval, max_age)
+
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+        if loop.time() - self.resynced <= max_age:
+            return
+
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+        await waiter
+
+    def get_arp_cache(self, device_id: int, stale_timeout: int = 60) -> dict:
+        """Returns the neighbours of an interface, confirmed within the
+        last stale_timeout seconds, like AIPRoute._get_arp_cache but
+        without a dump. The confirmed times are aged from when each
+        entry was received.
+
+        Returns:
+            a dictionary of mac: ip address
+        """
+
+        now = time.monotonic()
+        cache = {}
+
+        for address, (mac, _, confirmed, received) in self.entries.get(
+                device_id, {}
+        ).items():
+            if mac is None or confirmed is None:
+                continue
+
+            if 0 < confirmed + now - received < stale_timeout:
+                cache[mac] = address
+
+        return cache
+
+    def find_mac(self, mac: str) -> list:
+        """Returns a list of (index, ip address) with a MAC address."""
+
+        return sorted(self.macs.get(mac.lower(), ()))
+
+    def find_address(self, address: str) -> list:
+        """Returns a list of (index, mac) for an IP address."""
+
+        return sorted(
+                (index, self.entries[index][address][0])
+                for index in self.addresses.get(address, ())
+        )
@@ -1,19 +1,27 @@
 # Copyright: 2017-2026, CCX Technologies
 
+import math
+import time
 import socket
-import struct
+import collections
 import asyncio
 
 from .iface import Iface
+from . import codec
 
 BUFFER_SIZE = 1048576
 READ_SIZE = 65535
 
+# datagrams read per readiness callback, and buffered before pausing
+READ_BUDGET = 256
+MAX_PENDING = 4096
+
 # == from linux headers
 
 RTMGRP_LINK = 1
 
 RTM_NEWLINK = 16
+RTM_DELLINK = 17
 
 NLMSG_NOOP = 0x1  # Nothing
 NLMSG_ERROR = 0x2  # Error
@@ -24,106 +32,992 @@ IFF_LOWER_UP = 1 << 16
 IFLA_IFNAME = 3
 
 
-async def monitor_state_change(queues):
-    """Monitors for up / lower_up state changes on network interfaces.
+class NetlinkTransport:
+    """A non-blocking netlink socket driven by the event loop.
 
-    Loads a message dictionary into queues, with keys for different events.
-    Currently support "up", "lower_up", and "start".
+    The socket is registered with loop.add_reader and every readiness
+    callback drains all of the pending datagrams, rather than scheduling
+    a new future for each one like loop.sock_recv. Reading pauses while
+    too many datagrams are buffered, so a slow consumer still overflows
+    the kernel's buffer (ENOBUFS) instead of growing without limit.
 
     Args:
-        queues: a dictionary of queues, one queue for each interface
-            to track, the keys are the interface names, ie.
-            { "eth0": asyncio.Queue(), "eth1": asyncio.Queue() }
+        groups: bitmask of multicast groups to join
+        protocol: netlink protocol family
+        sock: an already bound socket to use instead of opening one
+        loop: the event loop, defaults to the current loop
+        max_pending: the most datagrams to buffer before pausing
     """
 
-    with socket.socket(
-            socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE
-    ) as skt:
+    def __init__(
+            self,
+            groups=0,
+            protocol=socket.NETLINK_ROUTE,
+            sock=None,
+            loop=None,
+            max_pending=MAX_PENDING
+    ):
+        self.loop = asyncio.get_event_loop() if loop is None else loop
+        self.max_pending = max_pending
+
+        if sock is None:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, protocol)
+            try:
+                sock.bind((0, groups))
+                sock.setsockopt(
+                        socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE
+                )
+            except OSError:
+                sock.close()
+                raise
+
+        sock.setblocking(False)
+        self.sock = sock
 
-        skt.setblocking(0)
-        skt.bind((0, RTMGRP_LINK))
-        skt.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
+        self._pending = collections.deque()
+        self._exception = None
+        self._waiter = None
+        self._reading = False
 
-        start_sent = False
+        self._resume_reading()
 
-        # I would like to use something like asyncio.open_connection but
-        # it doesn't understand socket.AF_NETLINK / socket.SOCK_RAW
-        loop = asyncio.get_event_loop()
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
-        while True:
+    @property
+    def closed(self):
+        return self.sock.fileno() < 0
+
+    def _resume_reading(self):
+        if not self._reading and not self.closed:
+            self.loop.add_reader(self.sock.fileno(), self._read_ready)
+            self._reading = True
+
+    def _pause_reading(self):
+        if self._reading:
+            self.loop.remove_reader(self.sock.fileno())
+            self._reading = False
+
+    def _read_ready(self):
+        for _ in range(min(READ_BUDGET, self.max_pending)):
             try:
-                data = await loop.sock_recv(skt, READ_SIZE)
+                data = self.sock.recv(READ_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
             except OSError as exc:
-                if exc.errno == 105:
-                    # No buffer space so drain and reset start_sent to re-sync
-                    try:
-                        while True:
-                            skt.recv(READ_SIZE)
-                    except (BlockingIOError, OSError):
-                        pass
-
-                    start_sent = False
-                    await asyncio.sleep(3.2)
-                    continue
+                self._exception = exc
+                break
 
-                raise
+            self._pending.append((time.monotonic(), data))
 
-            msg_len, msg_type, flags, _, _ = struct.unpack("=LHHLL", data[:16])
+        if len(self._pending) >= self.max_pending:
+            self._pause_reading()
 
-            if msg_type == NLMSG_NOOP:
-                continue
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
 
-            if msg_type == NLMSG_ERROR:
-                raise RuntimeError("Netlink Message Error")
+    async def recv(self) -> list:
+        """Waits for and returns all the datagrams received so far.
 
-            if msg_type != RTM_NEWLINK:
-                continue
+        Errors from the socket (like ENOBUFS) are raised once the
+        datagrams received before them have been returned.
+        """
 
-            data = data[16:]
-            _, _, _, _, flags, _ = struct.unpack("=BBHiII", data[:16])
+        return [data for _, data in await self.recv_timestamped()]
 
-            messages = {}
-            if flags & IFF_LOWER_UP:
-                messages["lower_up"] = True
-            else:
-                messages["lower_up"] = False
+    async def recv_timestamped(self) -> list:
+        """Like recv but returns a list of (timestamp, datagram) tuples.
+
+        The timestamp is time.monotonic() when the datagram was read from
+        the socket.
+        """
+
+        while not self._pending:
+            if self._exception is not None:
+                exc, self._exception = self._exception, None
+                raise exc
+
+            if self.closed:
+                raise ConnectionError("Netlink transport is closed")
+
+            self._waiter = self.loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        datagrams = list(self._pending)
+        self._pending.clear()
+        self._resume_reading()
+
+        return datagrams
+
+    def send(self, data: bytes) -> int:
+        return self.sock.send(data)
+
+    def drain(self):
+        """Discards everything buffered here and on the socket."""
+
+        self._pending.clear()
+        self._exception = None
+
+        try:
+            while True:
+                self.sock.recv(READ_SIZE)
+        except (BlockingIOError, OSError):
+            pass
+
+        self._resume_reading()
+
+    def close(self):
+        if self.closed:
+            return
+
+        self._pause_reading()
+        self.sock.close()
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+def _parse_link_messages(data):
+    """Yields (msg_type, index, flags, name) for each link message."""
+
+    for msg_type, _, _, _, offset, end in codec.iter_nlmsg(data):
+        if msg_type == NLMSG_NOOP:
+            continue
+
+        if msg_type == NLMSG_ERROR:
+            raise RuntimeError("Netlink Message Error")
+
+        if msg_type not in (RTM_NEWLINK, RTM_DELLINK):
+            continue
+
+        _, _, index, flags, _ = codec.IFINFOMSG.unpack_from(data, offset)
+
+        name = ""
+        for rta_type, start, stop in codec.iter_rtattr(
+                data, offset + codec.IFINFOMSG.size, end
+        ):
+            if rta_type == IFLA_IFNAME:
+                name = codec.get_string(data, start, stop)
+                break
+
+        yield msg_type, index, flags, name
+
+
+def _parse_links(data):
+    for msg_type, _, flags, iface in _parse_link_messages(data):
+        if msg_type != RTM_NEWLINK:
+            continue
+
+        yield iface, {
+                "lower_up": bool(flags & IFF_LOWER_UP),
+                "up": bool(flags & IFF_UP),
+        }
+
+
+class LinkCache:
+    """Interface name and index mappings kept current by link events.
+
+    The cache only holds what it has learnt from RTM_NEWLINK / RTM_DELLINK
+    events, or from lookups passed to learn, so a miss means the caller
+    has to ask the kernel. If events are lost (ENOBUFS) the cache is
+    cleared and re-learnt.
+
+    It can also be used to wait for the event confirming a change to
+    an interface, see wait_for.
+
+    Args:
+        loop: the event loop, defaults to the current loop
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.indexes = {}
+        self.names = {}
+        self.generation = 0
+
+        self.transport = None
+        self._task = None
+        self._waiters = {}
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Subscribes to link events, must be called from the loop."""
+
+        if self.running:
+            return
+
+        self.close()
+
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+        self.transport = NetlinkTransport(RTMGRP_LINK, loop=loop)
+        self._task = loop.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        self.clear()
+
+    def clear(self):
+        self.indexes.clear()
+        self.names.clear()
+        self.generation += 1
+
+        # events may have been lost, so the waiters have to check for
+        # themselves
+        for waiters in self._waiters.values():
+            for future, _, _ in waiters:
+                if not future.done():
+                    future.set_result(None)
+        self._waiters.clear()
+
+    def wait_for(
+            self, name: str, msg_type=RTM_NEWLINK, index: int | None = None
+    ) -> asyncio.Future:
+        """Returns a future for the next matching link event.
+
+        Call this before making the change so the event can't be missed,
+        and call discard once done with the future.
+
+        Args:
+            name: the interface name the event must have
+            msg_type: RTM_NEWLINK or RTM_DELLINK
+            index: if set the interface index the event must have
+
+        Returns:
+            a future with the index from the event as its result, or
+            None if events were lost and the caller has to check
+        """
+
+        loop = asyncio.get_event_loop() if self.loop is None else self.loop
+        future = loop.create_future()
+        self._waiters.setdefault(name, []).append((future, msg_type, index))
+        return future
+
+    def discard(self, name: str, future: asyncio.Future):
+        waiters = [
+                w for w in self._waiters.get(name, ()) if w[0] is not future
+        ]
+
+        if waiters:
+            self._waiters[name] = waiters
+        else:
+            self._waiters.pop(name, None)
+
+        if not future.done():
+            future.cancel()
+
+    def _wake(self, msg_type, index, name):
+        waiters = self._waiters.get(name)
+        if not waiters:
+            return
+
+        remaining = []
+        for waiter in waiters:
+            future, _msg_type, _index = waiter
+            if future.done():
+                continue
 
-            if flags & IFF_UP:
-                messages["up"] = True
+            if _msg_type == msg_type and _index in (None, index):
+                future.set_result(index)
             else:
-                messages["up"] = False
+                remaining.append(waiter)
+
+        if remaining:
+            self._waiters[name] = remaining
+        else:
+            del self._waiters[name]
+
+    def get_index(self, name: str) -> int | None:
+        return self.indexes.get(name)
+
+    def get_name(self, index: int) -> str | None:
+        return self.names.get(index)
+
+    def learn(self, name: str, index: int, generation: int):
+        """Adds the result of a lookup made at generation.
+
+        It's dropped if any link event arrived since then, as the
+        result may already be stale.
+        """
+
+        if self.running and generation == self.generation:
+            self._update(RTM_NEWLINK, index, name)
+
+    def forget(self, name: str | None = None, index: int | None = None):
+        """Drops what's known about an interface, by name and / or
+        index, ie. after changing it without waiting for the event.
+
+        Returns:
+            the index the name had, or index
+        """
+
+        self.generation += 1
+
+        if name is not None:
+            known = self.indexes.pop(name, None)
+            if index is None:
+                index = known
+            if known is not None and self.names.get(known) == name:
+                del self.names[known]
+
+        if index is not None:
+            self._update(RTM_DELLINK, index, None)
+
+        return index
+
+    def _update(self, msg_type, index, name):
+        old_name = self.names.pop(index, None)
+        if old_name is not None and self.indexes.get(old_name) == index:
+            del self.indexes[old_name]
+
+        if msg_type == RTM_NEWLINK and name:
+            self.names[index] = name
+            self.indexes[name] = index
+
+    def _handle(self, msg_type, index, flags, name):
+        self.generation += 1
+        self._update(msg_type, index, name)
+        self._wake(msg_type, index, name)
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    datagrams = await self.transport.recv()
+                except OSError as exc:
+                    if exc.errno == 105:
+                        # events were lost, so start again from nothing
+                        self.transport.drain()
+                        self.clear()
+                        continue
+
+                    raise
+
+                for data in datagrams:
+                    for link in _parse_link_messages(data):
+                        self._handle(*link)
+
+        finally:
+            self.clear()
+
+
+class Histogram:
+    """A histogram with power of two buckets.
+
+    Args:
+        scale: multiplier applied to values before bucketing, ie. 1e6
+            to bucket durations in seconds by microsecond
+        buckets: number of buckets, larger values go in the last bucket
+    """
+
+    def __init__(self, scale=1.0, buckets=32):
+        self.scale = scale
+        self.counts = [0] * buckets
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def record(self, value):
+        bucket = min(
+                int(value * self.scale).bit_length(),
+                len(self.counts) - 1
+        )
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += value
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the percentile."""
+
+        if not self.count:
+            return None
+
+        target = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) / self.scale, self.maximum)
+
+        return self.maximum
+
+    def stats(self) -> dict:
+        return {
+                "count": self.count,
+                "mean": self.total / self.count if self.count else None,
+                "min": self.minimum,
+                "max": self.maximum,
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "p99": self.percentile(99),
+                "buckets": [
+                        ((1 << bucket) / self.scale, count)
+                        for bucket, count in enumerate(self.counts) if count
+                ],
+        }
+
+
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_COALESCE = "coalesce"
+
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE)
+
+# the most messages a "block" subscription has waiting in its backlog,
+# and in an unbounded queue
+MAX_BACKLOG = 1024
+# how often a full backlog checks for space in an unbounded queue
+BACKLOG_POLL_INTERVAL = 0.05
+
+
+class Subscription:
+    """A single consumer of the state messages for one interface.
+
+    The policy decides what happens when the consumer falls behind:
+        "block": keep every message while the queue is full, in a
+            backlog of up to MAX_BACKLOG messages that a task of the
+            subscription's own puts in the queue as it has space, so the
+            monitor never waits; once the backlog is full new messages
+            are merged into its newest one, like "coalesce", and an
+            unbounded queue counts as full at MAX_BACKLOG messages
+        "drop_oldest": discard the oldest queued message
+        "coalesce": merge all pending messages into one, so the consumer
+            only ever sees the latest state
 
-            remaining = msg_len - 32
-            data = data[16:]
+    Args:
+        iface: name of the interface to track
+        policy: one of POLICY_BLOCK, POLICY_DROP_OLDEST or POLICY_COALESCE
+        maxsize: maximum queue size, 0 for unbounded
+        queue: an existing asyncio.Queue to deliver to, by default
+            a new queue of size maxsize is created
+    """
+
+    def __init__(self, iface, policy=POLICY_BLOCK, maxsize=0, queue=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown subscription policy {policy}")
+
+        self.iface = iface
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize) if queue is None else queue
+
+        # the messages for a "block" subscription waiting for space
+        self.backlog = collections.deque()
+        self._task = None
+
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0
+
+    @property
+    def lag(self):
+        return self.queue.qsize() + len(self.backlog)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def _discard(self):
+        message = self.queue.get_nowait()
+        self.queue.task_done()
+        return message
+
+    def put_nowait(self, message):
+        if self.policy == POLICY_DROP_OLDEST:
+            if self.queue.full():
+                self._discard()
+                self.dropped += 1
+
+        elif self.policy == POLICY_COALESCE:
+            pending = {}
+            while not self.queue.empty():
+                pending.update(self._discard())
+                self.coalesced += 1
+
+            pending.update(message)
+            message = pending
+
+        self.queue.put_nowait(message)
+        self.delivered += 1
+        self.max_lag = max(self.max_lag, self.lag)
+
+    async def put(self, message):
+        if self.policy != POLICY_BLOCK:
+            self.put_nowait(message)
+            return
+
+        await self.queue.put(message)
+        self.delivered += 1
+        self.max_lag = max(self.max_lag, self.lag)
+
+    def _full(self):
+        if self.queue.maxsize:
+            return self.queue.full()
+        return self.queue.qsize() >= MAX_BACKLOG
+
+    def deliver(self, message):
+        """Hands over a message without waiting, whatever the policy."""
+
+        if self.policy != POLICY_BLOCK or (
+                not self.backlog and not self._full()
+        ):
+            self.put_nowait(message)
+            return
+
+        if len(self.backlog) >= MAX_BACKLOG:
+            self.backlog[-1].update(message)
+            self.coalesced += 1
+        else:
+            self.backlog.append(message)
+            self.max_lag = max(self.max_lag, self.lag)
+
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(
+                    self._deliver_backlog()
+            )
+
+    async def _deliver_backlog(self):
+        try:
+            while self.backlog:
+                if not self.queue.maxsize:
+                    while self._full():
+                        await asyncio.sleep(BACKLOG_POLL_INTERVAL)
+
+                # only removed once it's in the queue, so a cancelled
+                # put doesn't lose it
+                await self.put(self.backlog[0])
+                self.backlog.popleft()
+
+        finally:
+            self._task = None
+
+    def close(self):
+        """Stops delivering the backlog."""
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+                "policy": self.policy,
+                "lag": self.lag,
+                "max_lag": self.max_lag,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+        }
+
+
+def _link_state(message):
+    return (message.get("up"), message.get("lower_up"))
+
+
+class Dampening:
+    """Hold-down timers and flap dampening for one interface.
+
+    A new state is only reported once it has been stable for the hold time,
+    if the link returns to the reported state before then nothing is sent.
+    Every transition also adds a penalty which decays exponentially, once
+    the penalty reaches suppress the interface is held until it has
+    decayed below reuse. Reported messages include a "suppressed" count
+    of the events that were absorbed since the previous report.
+
+    Args:
+        hold_up: seconds the link must be up before it is reported up
+        hold_down: seconds the link must be down before it is reported down
+        penalty: penalty added for each transition, 0 disables dampening
+        suppress: penalty at which reporting is suppressed
+        reuse: penalty below which reporting is allowed again
+        half_life: seconds for the penalty to decay by half
+        max_penalty: ceiling for the accumulated penalty
+    """
+
+    def __init__(
+            self,
+            hold_up=0.0,
+            hold_down=0.0,
+            penalty=0.0,
+            suppress=2000.0,
+            reuse=750.0,
+            half_life=15.0,
+            max_penalty=12000.0
+    ):
+        if reuse <= 0 or reuse > suppress:
+            raise ValueError("reuse must be between 0 and suppress")
+
+        self.hold_up = hold_up
+        self.hold_down = hold_down
+        self.penalty = penalty
+        self.suppress = suppress
+        self.reuse = reuse
+        self.half_life = half_life
+        self.max_penalty = max_penalty
+
+        self.current_penalty = 0.0
+        self.suppressed = False
+        self.reported = None
+        self.pending = None
+
+        self.transitions = 0
+        self.suppressed_events = 0
+
+        self._changed_at = 0.0
+        self._decayed_at = 0.0
+        self._since_report = 0
+
+    def _decay(self, now):
+        if self.current_penalty:
+            self.current_penalty *= 0.5**(
+                    (now - self._decayed_at) / self.half_life
+            )
+
+        self._decayed_at = now
+
+        if self.suppressed and self.current_penalty < self.reuse:
+            self.suppressed = False
+
+    def _deadline(self, now):
+        if all(_link_state(self.pending)):
+            deadline = self._changed_at + self.hold_up
+        else:
+            deadline = self._changed_at + self.hold_down
+
+        if self.suppressed:
+            deadline = max(
+                    deadline, now + self.half_life *
+                    math.log2(self.current_penalty / self.reuse)
+            )
+
+        return deadline
+
+    def update(self, message, now):
+        """Feeds in a new state message.
+
+        Returns:
+            a tuple of the message to send now (or None) and the time at
+            which settle should be called (or None if nothing is pending)
+        """
+
+        self._decay(now)
+        self._since_report += 1
+
+        state = _link_state(message)
+        if self.pending is not None:
+            current = _link_state(self.pending)
+        else:
+            current = self.reported
+
+        if state != current:
+            self._changed_at = now
+
+            if self.reported is not None:
+                self.transitions += 1
+
+                if self.penalty:
+                    self.current_penalty = min(
+                            self.current_penalty + self.penalty,
+                            self.max_penalty
+                    )
+
+                    if self.current_penalty >= self.suppress:
+                        self.suppressed = True
+
+        if state == self.reported:
+            self.pending = None
+            return None, None
+
+        self.pending = message
+        return self.settle(now)
+
+    def settle(self, now):
+        """Reports the pending state if it has settled.
+
+        Returns:
+            a tuple of the message to send now (or None) and the time at
+            which settle should be called again (or None)
+        """
+
+        self._decay(now)
+
+        if self.pending is None:
+            return None, None
 
-            iface = ""
+        if self.reported is not None:
+            deadline = self._deadline(now)
+            if deadline > now:
+                return None, deadline
 
-            while remaining:
-                rta_len, rta_type = struct.unpack("=HH", data[:4])
+        suppressed = self._since_report - 1
+        message = dict(self.pending, suppressed=suppressed)
+
+        self.suppressed_events += suppressed
+        self.reported = _link_state(self.pending)
+        self.pending = None
+        self._since_report = 0
+
+        return message, None
+
+    def stats(self) -> dict:
+        return {
+                "penalty": self.current_penalty,
+                "suppressed": self.suppressed,
+                "transitions": self.transitions,
+                "suppressed_events": self.suppressed_events,
+                "pending": self.pending is not None,
+        }
+
+
+class StateMonitor:
+    """Monitors for up / lower_up state changes on network interfaces.
 
-                # This check comes from RTA_OK
-                if rta_len < 4:
-                    break
+    Each interface can have any number of subscribers, each with its own
+    backpressure policy. The monitor never waits for a subscriber, a
+    "block" subscriber that falls behind has its messages delivered by
+    a task of its own, so a slow one doesn't delay the monitor or the
+    other subscribers.
 
-                rta_data = data[4:rta_len - 1]
+    Messages are dictionaries with keys for different events,
+    currently support "up", "lower_up", and "start". State messages also
+    include a "timestamp", the time.monotonic() at which the kernel's
+    message was read. Interfaces with dampening enabled only report
+    settled transitions, and those messages also include a "suppressed"
+    count.
 
-                increment = (rta_len + 4 - 1) & ~(4 - 1)
-                data = data[increment:]
-                remaining -= increment
+    Histograms are kept for the time taken to parse each datagram, the
+    time waiting to hand each message to the subscribers, the latency
+    from reading the kernel's message to handing it to the subscribers,
+    and the number of events handled per read.
 
-                if rta_type == IFLA_IFNAME:
-                    iface = rta_data.decode("utf-8")
+    Args:
+        sock: an already bound socket to read from instead of a new
+            netlink socket, ie. one end of a socketpair for replays
+    """
 
-            if iface in queues:
-                await queues[iface].put(messages)
+    def __init__(self, sock=None):
+        self.sock = sock
+        self.subscriptions = {}
+        self.dampening = {}
+
+        self.parse_time = Histogram(1e6)
+        self.put_wait = Histogram(1e6)
+        self.latency = Histogram(1e6)
+        self.events_per_read = Histogram()
+
+        self._timers = {}
+
+    def subscribe(
+            self, iface, policy=POLICY_BLOCK, maxsize=0, queue=None
+    ) -> Subscription:
+        subscription = Subscription(iface, policy, maxsize, queue)
+        self.subscriptions.setdefault(iface, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self.subscriptions.get(subscription.iface, [])
+
+        subscription.close()
+
+        try:
+            subscriptions.remove(subscription)
+        except ValueError:
+            return
+
+        if not subscriptions:
+            del self.subscriptions[subscription.iface]
+
+    def set_dampening(self, iface, **kwargs) -> Dampening:
+        """Enables hold-down / dampening for an interface.
+
+        The keyword arguments are passed to Dampening.
+        """
+
+        self.clear_dampening(iface)
+        self.dampening[iface] = Dampening(**kwargs)
+        return self.dampening[iface]
+
+    def clear_dampening(self, iface):
+        self._schedule(iface, None)
+        self.dampening.pop(iface, None)
+
+    def stats(self) -> dict:
+        return {
+                "subscriptions": {
+                        iface: [s.stats() for s in subscriptions]
+                        for iface, subscriptions in self.subscriptions.items()
+                },
+                "dampening": {
+                        iface: dampening.stats()
+                        for iface, dampening in self.dampening.items()
+                },
+                "parse_time": self.parse_time.stats(),
+                "put_wait": self.put_wait.stats(),
+                "latency": self.latency.stats(),
+                "events_per_read": self.events_per_read.stats(),
+        }
+
+    def reset_stats(self):
+        self.parse_time.reset()
+        self.put_wait.reset()
+        self.latency.reset()
+        self.events_per_read.reset()
+
+    def _publish(self, iface, message):
+        for subscription in self.subscriptions.get(iface, ()):
+            subscription.deliver(dict(message))
+
+    def _schedule(self, iface, deadline):
+        timer = self._timers.pop(iface, None)
+
+        if timer is not None:
+            if timer.when() == deadline:
+                self._timers[iface] = timer
+                return
+
+            timer.cancel()
+
+        if deadline is not None:
+            self._timers[iface] = asyncio.get_event_loop().call_at(
+                    deadline, self._settle, iface
+            )
+
+    def _settle(self, iface):
+        self._timers.pop(iface, None)
+
+        try:
+            dampening = self.dampening[iface]
+        except KeyError:
+            return
 
-            # Once the first message is sent the monitor is ready,
-            # so send start to all interfaces
-            if not start_sent:
-                for device in Iface.get_all():
-                    if device not in queues:
+        loop = asyncio.get_event_loop()
+        message, deadline = dampening.settle(loop.time())
+        self._schedule(iface, deadline)
+
+        if message is not None:
+            self._publish(iface, message)
+
+    def _dispatch(self, iface, message):
+        try:
+            dampening = self.dampening[iface]
+        except KeyError:
+            self._publish(iface, message)
+            return
+
+        message, deadline = dampening.update(
+                message,
+                asyncio.get_event_loop().time()
+        )
+        self._schedule(iface, deadline)
+
+        if message is not None:
+            self._publish(iface, message)
+
+    async def run(self):
+        try:
+            await self._run()
+        finally:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+            for subscriptions in self.subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.close()
+
+    async def _run(self):
+        with NetlinkTransport(RTMGRP_LINK, sock=self.sock) as transport:
+            start_sent = False
+
+            while True:
+                try:
+                    datagrams = await transport.recv_timestamped()
+                except OSError as exc:
+                    if exc.errno == 105:
+                        # No buffer space so drain and reset start_sent
+                        # to re-sync
+                        transport.drain()
+                        start_sent = False
+                        await asyncio.sleep(3.2)
                         continue
 
-                    await queues[device].put({"start": True})
+                    raise
+
+                events = 0
+                for timestamp, data in datagrams:
+                    started = time.monotonic()
+                    links = list(_parse_links(data))
+                    self.parse_time.record(time.monotonic() - started)
+
+                    events += len(links)
+                    for iface, messages in links:
+                        messages["timestamp"] = timestamp
+
+                        if iface in self.subscriptions:
+                            started = time.monotonic()
+                            self._dispatch(iface, messages)
+                            finished = time.monotonic()
+
+                            self.put_wait.record(finished - started)
+                            self.latency.record(finished - timestamp)
+
+                        # Once the first message is sent the monitor is
+                        # ready, so send start to all interfaces
+                        if not start_sent:
+                            for device in Iface.get_all():
+                                if device not in self.subscriptions:
+                                    continue
+
+                                self._publish(device, {"start": True})
+
+                            start_sent = True
+
+                self.events_per_read.record(events)
+
+
+async def monitor_state_change(queues):
+    """Monitors for up / lower_up state changes on network interfaces.
+
+    Loads a message dictionary into queues, with keys for different events.
+    Currently support "up", "lower_up", and "start".
+
+    A queue that falls more than twice MAX_BACKLOG messages behind has
+    the newest messages merged into one.
+
+    Args:
+        queues: a dictionary of queues, one queue for each interface
+            to track, the keys are the interface names, ie.
+            { "eth0": asyncio.Queue(), "eth1": asyncio.Queue() }
+    """
+
+    monitor = StateMonitor()
+    for iface, queue in queues.items():
+        monitor.subscribe(iface, queue=queue)
 
-                start_sent = True
+    await monitor.run()
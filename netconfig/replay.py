@@ -0,0 +1,316 @@
+#!/usr/bin/python
+# Copyright: 2026, CCX Technologies
+"""Record and replay raw rtnetlink traffic.
+
+Recordings are pcap files with the LINKTYPE_NETLINK link type, the same
+layout as a capture from an nlmon device (each datagram after a 16 byte
+cooked header), so they can also be opened with wireshark / tcpdump.
+Replays are sent into one end of a socketpair, the other end can be
+passed to StateMonitor in place of a netlink socket.
+"""
+
+import sys
+import time
+import socket
+import struct
+import asyncio
+
+from . import codec
+from .netlink import NetlinkTransport
+from .netlink import StateMonitor
+from .netlink import POLICY_DROP_OLDEST
+from .netlink import RTMGRP_LINK
+from .netlink import RTM_NEWLINK
+from .netlink import IFF_UP
+from .netlink import IFF_LOWER_UP
+from .netlink import IFLA_IFNAME
+
+# =================== from pcap headers ========================
+
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_VERSION_MAJOR = 2
+PCAP_VERSION_MINOR = 4
+LINKTYPE_NETLINK = 253
+
+# =================== from linux headers ========================
+
+ARPHRD_NETLINK = 824
+PACKET_USER = 6
+PACKET_KERNEL = 7
+
+# ===============================================================
+
+PCAP_HEADER = struct.Struct("=LHHiLLL")
+PCAP_RECORD = struct.Struct("=LLLL")
+# pkttype, hatype, halen, addr, protocol
+NLMON_HEADER = struct.Struct("!HHH8sH")
+
+SNAPLEN = 65535
+
+
+class NetlinkRecorder:
+    """Writes netlink datagrams to a pcap file.
+
+    Args:
+        path: the file to write to, it is truncated
+    """
+
+    def __init__(self, path):
+        self.fo = open(path, "wb")
+        self.fo.write(
+                PCAP_HEADER.pack(
+                        PCAP_MAGIC, PCAP_VERSION_MAJOR, PCAP_VERSION_MINOR, 0,
+                        0, SNAPLEN, LINKTYPE_NETLINK
+                )
+        )
+
+        # pcap needs wall clock time, so record the offset once and
+        # add it to the monotonic timestamps from the transport
+        self._offset = time.time() - time.monotonic()
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, timestamp: float, data: bytes):
+        """Writes a datagram from the kernel, timestamp is from
+        time.monotonic()."""
+
+        seconds, fraction = divmod(timestamp + self._offset, 1)
+        length = NLMON_HEADER.size + len(data)
+        self.fo.write(
+                PCAP_RECORD.pack(
+                        int(seconds), int(fraction * 1e6), length, length
+                )
+        )
+        self.fo.write(
+                NLMON_HEADER.pack(
+                        PACKET_KERNEL, ARPHRD_NETLINK, 0, b"",
+                        socket.NETLINK_ROUTE
+                )
+        )
+        self.fo.write(data)
+        self.count += 1
+
+    def close(self):
+        self.fo.close()
+
+
+def read_recording(path):
+    """Reads a pcap file of netlink datagrams.
+
+    The nlmon cooked header is removed from each record, and records of
+    netlink families other than NETLINK_ROUTE are skipped. Records
+    without the header, from earlier recordings, are read as they are.
+
+    Yields:
+        tuples of (timestamp, datagram), timestamps are in seconds
+    """
+
+    with open(path, "rb") as fi:
+        header = fi.read(PCAP_HEADER.size)
+        if len(header) < PCAP_HEADER.size:
+            raise ValueError(f"{path} is not a pcap file")
+
+        magic, _, _, _, _, _, link_type = PCAP_HEADER.unpack(header)
+        if magic != PCAP_MAGIC:
+            raise ValueError(f"{path} is not a native byte order pcap file")
+
+        if link_type != LINKTYPE_NETLINK:
+            raise ValueError(f"{path} doesn't contain netlink traffic")
+
+        while True:
+            record = fi.read(PCAP_RECORD.size)
+            if len(record) < PCAP_RECORD.size:
+                return
+
+            seconds, useconds, length, _ = PCAP_RECORD.unpack(record)
+            data = fi.read(length)
+
+            # a bare datagram starts with its length, which would have to
+            # be hundreds of kilobytes to look like the header
+            if len(data) >= NLMON_HEADER.size:
+                pkttype, hatype, _, _, protocol = NLMON_HEADER.unpack_from(
+                        data
+                )
+                if hatype == ARPHRD_NETLINK and pkttype in (
+                        PACKET_USER, PACKET_KERNEL
+                ):
+                    if protocol != socket.NETLINK_ROUTE:
+                        continue
+                    data = data[NLMON_HEADER.size:]
+
+            yield seconds + useconds / 1e6, data
+
+
+async def record(path, groups=RTMGRP_LINK, count=None, duration=None):
+    """Records netlink multicast traffic to a file.
+
+    Args:
+        path: the pcap file to write
+        groups: bitmask of the multicast groups to record
+        count: stop after this many datagrams
+        duration: stop after this many seconds
+
+    Returns:
+        the number of datagrams recorded
+    """
+
+    loop = asyncio.get_event_loop()
+    deadline = None if duration is None else loop.time() + duration
+
+    with NetlinkTransport(groups) as transport, NetlinkRecorder(
+            path
+    ) as recorder:
+        while count is None or recorder.count < count:
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+
+            try:
+                datagrams = await asyncio.wait_for(
+                        transport.recv_timestamped(), timeout
+                )
+            except asyncio.TimeoutError:
+                break
+
+            for timestamp, data in datagrams:
+                recorder.write(timestamp, data)
+
+        return recorder.count
+
+
+async def replay(records, sock, realtime=False, speed=1.0):
+    """Sends recorded datagrams into a socket.
+
+    Args:
+        records: the path of a recording, or an iterable of
+            (timestamp, datagram) tuples
+        sock: the socket to send into, usually one end of a
+            socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        realtime: keep the recorded spacing between datagrams, otherwise
+            they are sent as fast as possible
+        speed: multiplier for the recorded timing when realtime is set
+
+    Returns:
+        the number of datagrams sent
+    """
+
+    if isinstance(records, str):
+        records = read_recording(records)
+
+    loop = asyncio.get_event_loop()
+    sock.setblocking(False)
+
+    sent = 0
+    first = None
+    started = loop.time()
+
+    for timestamp, data in records:
+        if realtime:
+            if first is None:
+                first = timestamp
+
+            delay = started + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await loop.sock_sendall(sock, data)
+        sent += 1
+
+    return sent
+
+
+def link_storm(count, ifaces=("bench0", ), interval=0.0):
+    """Generates RTM_NEWLINK datagrams with alternating link states.
+
+    Yields:
+        tuples of (timestamp, datagram) suitable for replay
+    """
+
+    for i in range(count):
+        iface = ifaces[i % len(ifaces)]
+        flags = IFF_UP | (IFF_LOWER_UP if (i // len(ifaces)) % 2 else 0)
+
+        yield i * interval, codec.pack_nlmsg(
+                RTM_NEWLINK, 0, i, 0,
+                codec.pack_ifinfomsg(index=1 + i % len(ifaces), flags=flags) +
+                codec.pack_string(IFLA_IFNAME, iface)
+        )
+
+
+async def benchmark(records, ifaces=("bench0", ), realtime=False):
+    """Replays datagrams through a StateMonitor and measures it.
+
+    Each of ifaces gets a drop_oldest subscriber which is never read, so
+    the consumers never hold up the monitor.
+
+    Returns:
+        a dictionary with the number of events, events per second and the
+        monitor's latency percentiles
+    """
+
+    if isinstance(records, str):
+        records = read_recording(records)
+
+    records = list(records)
+
+    local, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    with local, remote:
+        monitor = StateMonitor(sock=remote)
+        for iface in ifaces:
+            monitor.subscribe(iface, POLICY_DROP_OLDEST, 1)
+
+        expected = sum(
+                1 for _, data in records for msg_type, *_ in
+                codec.iter_nlmsg(data) if msg_type == RTM_NEWLINK
+        )
+
+        task = asyncio.ensure_future(monitor.run())
+        try:
+            started = time.monotonic()
+            await replay(records, local, realtime)
+
+            while monitor.events_per_read.total < expected:
+                if task.done():
+                    task.result()
+                await asyncio.sleep(0.001)
+
+            elapsed = time.monotonic() - started
+
+        finally:
+            # the monitor stops reading before the sockets are closed
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    return {
+            "events": expected,
+            "seconds": elapsed,
+            "events_per_sec": expected / elapsed if elapsed else None,
+            "p50_latency": monitor.latency.percentile(50),
+            "p99_latency": monitor.latency.percentile(99),
+            "max_latency": monitor.latency.maximum,
+    }
+
+
+def main(argv):
+    counts = [int(arg) for arg in argv] or [10000, 100000, 1000000]
+    ifaces = tuple(f"bench{i}" for i in range(16))
+
+    for count in counts:
+        result = asyncio.run(benchmark(link_storm(count, ifaces), ifaces))
+        print(
+                f"{result['events']:>8} events:"
+                f" {result['events_per_sec']:>10.0f} events/sec,"
+                f" p99 latency {result['p99_latency'] * 1e6:.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,4 +1,4 @@
-# Copyright: 2022-2023, CCX Technologies
+# Copyright: 2022-2026, CCX Technologies
 
 rt_files: dict = {}
 
@@ -12,6 +12,27 @@ def get_rt_value(name: str, rt_file: str, rt_files_dict: dict) -> int:
         raise RuntimeError(f"Unable to find {name} in {rt_file}")
 
 
+def get_rt_values(names, rt_file: str, rt_files_dict: dict) -> dict:
+    """Looks up many names with a single read of the file.
+
+    Ids, as integers or strings of digits, are passed through.
+
+    Returns:
+        a dictionary of name: id
+    """
+
+    values: dict = {}
+    for name in names:
+        if isinstance(name, int):
+            values[name] = name
+        elif name.isdigit():
+            values[name] = int(name)
+        else:
+            values[name] = get_rt_value(name, rt_file, rt_files_dict)
+
+    return values
+
+
 def get_rt_file(rt_file: str, rt_files_dict: dict):
     if not rt_files_dict.setdefault(rt_file, []):
         with open(f"/etc/iproute2/{rt_file}", "r") as fi:
@@ -33,3 +54,11 @@ async def get_rt_table_id(name: str) -> int:
 
 async def get_rt_protocol_id(name: str) -> int:
     return get_rt_value(name, 'rt_protos', rt_files)
+
+
+async def get_rt_table_ids(names) -> dict:
+    return get_rt_values(names, 'rt_tables', rt_files)
+
+
+async def get_rt_protocol_ids(names) -> dict:
+    return get_rt_values(names, 'rt_protos', rt_files)
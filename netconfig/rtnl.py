@@ -0,0 +1,1883 @@
+#!/usr/bin/python
+# Copyright: 2026, CCX Technologies
+"""Pipelined rtnetlink requests.
+
+Requests are packed with the codec and sent many to a datagram, with up
+to a window of them waiting for an ACK at once, rather than sending one
+and waiting for its ACK before the next like IPRoute does. The ACKs and
+errors are matched back to the requests by sequence number.
+
+Everything here blocks, AIPRoute runs it in an executor.
+"""
+
+import os
+import sys
+import time
+import errno
+import ctypes
+import socket
+import struct
+import itertools
+
+import netaddr
+from pyroute2 import IPRoute  # noqa pylint: disable=no-name-in-module, import-error
+from pyroute2.iproute.linux import tc_plugins
+from pyroute2.iproute.linux import transform_handle
+from pyroute2.netlink.rtnl.tcmsg import tcmsg
+
+from . import codec
+from .netlink import NetlinkTransport
+
+# =================== from linux headers ========================
+
+SO_RCVBUFFORCE = 33
+
+SOL_NETLINK = 270
+NETLINK_CAP_ACK = 10
+
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP_INTR = 0x10
+NLM_F_DUMP = 0x300
+NLM_F_REPLACE = 0x100
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+RTM_GETROUTE = 26
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+IFLA_LINKINFO = 18
+IFLA_EXT_MASK = 29
+
+IFLA_INFO_KIND = 1
+
+RTEXT_FILTER_SKIP_STATS = 1 << 3
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+NDA_DST = 1
+NDA_LLADDR = 2
+NDA_CACHEINFO = 3
+
+RTM_NEWNEIGH = 28
+RTM_GETNEIGH = 30
+
+RTM_NEWRULE = 32
+RTM_DELRULE = 33
+RTM_GETRULE = 34
+
+RTM_NEWSTATS = 92
+RTM_GETSTATS = 94
+
+IFLA_STATS_LINK_64 = 1
+
+RTM_NEWQDISC = 36
+RTM_DELQDISC = 37
+RTM_GETQDISC = 38
+RTM_NEWTCLASS = 40
+RTM_DELTCLASS = 41
+RTM_GETTCLASS = 42
+RTM_NEWTFILTER = 44
+RTM_DELTFILTER = 45
+RTM_GETTFILTER = 46
+
+TCA_KIND = 1
+TCA_OPTIONS = 2
+TCA_STATS2 = 7
+
+TCA_STATS_BASIC = 1
+TCA_STATS_RATE_EST = 2
+TCA_STATS_QUEUE = 3
+
+TCA_U32_CLASSID = 1
+TCA_U32_SEL = 5
+
+TC_U32_TERMINAL = 1
+
+TC_H_ROOT = 0xFFFFFFFF
+TC_H_INGRESS = 0xFFFFFFF1
+TC_H_MIN_INGRESS = 0xFFF2
+TC_H_MIN_EGRESS = 0xFFF3
+
+FRA_DST = 1
+FRA_SRC = 2
+FRA_IIFNAME = 3
+FRA_GOTO = 4
+FRA_PRIORITY = 6
+FRA_FWMARK = 10
+FRA_TABLE = 15
+FRA_FWMASK = 16
+FRA_OIFNAME = 17
+FRA_PROTOCOL = 21
+
+FR_ACT_TO_TBL = 1
+
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_PREFSRC = 7
+RTA_TABLE = 15
+
+RT_TABLE_COMPAT = 252
+RT_TABLE_DEFAULT = 253
+RT_TABLE_MAIN = 254
+RT_TABLE_LOCAL = 255
+
+RTPROT_KERNEL = 2
+RTPROT_STATIC = 4
+
+RT_SCOPE_UNIVERSE = 0
+RT_SCOPE_NOWHERE = 255
+
+RTN_UNICAST = 1
+
+IP6_RT_PRIO_USER = 1024
+
+CLONE_NEWNET = 0x40000000
+
+# ===============================================================
+
+# IPv6 link local addresses are managed by the kernel, never delete them
+LINK_LOCAL = netaddr.IPNetwork("fe80::/10")
+
+ROUTE_TYPES = {
+        "unicast": 1,
+        "local": 2,
+        "broadcast": 3,
+        "anycast": 4,
+        "multicast": 5,
+        "blackhole": 6,
+        "unreachable": 7,
+        "prohibit": 8,
+}
+
+ROUTE_SCOPES = {
+        "universe": 0,
+        "global": 0,
+        "site": 200,
+        "link": 253,
+        "host": 254,
+        "nowhere": 255,
+}
+
+RULE_ACTIONS = {
+        "to_tbl": 1,
+        "goto": 2,
+        "nop": 3,
+        "blackhole": 6,
+        "unreachable": 7,
+        "prohibit": 8,
+}
+
+RULE_KEYS = {
+        "priority", "table", "action", "goto", "src", "src_len", "dst",
+        "dst_len", "fwmark", "fwmask", "iifname", "oifname", "tos", "protocol",
+        "family"
+}
+
+# the rules every namespace starts with, (priority, table)
+DEFAULT_RULES = {
+        (0, RT_TABLE_LOCAL),
+        (32766, RT_TABLE_MAIN),
+        (32767, RT_TABLE_DEFAULT),
+}
+
+ROUTE_KEYS = {
+        "dst", "dst_len", "gateway", "oif", "table", "priority", "prefsrc",
+        "proto", "scope", "type", "tos", "family"
+}
+
+# route fields that have to match for a route to be left alone, the
+# optional ones are only compared if the desired route sets them
+ROUTE_COMPARED = ("gateway", "proto", "scope", "type")
+ROUTE_COMPARED_IF_SET = ("oif", "prefsrc")
+
+# an AF_UNSPEC dump also has the multicast (RTNL_FAMILY_IPMR / IP6MR) and
+# MPLS routes, which parse_route can't read
+ROUTE_FAMILIES = (socket.AF_INET, socket.AF_INET6)
+
+# rules are identified by their selectors, and replaced if these differ
+RULE_SELECTORS = (
+        "family", "priority", "src", "dst", "tos", "fwmark", "fwmask",
+        "iifname", "oifname"
+)
+RULE_COMPARED = ("table", "action", "goto")
+RULE_COMPARED_IF_SET = ("protocol", )
+
+# the counters of struct rtnl_link_stats64, in order, older kernels send
+# fewer of them and the missing ones read as zero
+STATS_NAMES = (
+        "rx_packets", "tx_packets", "rx_bytes", "tx_bytes", "rx_errors",
+        "tx_errors", "rx_dropped", "tx_dropped", "multicast", "collisions",
+        "rx_length_errors", "rx_over_errors", "rx_crc_errors",
+        "rx_frame_errors", "rx_fifo_errors", "rx_missed_errors",
+        "tx_aborted_errors", "tx_carrier_errors", "tx_fifo_errors",
+        "tx_heartbeat_errors", "tx_window_errors", "rx_compressed",
+        "tx_compressed", "rx_nohandler"
+)
+
+# the tc commands of IPRoute.tc, as (msg_type, flags)
+TC_COMMANDS = {
+        "add": (RTM_NEWQDISC, NLM_F_CREATE | NLM_F_EXCL),
+        "del": (RTM_DELQDISC, 0),
+        "delete": (RTM_DELQDISC, 0),
+        "remove": (RTM_DELQDISC, 0),
+        "change": (RTM_NEWQDISC, NLM_F_REPLACE),
+        "replace": (RTM_NEWQDISC, NLM_F_CREATE | NLM_F_REPLACE),
+        "add-class": (RTM_NEWTCLASS, NLM_F_CREATE | NLM_F_EXCL),
+        "del-class": (RTM_DELTCLASS, 0),
+        "change-class": (RTM_NEWTCLASS, NLM_F_REPLACE),
+        "replace-class": (RTM_NEWTCLASS, NLM_F_CREATE | NLM_F_REPLACE),
+        "add-filter": (RTM_NEWTFILTER, NLM_F_CREATE | NLM_F_EXCL),
+        "del-filter": (RTM_DELTFILTER, 0),
+        "change-filter": (RTM_NEWTFILTER, NLM_F_REPLACE),
+        "replace-filter": (RTM_NEWTFILTER, NLM_F_CREATE | NLM_F_REPLACE),
+}
+
+# u32 filters with only these arguments are packed here, rather than by
+# pyroute2's u32 plugin, which is far slower
+U32_FILTER_ARGS = {"parent", "prio", "protocol", "target", "keys"}
+
+# packet counters (and their padding) in the filter options, which are
+# left out of the dumped options so they can be compared
+TC_COUNTER_OPTIONS = {
+        "u32": (9, 12),
+        "basic": (5, 6),
+        "matchall": (4, 5),
+}
+
+DEFAULT_WINDOW = 256
+DUMP_ATTEMPTS = 3
+
+# datagrams buffered by the streaming dumps, the kernel only fills the
+# next one once there's room, so this bounds their memory use
+DUMP_PENDING = 8
+
+# the cacheinfo times are in USER_HZ
+USER_HZ = 100
+BUFFER_SIZE = 4194304
+READ_SIZE = 65536
+ACK_TIMEOUT = 5.0
+
+
+def _address(value) -> netaddr.IPAddress:
+    return netaddr.IPAddress(str(value))
+
+
+def pack_route(route: dict, delete: bool = False) -> bytes:
+    """Packs the rtmsg and attributes for a route.
+
+    Takes the same keywords as IPRoute.route for the common cases: dst
+    (with or without a prefix length, or "default"), dst_len, gateway,
+    oif, table, priority, prefsrc, proto, scope, type, tos and family.
+    The defaults match IPRoute's for an add, and match any route for a
+    delete.
+
+    Raises:
+        ValueError: for unsupported keywords or invalid values
+    """
+
+    unknown = set(route) - ROUTE_KEYS
+    if unknown:
+        raise ValueError(
+                f"Unsupported route arguments {', '.join(sorted(unknown))}"
+        )
+
+    attrs = []
+    family = route.get("family")
+    dst_len = 0
+
+    dst = route.get("dst")
+    if dst not in (None, "default"):
+        dst = netaddr.IPNetwork(str(dst))
+        family = family or (
+                socket.AF_INET6 if dst.version == 6 else socket.AF_INET
+        )
+        dst_len = route.get("dst_len", dst.prefixlen)
+        attrs.append(codec.pack_rtattr(RTA_DST, dst.ip.packed))
+
+    if route.get("gateway"):
+        gateway = _address(route["gateway"])
+        family = family or (
+                socket.AF_INET6 if gateway.version == 6 else socket.AF_INET
+        )
+        attrs.append(codec.pack_rtattr(RTA_GATEWAY, gateway.packed))
+
+    if route.get("prefsrc"):
+        prefsrc = _address(route["prefsrc"])
+        attrs.append(codec.pack_rtattr(RTA_PREFSRC, prefsrc.packed))
+
+    if route.get("oif"):
+        attrs.append(codec.pack_u32(RTA_OIF, route["oif"]))
+
+    if route.get("priority") is not None:
+        attrs.append(codec.pack_u32(RTA_PRIORITY, route["priority"]))
+
+    table = route.get("table") or RT_TABLE_MAIN
+    attrs.append(codec.pack_u32(RTA_TABLE, table))
+
+    scope = route.get("scope", RT_SCOPE_NOWHERE if delete else None)
+    rtm_type = route.get("type", 0 if delete else RTN_UNICAST)
+
+    return codec.pack_rtmsg(
+            family=family or socket.AF_INET,
+            dst_len=dst_len,
+            tos=route.get("tos", 0),
+            table=table if table < 256 else RT_TABLE_COMPAT,
+            protocol=route.get("proto", 0 if delete else RTPROT_STATIC),
+            scope=ROUTE_SCOPES.get(scope, scope or RT_SCOPE_UNIVERSE),
+            rtm_type=ROUTE_TYPES.get(rtm_type, rtm_type)
+    ) + b"".join(attrs)
+
+
+def parse_route(data, offset: int, end: int) -> dict:
+    """Parses an rtmsg into the keywords pack_route takes."""
+
+    (family, dst_len, _, tos, table, proto, scope, rtm_type,
+     _) = codec.RTMSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.RTMSG.size, end)
+
+    def _address(rta_type):
+        start, stop = attrs[rta_type]
+        return socket.inet_ntop(family, bytes(data[start:stop]))
+
+    if RTA_DST in attrs:
+        dst = f"{_address(RTA_DST)}/{dst_len}"
+    else:
+        dst = "::/0" if family == socket.AF_INET6 else "0.0.0.0/0"
+
+    route = {
+            "family": family,
+            "dst": dst,
+            "tos": tos,
+            "table": table,
+            "proto": proto,
+            "scope": scope,
+            "type": rtm_type,
+            "gateway": _address(RTA_GATEWAY) if RTA_GATEWAY in attrs else None,
+            "prefsrc": _address(RTA_PREFSRC) if RTA_PREFSRC in attrs else None,
+            "oif": None,
+            "priority": None,
+    }
+
+    for rta_type, key in (
+            (RTA_TABLE, "table"), (RTA_OIF, "oif"), (RTA_PRIORITY, "priority")
+    ):
+        if rta_type in attrs:
+            route[key] = codec.get_u32(data, *attrs[rta_type])
+
+    return route
+
+
+def normalise_route(route: dict) -> dict:
+    """Returns a route in the same form as parse_route."""
+
+    payload = pack_route(route)
+    return parse_route(payload, 0, len(payload))
+
+
+def route_key(route: dict) -> tuple:
+    """Returns the (dst/prefix, metric, tos) a normalised route is
+    identified by within a table."""
+
+    priority = route["priority"]
+    if not priority and route["family"] == socket.AF_INET6:
+        # the kernel uses this metric if IPv6 routes don't have one
+        priority = IP6_RT_PRIO_USER
+
+    return route["dst"], priority or 0, route["tos"]
+
+
+def diff_routes(
+        current,
+        desired,
+        proto: int | None = None,
+        family: int | None = None
+) -> tuple:
+    """Works out the changes to make current match desired.
+
+    Routes added by the kernel (ie. for connected subnets) are never
+    deleted, and only current routes of the families and protocols in
+    desired are deleted.
+
+    Args:
+        current: an iterable of routes from parse_route
+        desired: an iterable of routes from normalise_route
+        proto: only delete routes with this protocol, instead of those
+            in desired
+        family: only delete routes of this family (AF_UNSPEC for both
+            IPv4 and IPv6), instead of those in desired
+
+    Returns:
+        a tuple of lists of (add, replace, delete) routes and the number
+        of routes which are unchanged
+    """
+
+    desired = list(desired)
+
+    if family is None:
+        families = {route["family"] for route in desired}
+    elif family == socket.AF_UNSPEC:
+        families = set(ROUTE_FAMILIES)
+    else:
+        families = {family}
+
+    if proto is None:
+        protos = {route["proto"] for route in desired}
+    else:
+        protos = {proto}
+
+    existing = {route_key(route): route for route in current}
+
+    add, replace = [], []
+    unchanged = 0
+
+    for route in desired:
+        old = existing.pop(route_key(route), None)
+
+        if old is None:
+            add.append(route)
+        elif any(old[k] != route[k] for k in ROUTE_COMPARED) or any(
+                route[k] is not None and old[k] != route[k]
+                for k in ROUTE_COMPARED_IF_SET
+        ):
+            replace.append(route)
+        else:
+            unchanged += 1
+
+    delete = [
+            route for route in existing.values()
+            if route["proto"] != RTPROT_KERNEL and route["proto"] in protos
+            and route["family"] in families
+    ]
+
+    return add, replace, delete, unchanged
+
+
+def pack_address(index: int, address: netaddr.IPNetwork) -> bytes:
+    """Packs the ifaddrmsg and attributes for an interface address."""
+
+    if address.version == 6:
+        return codec.pack_ifaddrmsg(
+                socket.AF_INET6, address.prefixlen, index=index
+        ) + codec.pack_rtattr(IFA_ADDRESS, address.ip.packed)
+
+    return codec.pack_ifaddrmsg(
+            socket.AF_INET, address.prefixlen, index=index
+    ) + codec.pack_rtattr(IFA_LOCAL, address.ip.packed) + codec.pack_rtattr(
+            IFA_ADDRESS, address.ip.packed
+    )
+
+
+def parse_address(data, offset: int, end: int) -> tuple:
+    """Parses an ifaddrmsg.
+
+    Returns:
+        a tuple of (index, netaddr.IPNetwork)
+    """
+
+    family, prefixlen, _, _, index = codec.IFADDRMSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.IFADDRMSG.size, end)
+
+    # IFA_ADDRESS is the peer address on point to point links
+    start, stop = attrs.get(IFA_LOCAL, attrs.get(IFA_ADDRESS, (0, 0)))
+    address = socket.inet_ntop(family, bytes(data[start:stop]))
+
+    return index, netaddr.IPNetwork(f"{address}/{prefixlen}")
+
+
+def _mac(data, start: int, end: int) -> str:
+    return ':'.join(f"{octet:02x}" for octet in data[start:end])
+
+
+def pack_getlink(index: int = 0, name: str | None = None) -> bytes:
+    """Packs an RTM_GETLINK for one interface, by index or name, or for a
+    dump, which leaves out the statistics."""
+
+    payload = codec.pack_ifinfomsg(index=index) + codec.pack_u32(
+            IFLA_EXT_MASK, RTEXT_FILTER_SKIP_STATS
+    )
+    if name is not None:
+        payload += codec.pack_string(IFLA_IFNAME, name)
+
+    return payload
+
+
+def link_index(data, offset: int) -> int:
+    return codec.IFINFOMSG.unpack_from(data, offset)[2]
+
+
+def link_flags(data, offset: int) -> int:
+    return codec.IFINFOMSG.unpack_from(data, offset)[3]
+
+
+def link_name(data, offset: int, end: int) -> str | None:
+    """Returns the IFLA_IFNAME of an ifinfomsg, without parsing the other
+    attributes."""
+
+    for rta_type, start, stop in codec.iter_rtattr(
+            data, offset + codec.IFINFOMSG.size, end
+    ):
+        if rta_type == IFLA_IFNAME:
+            return codec.get_string(data, start, stop)
+
+    return None
+
+
+def _u32_cut(key: str, separator: str) -> tuple:
+    pos = key.find(separator)
+    if pos > 0:
+        return key[:pos], key[pos + 1:]
+
+    return key, '0'
+
+
+def _u32_keys(keys) -> list:
+    """Converts u32 match keys like "0xc0a80000/0xffffff00+16" (value,
+    mask and byte offset) to (mask, value, offset) words, exactly like
+    pyroute2's u32 plugin does, including its quirks."""
+
+    # the value and mask of each byte offset, later keys win
+    octets = [(0, 0)] * 256
+    words = []
+
+    for key in keys:
+        key, _ = _u32_cut(key, '@')
+        key, offset = _u32_cut(key, '+')
+        offset = int(offset, 0)
+
+        # a mask of 0x00ff at +8 is really 0xff at +9
+        key, mask = _u32_cut(key, '/')
+        if mask[:2] == '0x':
+            mask = mask[2:]
+            while mask[:2] == '00':
+                offset += 1
+                mask = mask[2:]
+            mask = '0x' + mask
+
+        mask = int(mask, 0)
+        value = int(key, 0)
+
+        if mask == 0 and value == 0:
+            words.append((0, 0, offset))
+
+        bits = 24
+        for octet_mask in mask.to_bytes(4, 'big'):
+            if octet_mask:
+                octets[offset] = (
+                        (value & (octet_mask << bits)) >> bits, octet_mask
+                )
+                offset += 1
+            bits -= 8
+
+    word = None
+    for offset, (octet_value, octet_mask) in enumerate(octets):
+        if octet_mask and word is None:
+            word = [0, 0, offset]
+            bits = 24
+
+        if word is not None and bits >= 0:
+            word[0] |= octet_mask << bits
+            word[1] |= octet_value << bits
+            bits -= 8
+
+            if bits < 0 or offset == 255:
+                words.append(tuple(word))
+                word = None
+
+    if not words:
+        raise ValueError("no keys specified")
+
+    return words
+
+
+def _pack_u32_filter(
+        index: int, handle: int, parent, prio: int, protocol: int, target,
+        keys
+) -> bytes:
+    words = _u32_keys(keys)
+
+    selector = codec.U32_SEL.pack(TC_U32_TERMINAL, 0, len(words)) + b"".join(
+            codec.U32_KEY.pack(mask, value) + codec.U32_KEY_OFF.pack(offset, 0)
+            for mask, value, offset in words
+    )
+    info = socket.htons(protocol & 0xFFFF) | ((prio << 16) & 0xFFFF0000)
+
+    return codec.pack_tcmsg(
+            index=index,
+            handle=handle,
+            parent=transform_handle(parent),
+            info=info
+    ) + codec.pack_string(TCA_KIND, "u32") + codec.pack_rtattr(
+            TCA_OPTIONS,
+            codec.pack_u32(TCA_U32_CLASSID, transform_handle(target)) +
+            codec.pack_rtattr(TCA_U32_SEL, selector)
+    )
+
+
+def pack_tc(
+        command: str,
+        kind: str | None = None,
+        index: int = 0,
+        handle=0,
+        **kwargs
+) -> tuple:
+    """Packs a tc request like IPRoute.tc, the kind specific options are
+    packed by pyroute2's tc plugins.
+
+    Returns:
+        a tuple of (msg_type, flags, payload)
+    """
+
+    try:
+        msg_type, flags = TC_COMMANDS[command]
+    except KeyError as exc:
+        raise ValueError(f"Unknown tc command {command}") from exc
+
+    handle = transform_handle(handle)
+
+    if kind == "u32" and msg_type in (RTM_NEWTFILTER, RTM_DELTFILTER) and (
+            {"target", "keys"} <= kwargs.keys() <= U32_FILTER_ARGS
+    ):
+        return msg_type, flags, _pack_u32_filter(
+                index, handle, kwargs.get("parent", 0),
+                kwargs.get("prio", 0), kwargs.get("protocol", 0),
+                kwargs["target"], kwargs["keys"]
+        )
+
+    msg = tcmsg()
+    msg['index'] = index
+    msg['handle'] = handle
+
+    for item in ('parent', 'target', 'default'):
+        if kwargs.get(item) is not None:
+            kwargs[item] = transform_handle(kwargs[item])
+
+    if 'info' in kwargs:
+        msg['info'] = kwargs['info']
+
+    opts = kwargs.get('opts')
+    if kind in tc_plugins:
+        plugin = tc_plugins[kind]
+        msg['parent'] = kwargs.pop('parent', getattr(plugin, 'parent', 0))
+        if hasattr(plugin, 'fix_msg'):
+            plugin.fix_msg(msg, kwargs)
+
+        if kwargs:
+            if msg_type in (RTM_NEWTCLASS, RTM_DELTCLASS):
+                opts = plugin.get_class_parameters(kwargs)
+            else:
+                opts = plugin.get_parameters(kwargs)
+
+    else:
+        msg['parent'] = kwargs.get('parent', TC_H_ROOT)
+
+    if kind is not None:
+        msg['attrs'].append(['TCA_KIND', kind])
+    if opts is not None:
+        msg['attrs'].append(['TCA_OPTIONS', opts])
+
+    msg.encode()
+    return msg_type, flags, bytes(
+            msg.data[codec.NLMSGHDR.size:msg['header']['length']]
+    )
+
+
+def _tc_options(data, start: int, stop: int, skip: tuple) -> bytes:
+    if not skip:
+        return bytes(data[start:stop])
+
+    # keep each attribute's header and padding, less the skipped ones
+    return b"".join(
+            bytes(data[offset - codec.RTATTR.size:min(stop, (end + 3) & ~3)])
+            for rta_type, offset, end in codec.iter_rtattr(data, start, stop)
+            if rta_type not in skip
+    )
+
+
+def _tc_stats(data, start: int, stop: int) -> dict:
+    stats = dict.fromkeys(
+            (
+                    "bytes", "packets", "bps", "pps", "qlen", "backlog",
+                    "drops", "requeues", "overlimits"
+            ), 0
+    )
+    attrs = codec.rtattr_offsets(data, start, stop)
+
+    if TCA_STATS_BASIC in attrs:
+        stats["bytes"], stats["packets"] = codec.GNET_STATS_BASIC.unpack_from(
+                data, attrs[TCA_STATS_BASIC][0]
+        )
+
+    if TCA_STATS_RATE_EST in attrs:
+        stats["bps"], stats["pps"] = codec.GNET_STATS_RATE_EST.unpack_from(
+                data, attrs[TCA_STATS_RATE_EST][0]
+        )
+
+    if TCA_STATS_QUEUE in attrs:
+        (
+                stats["qlen"], stats["backlog"], stats["drops"],
+                stats["requeues"], stats["overlimits"]
+        ) = codec.GNET_STATS_QUEUE.unpack_from(
+                data, attrs[TCA_STATS_QUEUE][0]
+        )
+
+    return stats
+
+
+def parse_tc(data, offset: int, end: int) -> dict:
+    """Parses a tcmsg (a qdisc, class or filter), the options are left
+    packed, without any packet counters, and the statistics are
+    parsed from TCA_STATS2."""
+
+    _, index, handle, parent, info = codec.TCMSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.TCMSG.size, end)
+
+    tc = {
+            "index": index,
+            "handle": handle,
+            "parent": parent,
+            "info": info,
+            "kind": None,
+            "options": b"",
+            "stats": None,
+    }
+
+    if TCA_KIND in attrs:
+        tc["kind"] = codec.get_string(data, *attrs[TCA_KIND])
+
+    if TCA_OPTIONS in attrs:
+        tc["options"] = _tc_options(
+                data, *attrs[TCA_OPTIONS],
+                TC_COUNTER_OPTIONS.get(tc["kind"], ())
+        )
+
+    if TCA_STATS2 in attrs:
+        tc["stats"] = _tc_stats(data, *attrs[TCA_STATS2])
+
+    return tc
+
+
+def parse_link(data, offset: int, end: int) -> dict:
+    """Parses an ifinfomsg, without the statistics."""
+
+    _, ifi_type, index, flags, _ = codec.IFINFOMSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.IFINFOMSG.size, end)
+
+    link = {
+            "index": index,
+            "type": ifi_type,
+            "flags": flags,
+            "name": None,
+            "address": None,
+            "mtu": None,
+            "master": None,
+            "operstate": None,
+            "kind": None,
+    }
+
+    if IFLA_IFNAME in attrs:
+        link["name"] = codec.get_string(data, *attrs[IFLA_IFNAME])
+    if IFLA_ADDRESS in attrs:
+        link["address"] = _mac(data, *attrs[IFLA_ADDRESS])
+    if IFLA_MTU in attrs:
+        link["mtu"] = codec.get_u32(data, *attrs[IFLA_MTU])
+    if IFLA_MASTER in attrs:
+        link["master"] = codec.get_u32(data, *attrs[IFLA_MASTER])
+    if IFLA_OPERSTATE in attrs:
+        link["operstate"] = data[attrs[IFLA_OPERSTATE][0]]
+
+    if IFLA_LINKINFO in attrs:
+        info = codec.rtattr_offsets(data, *attrs[IFLA_LINKINFO])
+        if IFLA_INFO_KIND in info:
+            link["kind"] = codec.get_string(data, *info[IFLA_INFO_KIND])
+
+    return link
+
+
+def parse_neighbour(data, offset: int, end: int) -> dict:
+    """Parses an ndmsg, the cacheinfo times are in seconds."""
+
+    family, index, state, flags, ndm_type = codec.NDMSG.unpack_from(
+            data, offset
+    )
+    attrs = codec.rtattr_offsets(data, offset + codec.NDMSG.size, end)
+
+    neighbour = {
+            "family": family,
+            "index": index,
+            "state": state,
+            "flags": flags,
+            "type": ndm_type,
+            "dst": None,
+            "lladdr": None,
+            "confirmed": None,
+            "used": None,
+            "updated": None,
+    }
+
+    if NDA_DST in attrs:
+        start, stop = attrs[NDA_DST]
+        neighbour["dst"] = socket.inet_ntop(family, bytes(data[start:stop]))
+
+    if NDA_LLADDR in attrs:
+        neighbour["lladdr"] = _mac(data, *attrs[NDA_LLADDR])
+
+    if NDA_CACHEINFO in attrs:
+        confirmed, used, updated, _ = codec.NDA_CACHEINFO.unpack_from(
+                data, attrs[NDA_CACHEINFO][0]
+        )
+        neighbour["confirmed"] = confirmed / USER_HZ
+        neighbour["used"] = used / USER_HZ
+        neighbour["updated"] = updated / USER_HZ
+
+    return neighbour
+
+
+def parse_stats(data, offset: int, end: int) -> tuple:
+    """Parses an if_stats_msg with IFLA_STATS_LINK_64.
+
+    Returns:
+        a tuple of (index, tuple of the counters in STATS_NAMES order)
+    """
+
+    _, index, _ = codec.IF_STATS_MSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.IF_STATS_MSG.size, end)
+
+    counters = [0] * len(STATS_NAMES)
+    if IFLA_STATS_LINK_64 in attrs:
+        start, stop = attrs[IFLA_STATS_LINK_64]
+        count = min((stop - start) // codec.U64.size, len(STATS_NAMES))
+        counters[:count] = struct.unpack_from(f"={count}Q", data, start)
+
+    return index, tuple(counters)
+
+
+def _address_key(address: netaddr.IPNetwork) -> tuple:
+    # IPNetwork compares as a subnet, so 10.0.0.1/24 == 10.0.0.2/24
+    return address.ip, address.prefixlen
+
+
+def diff_addresses(current: list, desired: set) -> tuple:
+    """Works out the changes to make one interface's addresses match.
+
+    Addresses with a zero ip or prefix length in desired are ignored,
+    and IPv6 link local addresses are never deleted.
+
+    Args:
+        current: the interface's addresses, in the order the kernel
+            dumps them (IPv4 primaries before their secondaries)
+        desired: the addresses it should have
+
+    Returns:
+        a tuple of lists of the (add, delete) addresses and the number
+        of addresses which are unchanged, the deletes are ordered so
+        IPv4 secondaries are deleted before their primary
+    """
+
+    wanted = {}
+    for address in desired:
+        address = netaddr.IPNetwork(str(address))
+        if bool(address.ip) and bool(address.prefixlen):
+            wanted[_address_key(address)] = address
+
+    delete = []
+    unchanged = 0
+
+    for address in current:
+        if wanted.pop(_address_key(address), None) is not None:
+            unchanged += 1
+        elif address.ip not in LINK_LOCAL:
+            delete.append(address)
+
+    # deleting a primary also deletes its secondaries (unless
+    # promote_secondaries is set), which would make their deletes fail
+    delete.reverse()
+
+    return list(wanted.values()), delete, unchanged
+
+
+def _rule_network(rule: dict, key: str) -> netaddr.IPNetwork | None:
+    value = rule.get(key)
+    if not value:
+        return None
+
+    network = netaddr.IPNetwork(str(value))
+    if rule.get(f"{key}_len") is not None:
+        network.prefixlen = rule[f"{key}_len"]
+
+    return network
+
+
+def pack_rule(rule: dict) -> bytes:
+    """Packs the fib_rule_hdr and attributes for a policy routing rule.
+
+    Takes the same keywords as IPRoute.rule: priority, table, action,
+    goto, src and dst (with a prefix length or with src_len and
+    dst_len), fwmark, fwmask, iifname, oifname, tos, protocol and family.
+    The table has to be an id, see route_tables for looking up names.
+
+    Raises:
+        ValueError: for unsupported keywords or invalid values
+    """
+
+    unknown = set(rule) - RULE_KEYS
+    if unknown:
+        raise ValueError(
+                f"Unsupported rule arguments {', '.join(sorted(unknown))}"
+        )
+
+    attrs = []
+    family = rule.get("family")
+    lengths = {}
+
+    for key, rta_type in (("src", FRA_SRC), ("dst", FRA_DST)):
+        network = _rule_network(rule, key)
+        if network is None:
+            lengths[key] = 0
+            continue
+
+        family = family or (
+                socket.AF_INET6 if network.version == 6 else socket.AF_INET
+        )
+        lengths[key] = network.prefixlen
+        attrs.append(codec.pack_rtattr(rta_type, network.ip.packed))
+
+    if rule.get("priority") is not None:
+        attrs.append(codec.pack_u32(FRA_PRIORITY, rule["priority"]))
+
+    table = rule.get("table") or 0
+    if table:
+        attrs.append(codec.pack_u32(FRA_TABLE, table))
+
+    if rule.get("goto") is not None:
+        attrs.append(codec.pack_u32(FRA_GOTO, rule["goto"]))
+
+    if rule.get("fwmark"):
+        attrs.append(codec.pack_u32(FRA_FWMARK, rule["fwmark"]))
+    if rule.get("fwmask") is not None:
+        attrs.append(codec.pack_u32(FRA_FWMASK, rule["fwmask"]))
+
+    for key, rta_type in (("iifname", FRA_IIFNAME), ("oifname", FRA_OIFNAME)):
+        if rule.get(key):
+            attrs.append(codec.pack_string(rta_type, rule[key]))
+
+    if rule.get("protocol"):
+        protocol = codec.U8.pack(rule["protocol"])
+        attrs.append(codec.pack_rtattr(FRA_PROTOCOL, protocol))
+
+    action = rule.get("action", FR_ACT_TO_TBL)
+
+    # fib_rule_hdr has the same layout as rtmsg, with the action in the
+    # place of the route type
+    return codec.pack_rtmsg(
+            family=family or socket.AF_INET,
+            dst_len=lengths["dst"],
+            src_len=lengths["src"],
+            tos=rule.get("tos", 0),
+            table=table if table < 256 else RT_TABLE_COMPAT,
+            rtm_type=RULE_ACTIONS.get(action, action)
+    ) + b"".join(attrs)
+
+
+def parse_rule(data, offset: int, end: int) -> dict:
+    """Parses a fib_rule_hdr into the keywords pack_rule takes."""
+
+    (family, dst_len, src_len, tos, table, _, _, action,
+     _) = codec.RTMSG.unpack_from(data, offset)
+    attrs = codec.rtattr_offsets(data, offset + codec.RTMSG.size, end)
+
+    rule = {
+            "family": family,
+            "priority": 0,
+            "table": table,
+            "action": action,
+            "goto": None,
+            "src": None,
+            "dst": None,
+            "tos": tos,
+            "fwmark": None,
+            "fwmask": None,
+            "iifname": None,
+            "oifname": None,
+            "protocol": 0,
+    }
+
+    for rta_type, key, length in (
+            (FRA_SRC, "src", src_len), (FRA_DST, "dst", dst_len)
+    ):
+        if rta_type in attrs:
+            start, stop = attrs[rta_type]
+            address = socket.inet_ntop(family, bytes(data[start:stop]))
+            rule[key] = f"{address}/{length}"
+
+    for rta_type, key in (
+            (FRA_PRIORITY, "priority"), (FRA_TABLE, "table"),
+            (FRA_GOTO, "goto"), (FRA_FWMARK, "fwmark"), (FRA_FWMASK, "fwmask")
+    ):
+        if rta_type in attrs:
+            rule[key] = codec.get_u32(data, *attrs[rta_type])
+
+    for rta_type, key in ((FRA_IIFNAME, "iifname"), (FRA_OIFNAME, "oifname")):
+        if rta_type in attrs:
+            rule[key] = codec.get_string(data, *attrs[rta_type])
+
+    if FRA_PROTOCOL in attrs:
+        rule["protocol"] = data[attrs[FRA_PROTOCOL][0]]
+
+    if rule["fwmark"] == 0:
+        rule["fwmark"] = None
+
+    return rule
+
+
+def normalise_rule(rule: dict) -> dict:
+    """Returns a rule in the same form as parse_rule.
+
+    Raises:
+        ValueError: if the rule doesn't have a priority
+    """
+
+    if rule.get("priority") is None:
+        raise ValueError(f"Rule {rule} doesn't have a priority")
+
+    payload = pack_rule(rule)
+    normalised = parse_rule(payload, 0, len(payload))
+
+    if normalised["fwmark"] and normalised["fwmask"] is None:
+        # the kernel matches the whole mark if there isn't a mask
+        normalised["fwmask"] = 0xFFFFFFFF
+
+    return normalised
+
+
+def rule_key(rule: dict) -> tuple:
+    """Returns the priority and selectors a normalised rule is
+    identified by."""
+
+    return tuple(rule[key] for key in RULE_SELECTORS)
+
+
+def diff_rules(
+        current,
+        desired,
+        protocol: int | None = None,
+        family: int | None = None
+) -> tuple:
+    """Works out the changes to make current match desired.
+
+    The rules the kernel creates are never deleted, and only current
+    rules of the families and protocols in desired are deleted, so the
+    rules belonging to another daemon are left alone.
+
+    Args:
+        current: an iterable of rules from parse_rule
+        desired: an iterable of rules from normalise_rule
+        protocol: only delete rules with this protocol, instead of those
+            in desired
+        family: only delete rules of this family (AF_UNSPEC for both
+            IPv4 and IPv6), instead of those in desired
+
+    Returns:
+        a tuple of lists of the rules to (add, replace, delete) and the
+        number of rules which are unchanged, replace is (old, new) tuples
+        as rules can't be changed in place
+    """
+
+    desired = list(desired)
+
+    if family is None:
+        families = {rule["family"] for rule in desired}
+    elif family == socket.AF_UNSPEC:
+        families = set(ROUTE_FAMILIES)
+    else:
+        families = {family}
+
+    if protocol is None:
+        protocols = {rule["protocol"] for rule in desired}
+    else:
+        protocols = {protocol}
+
+    existing = {rule_key(rule): rule for rule in current}
+
+    add, replace = [], []
+    unchanged = 0
+
+    for rule in desired:
+        old = existing.pop(rule_key(rule), None)
+
+        if old is None:
+            add.append(rule)
+        elif any(old[k] != rule[k] for k in RULE_COMPARED) or any(
+                rule[k] and old[k] != rule[k] for k in RULE_COMPARED_IF_SET
+        ):
+            replace.append((old, rule))
+        else:
+            unchanged += 1
+
+    delete = [
+            rule for rule in existing.values()
+            if rule["protocol"] != RTPROT_KERNEL
+            and (rule["priority"], rule["table"]) not in DEFAULT_RULES
+            and rule["protocol"] in protocols and rule["family"] in families
+    ]
+
+    return add, replace, delete, unchanged
+
+
+class RtnlSocket():
+    """A blocking rtnetlink socket for pipelined requests.
+
+    Args:
+        window: the most requests to have waiting for an ACK at once
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.seq = 0
+
+        self.sock = socket.socket(
+                socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                socket.NETLINK_ROUTE
+        )
+
+        try:
+            # a full window of ACKs has to fit in the receive buffer
+            self.sock.setsockopt(
+                    socket.SOL_SOCKET, SO_RCVBUFFORCE, BUFFER_SIZE
+            )
+        except PermissionError:
+            self.sock.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE
+            )
+
+        try:
+            # don't echo each request back in its error
+            self.sock.setsockopt(SOL_NETLINK, NETLINK_CAP_ACK, 1)
+        except OSError:
+            pass
+
+        self.sock.settimeout(ACK_TIMEOUT)
+        self.sock.bind((0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.sock.close()
+
+    def _collect(self, pending: dict, failures: list):
+        lost = False
+
+        while pending:
+            try:
+                if lost:
+                    data = self.sock.recv(READ_SIZE, socket.MSG_DONTWAIT)
+                else:
+                    data = self.sock.recv(READ_SIZE)
+
+            except (BlockingIOError, socket.timeout):
+                # the rest of the ACKs aren't coming, so we can't tell
+                # whether these requests were applied
+                code = errno.ENOBUFS if lost else errno.ETIMEDOUT
+                failures.extend((key, code) for key in pending.values())
+                return
+
+            except OSError as exc:
+                if exc.errno != errno.ENOBUFS:
+                    raise
+
+                # some ACKs were dropped, read what's left then give up
+                # on the rest and use a smaller window from now on
+                lost = True
+                self.window = max(1, self.window // 2)
+                continue
+
+            for msg_type, _, seq, _, offset, _ in codec.iter_nlmsg(data):
+                if msg_type != codec.NLMSG_ERROR or seq not in pending:
+                    continue
+
+                key = pending.pop(seq)
+                code = codec.nlmsg_error(data, offset)
+                if code:
+                    failures.append((key, code))
+
+    def request(self, requests) -> list:
+        """Sends requests and waits for their ACKs.
+
+        Args:
+            requests: an iterable of (key, msg_type, flags, payload), the
+                key is only used to report failures
+
+        Returns:
+            a list of (key, errno) for the requests which failed
+        """
+
+        requests = iter(requests)
+        failures: list = []
+
+        while True:
+            pending = {}
+            messages = []
+
+            for key, msg_type, flags, payload in itertools.islice(
+                    requests, self.window
+            ):
+                self.seq = self.seq % 0xFFFFFFFF + 1
+                pending[self.seq] = key
+                messages.append(
+                        codec.pack_nlmsg(
+                                msg_type, flags | NLM_F_REQUEST | NLM_F_ACK,
+                                self.seq, 0, payload
+                        )
+                )
+
+            if not messages:
+                return failures
+
+            self.sock.send(b"".join(messages))
+            self._collect(pending, failures)
+
+    def get_link(self, index: int = 0, name: str | None = None):
+        """Requests one interface, by index or by name, without its
+        statistics.
+
+        Returns:
+            a tuple of (data, payload_offset, msg_end) of its ifinfomsg,
+            or None if the kernel returned an error (ie. no such device)
+        """
+
+        self.seq = self.seq % 0xFFFFFFFF + 1
+        seq = self.seq
+
+        self.sock.send(
+                codec.pack_nlmsg(
+                        RTM_GETLINK, NLM_F_REQUEST, seq, 0,
+                        pack_getlink(index, name)
+                )
+        )
+
+        while True:
+            data = self.sock.recv(READ_SIZE)
+
+            for msg_type, _, reply_seq, _, offset, end in codec.iter_nlmsg(
+                    data
+            ):
+                if reply_seq != seq:
+                    continue
+
+                if msg_type == RTM_NEWLINK:
+                    return data, offset, end
+
+                if msg_type == codec.NLMSG_ERROR:
+                    return None
+
+    def _pack_tc_requests(self, operations, failures):
+        for operation in operations:
+            command, kind, index, kwargs = operation
+
+            try:
+                msg_type, flags, payload = pack_tc(
+                        command, kind, index, **dict(kwargs)
+                )
+            except (
+                    ValueError, TypeError, KeyError, IndexError,
+                    OverflowError, struct.error
+            ):
+                failures.append((operation, errno.EINVAL))
+                continue
+
+            yield operation, msg_type, flags, payload
+
+    def tc(self, operations) -> list:
+        """Sends a tc request for each of operations.
+
+        Args:
+            operations: an iterable of (command, kind, index, kwargs),
+                the arguments of IPRoute.tc
+
+        Returns:
+            a list of (operation, errno) for the operations which failed,
+            operations which can't be packed fail with EINVAL
+        """
+
+        failures: list = []
+        failures.extend(
+                self.request(self._pack_tc_requests(operations, failures))
+        )
+
+        return failures
+
+    def dump(self, msg_type: int, payload: bytes):
+        """Sends a dump request and yields the replies.
+
+        Yields:
+            tuples of (msg_type, data, payload_offset, msg_end)
+
+        Raises:
+            InterruptedError: if the kernel's table changed during the dump,
+                after all the replies have been yielded
+        """
+
+        self.seq = self.seq % 0xFFFFFFFF + 1
+        seq = self.seq
+        interrupted = False
+
+        self.sock.send(
+                codec.pack_nlmsg(
+                        msg_type, NLM_F_REQUEST | NLM_F_DUMP, seq, 0, payload
+                )
+        )
+
+        while True:
+            data = self.sock.recv(READ_SIZE)
+
+            for reply, flags, reply_seq, _, offset, end in codec.iter_nlmsg(
+                    data
+            ):
+                if reply_seq != seq:
+                    continue
+
+                if flags & NLM_F_DUMP_INTR:
+                    interrupted = True
+
+                if reply == codec.NLMSG_DONE:
+                    if interrupted:
+                        raise InterruptedError("Dump was interrupted")
+                    return
+
+                if reply == codec.NLMSG_ERROR:
+                    code = codec.nlmsg_error(data, offset)
+                    raise OSError(code, os.strerror(code))
+
+                yield reply, data, offset, end
+
+    def get_routes(self, table: int | None = None, family: int = 0) -> list:
+        """Dumps the routes, from one table or all of them.
+
+        Returns:
+            a list of routes from parse_route
+        """
+
+        payload = codec.pack_rtmsg(family=family)
+
+        for attempt in range(1, DUMP_ATTEMPTS + 1):
+            try:
+                return [
+                        route for route in (
+                                parse_route(data, offset, end)
+                                for msg_type, data, offset, end in
+                                self.dump(RTM_GETROUTE, payload)
+                                if msg_type == RTM_NEWROUTE
+                                and data[offset] in ROUTE_FAMILIES
+                        ) if table is None or route["table"] == table
+                ]
+
+            except InterruptedError:
+                if attempt >= DUMP_ATTEMPTS:
+                    raise
+
+        return []
+
+    def sync_routes(
+            self,
+            table: int,
+            desired,
+            proto: int | None = None,
+            family: int | None = None
+    ) -> dict:
+        """Adds, replaces and deletes routes so a table matches desired.
+
+        Everything is worked out from one dump of the table, the new and
+        changed routes are written before the old ones are removed. Only
+        routes of the families and protocols in desired are deleted,
+        unless proto or family is set, see diff_routes.
+
+        Returns:
+            a dictionary with lists of the routes "added", "replaced" and
+            "deleted", the number "unchanged" and (route, errno) for
+            the routes which "failed"
+        """
+
+        failures: list = []
+        normalised = []
+        for route in desired:
+            try:
+                normalised.append(normalise_route(dict(route, table=table)))
+            except (ValueError, TypeError, netaddr.AddrFormatError):
+                failures.append((route, errno.EINVAL))
+
+        add, replace, delete, unchanged = diff_routes(
+                self.get_routes(table), normalised, proto, family
+        )
+
+        if replace:
+            failures.extend(self.replace_routes(replace))
+        if add:
+            failures.extend(self.add_routes(add))
+        if delete:
+            failures.extend(self.delete_routes(delete))
+
+        return {
+                "added": add,
+                "replaced": replace,
+                "deleted": delete,
+                "unchanged": unchanged,
+                "failed": failures,
+        }
+
+    def get_addresses(self, family: int = 0) -> dict:
+        """Dumps the addresses of every interface.
+
+        Returns:
+            a dictionary of interface index: list of netaddr.IPNetwork
+        """
+
+        payload = codec.pack_ifaddrmsg(family)
+
+        for attempt in range(1, DUMP_ATTEMPTS + 1):
+            addresses: dict = {}
+
+            try:
+                for msg_type, data, offset, end in self.dump(
+                        RTM_GETADDR, payload
+                ):
+                    if msg_type == RTM_NEWADDR:
+                        index, address = parse_address(data, offset, end)
+                        addresses.setdefault(index, []).append(address)
+
+                return addresses
+
+            except InterruptedError:
+                if attempt >= DUMP_ATTEMPTS:
+                    raise
+
+        return {}
+
+    def get_rules(self, family: int = 0) -> list:
+        """Dumps the policy routing rules.
+
+        Returns:
+            a list of rules from parse_rule
+        """
+
+        payload = codec.pack_rtmsg(family=family)
+
+        for attempt in range(1, DUMP_ATTEMPTS + 1):
+            try:
+                return [
+                        parse_rule(data, offset, end)
+                        for msg_type, data, offset, end in
+                        self.dump(RTM_GETRULE, payload)
+                        if msg_type == RTM_NEWRULE
+                ]
+
+            except InterruptedError:
+                if attempt >= DUMP_ATTEMPTS:
+                    raise
+
+        return []
+
+    def sync_rules(
+            self,
+            desired,
+            protocol: int | None = None,
+            family: int | None = None
+    ) -> dict:
+        """Adds and deletes rules so the rules match desired.
+
+        Everything is worked out from one dump of the rules, new rules
+        are added before the old ones are removed so a changed rule is
+        never missing. Only rules of the families and protocols in
+        desired, or of protocol and family if they're set, are deleted.
+
+        Returns:
+            a dictionary with lists of the rules "added", "replaced" and
+            "deleted", the number "unchanged" and (rule, errno) for the
+            rules which "failed"
+        """
+
+        failures: list = []
+        normalised = []
+        for rule in desired:
+            try:
+                normalised.append(normalise_rule(rule))
+            except (ValueError, TypeError, netaddr.AddrFormatError):
+                failures.append((rule, errno.EINVAL))
+
+        add, replace, delete, unchanged = diff_rules(
+                self.get_rules(), normalised, protocol, family
+        )
+
+        # the new version of a changed rule is added next to the old one
+        # before the old one is deleted
+        new_rules = add + [new for _, new in replace]
+        old_rules = [old for old, _ in replace] + delete
+
+        if new_rules:
+            failures.extend(
+                    self.requests(
+                            RTM_NEWRULE, NLM_F_CREATE | NLM_F_EXCL, new_rules,
+                            pack_rule
+                    )
+            )
+        if old_rules:
+            failures.extend(
+                    self.requests(RTM_DELRULE, 0, old_rules, pack_rule)
+            )
+
+        return {
+                "added": add,
+                "replaced": [new for _, new in replace],
+                "deleted": delete,
+                "unchanged": unchanged,
+                "failed": failures,
+        }
+
+    def sync_addresses(self, desired: dict) -> dict:
+        """Adds and deletes addresses so interfaces match desired.
+
+        Every interface is worked out from one dump of the addresses,
+        addresses that already match are left alone. Removed addresses
+        are deleted before new ones are added, so a changed IPv4 address
+        isn't added as a secondary of the old one. Deleting an IPv4
+        primary can take its secondaries with it, so if anything was
+        deleted the addresses are dumped again before working out the
+        adds, and any wanted address the kernel removed is added back.
+
+        Args:
+            desired: a dictionary of interface index: the addresses it
+                should have, as netaddr.IPNetwork or strings
+
+        Returns:
+            a dictionary of interface index: a dictionary with lists of the
+            addresses "added" and "deleted", the number "unchanged" and
+            (address, errno) for the addresses which "failed"
+        """
+
+        desired = {
+                index: list(addresses)
+                for index, addresses in desired.items()
+        }
+
+        current = self.get_addresses()
+        summary = {}
+        requests = []
+
+        for index, addresses in desired.items():
+            _, delete, _ = diff_addresses(current.get(index, []), addresses)
+
+            summary[index] = {
+                    "added": [],
+                    "deleted": delete,
+                    "unchanged": 0,
+                    "failed": [],
+            }
+
+            requests.extend(
+                    ((index, address), RTM_DELADDR, 0,
+                     pack_address(index, address)) for address in delete
+            )
+
+        if requests:
+            for (index, address), code in self.request(requests):
+                # already deleted, along with its primary
+                if code != errno.EADDRNOTAVAIL:
+                    summary[index]["failed"].append((address, code))
+
+            current = self.get_addresses()
+
+        requests = []
+
+        for index, addresses in desired.items():
+            add, _, unchanged = diff_addresses(
+                    current.get(index, []), addresses
+            )
+
+            summary[index]["added"] = add
+            summary[index]["unchanged"] = unchanged
+
+            requests.extend(
+                    ((index, address), RTM_NEWADDR,
+                     NLM_F_CREATE | NLM_F_EXCL, pack_address(index, address))
+                    for address in add
+            )
+
+        for (index, address), code in self.request(requests):
+            summary[index]["failed"].append((address, code))
+
+        return summary
+
+    def _pack_requests(self, msg_type: int, flags: int, items, pack, failures):
+        for item in items:
+            try:
+                payload = pack(item)
+            except (ValueError, TypeError, netaddr.AddrFormatError):
+                failures.append((item, errno.EINVAL))
+                continue
+
+            yield item, msg_type, flags, payload
+
+    def requests(self, msg_type: int, flags: int, items, pack) -> list:
+        """Sends a request for each of items, packed by pack.
+
+        Returns:
+            a list of (item, errno) for the items which failed, items
+            which can't be packed fail with EINVAL
+        """
+
+        failures: list = []
+        failures.extend(
+                self.request(
+                        self._pack_requests(
+                                msg_type, flags, items, pack, failures
+                        )
+                )
+        )
+
+        return failures
+
+    def routes(self, msg_type: int, flags: int, routes) -> list:
+        delete = msg_type == RTM_DELROUTE
+        return self.requests(
+                msg_type, flags, routes,
+                lambda route: pack_route(route, delete)
+        )
+
+    def add_routes(self, routes) -> list:
+        return self.routes(RTM_NEWROUTE, NLM_F_CREATE | NLM_F_EXCL, routes)
+
+    def replace_routes(self, routes) -> list:
+        return self.routes(
+                RTM_NEWROUTE, NLM_F_CREATE | NLM_F_REPLACE, routes
+        )
+
+    def delete_routes(self, routes) -> list:
+        return self.routes(RTM_DELROUTE, 0, routes)
+
+
+async def dump(msg_type: int, payload: bytes, loop=None):
+    """Streams the replies to a dump request as they arrive.
+
+    Only a few datagrams are buffered at a time, and closing the
+    generator early (ie. breaking out of an async for) closes the socket,
+    which ends the dump in the kernel.
+
+    Yields:
+        tuples of (msg_type, data, payload_offset, msg_end)
+
+    Raises:
+        InterruptedError: if the kernel's table changed during the dump,
+            after all the replies have been yielded
+    """
+
+    interrupted = False
+
+    with NetlinkTransport(loop=loop, max_pending=DUMP_PENDING) as transport:
+        transport.send(
+                codec.pack_nlmsg(
+                        msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0, payload
+                )
+        )
+
+        while True:
+            for data in await transport.recv():
+                for reply, flags, _, _, offset, end in codec.iter_nlmsg(data):
+                    if flags & NLM_F_DUMP_INTR:
+                        interrupted = True
+
+                    if reply == codec.NLMSG_DONE:
+                        if interrupted:
+                            raise InterruptedError("Dump was interrupted")
+                        return
+
+                    if reply == codec.NLMSG_ERROR:
+                        code = codec.nlmsg_error(data, offset)
+                        raise OSError(code, os.strerror(code))
+
+                    yield reply, data, offset, end
+
+
+async def iter_routes(table: int | None = None, family: int = 0, loop=None):
+    """Streams the routes, from one table or all of them.
+
+    Yields:
+        routes from parse_route
+    """
+
+    async for msg_type, data, offset, end in dump(
+            RTM_GETROUTE, codec.pack_rtmsg(family=family), loop
+    ):
+        if msg_type == RTM_NEWROUTE and data[offset] in ROUTE_FAMILIES:
+            route = parse_route(data, offset, end)
+            if table is None or route["table"] == table:
+                yield route
+
+
+async def iter_links(loop=None):
+    """Streams the interfaces, without their statistics.
+
+    Yields:
+        links from parse_link
+    """
+
+    async for msg_type, data, offset, end in dump(
+            RTM_GETLINK, pack_getlink(), loop
+    ):
+        if msg_type == RTM_NEWLINK:
+            yield parse_link(data, offset, end)
+
+
+async def iter_addresses(index: int | None = None, family: int = 0, loop=None):
+    """Streams the interface addresses, from one interface or all of them.
+
+    Yields:
+        tuples of (index, netaddr.IPNetwork)
+    """
+
+    async for msg_type, data, offset, end in dump(
+            RTM_GETADDR, codec.pack_ifaddrmsg(family), loop
+    ):
+        if msg_type == RTM_NEWADDR:
+            address = parse_address(data, offset, end)
+            if index is None or address[0] == index:
+                yield address
+
+
+async def iter_neighbours(
+        index: int | None = None, family: int = 0, loop=None
+):
+    """Streams the neighbour tables, from one interface or all of them.
+
+    Yields:
+        neighbours from parse_neighbour
+    """
+
+    async for msg_type, data, offset, end in dump(
+            RTM_GETNEIGH, codec.pack_ndmsg(family), loop
+    ):
+        if msg_type == RTM_NEWNEIGH:
+            neighbour = parse_neighbour(data, offset, end)
+            if index is None or neighbour["index"] == index:
+                yield neighbour
+
+
+async def iter_stats(loop=None):
+    """Streams the 64 bit counters of every interface, in one dump.
+
+    Yields:
+        tuples from parse_stats
+    """
+
+    payload = codec.pack_if_stats_msg(
+            filter_mask=1 << (IFLA_STATS_LINK_64 - 1)
+    )
+
+    async for msg_type, data, offset, end in dump(RTM_GETSTATS, payload, loop):
+        if msg_type == RTM_NEWSTATS:
+            yield parse_stats(data, offset, end)
+
+
+async def iter_tc(
+        msg_type: int, index: int = 0, parent: int = 0, loop=None
+):
+    """Streams the qdiscs (RTM_GETQDISC), classes (RTM_GETTCLASS) or
+    filters (RTM_GETTFILTER), classes and filters are dumped for one
+    interface, and filters for one parent.
+
+    Yields:
+        dictionaries from parse_tc
+    """
+
+    async for reply, data, offset, end in dump(
+            msg_type, codec.pack_tcmsg(index=index, parent=parent), loop
+    ):
+        if reply == msg_type - 2:
+            yield parse_tc(data, offset, end)
+
+
+def _benchmark_routes(count: int, oif: int):
+    for i in range(count):
+        yield {"dst": str(netaddr.IPAddress(0x0A000000 + i)), "oif": oif}
+
+
+def benchmark(
+        count: int, window: int = DEFAULT_WINDOW, kind: str = "dummy"
+) -> dict:
+    """Adds then deletes count /32 routes through a dummy interface.
+
+    This must already be running in a scratch network namespace, kind can
+    be used to pick another type of interface if dummy isn't available.
+
+    Returns:
+        a dictionary with the number of routes, the seconds taken and the
+        routes per second for each of add and delete
+    """
+
+    with IPRoute() as ipr:
+        ipr.link("add", ifname="bench0", kind=kind)
+        oif = ipr.link_lookup(ifname="bench0")[0]
+        ipr.link("set", index=oif, state="up")
+
+    result: dict = {"routes": count}
+
+    with RtnlSocket(window) as rtnl:
+        for name, func in (
+                ("add", rtnl.add_routes), ("delete", rtnl.delete_routes)
+        ):
+            started = time.monotonic()
+            failures = func(_benchmark_routes(count, oif))
+            elapsed = time.monotonic() - started
+
+            if failures:
+                raise RuntimeError(
+                        f"{len(failures)} routes failed to {name},"
+                        f" ie. {failures[0]}"
+                )
+
+            result[f"{name}_seconds"] = elapsed
+            result[f"{name}_per_sec"] = count / elapsed
+
+    with IPRoute() as ipr:
+        ipr.link("del", index=oif)
+
+    return result
+
+
+def main(argv, kind="dummy"):
+    counts = [int(arg) for arg in argv] or [1000, 100000, 1000000]
+
+    # run in a new network namespace, so nothing here is disturbed
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.unshare(CLONE_NEWNET) != 0:
+        raise OSError(ctypes.get_errno(), "Failed to create a namespace")
+
+    for count in counts:
+        result = benchmark(count, kind=kind)
+        print(
+                f"{result['routes']:>8} routes:"
+                f" add {result['add_per_sec']:>10.0f} routes/sec,"
+                f" delete {result['delete_per_sec']:>10.0f} routes/sec"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
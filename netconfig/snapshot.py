@@ -0,0 +1,810 @@
+# Copyright: 2026, CCX Technologies
+"""Compact, read only copies of the route and neighbour tables, of the
+interface counters, and of the traffic control tree.
+
+Each table is stored as parallel columns, arrays of numbers and byte
+strings of fixed width addresses, rather than as a dictionary per entry,
+so a full table copy costs tens of bytes per entry. The rows are sorted by
+address, which lets the address column itself be binary searched for
+lookups without a separate index.
+"""
+
+import math
+import time
+import socket
+import bisect
+from array import array
+
+import netaddr
+
+from . import codec
+from . import rtnl
+
+ADDRESS_SIZE = {socket.AF_INET: 4, socket.AF_INET6: 16}
+MAC_SIZE = 6
+
+TC_TYPES = {
+        rtnl.RTM_NEWQDISC: "qdisc",
+        rtnl.RTM_NEWTCLASS: "class",
+        rtnl.RTM_NEWTFILTER: "filter",
+}
+TC_CHANGE = {
+        "qdisc": "change",
+        "class": "change-class",
+        "filter": "change-filter"
+}
+TC_DELETE = {"qdisc": "del", "class": "del-class", "filter": "del-filter"}
+
+
+class _Column:
+    """A sequence view of fixed width entries in a byte string."""
+
+    def __init__(self, data: bytes, width: int):
+        self.data = data
+        self.width = width
+
+    def __len__(self):
+        return len(self.data) // self.width
+
+    def __getitem__(self, row: int) -> bytes:
+        return self.data[row * self.width:(row + 1) * self.width]
+
+
+def _pack(address, family: int) -> bytes:
+    try:
+        return socket.inet_pton(family, str(address))
+    except OSError as exc:
+        raise ValueError(
+                f"{address} isn't an address in the table's family"
+        ) from exc
+
+
+def _unpack(data: bytes, family: int) -> str | None:
+    if not any(data):
+        return None
+
+    return socket.inet_ntop(family, data)
+
+
+def _row(column, row: int, width: int) -> bytes:
+    return bytes(column[row * width:(row + 1) * width])
+
+
+def _reorder(column, order, width: int = 0):
+    if width:
+        return b"".join(column[r * width:(r + 1) * width] for r in order)
+
+    return array(column.typecode, (column[r] for r in order))
+
+
+class RouteTable:
+    """A snapshot of the routes of one address family.
+
+    Args:
+        routes: an iterable of routes from rtnl.parse_route, ie. from
+            AIPRoute.iter_routes, routes from other families are skipped
+        family: socket.AF_INET or socket.AF_INET6
+    """
+
+    COLUMNS = ("prefixlens", "oifs", "metrics", "tables", "protos", "types")
+
+    def __init__(self, routes=(), family: int = socket.AF_INET):
+        self.family = int(family)
+        self.width = ADDRESS_SIZE[family]
+
+        self.dsts = bytearray()
+        self.gateways = bytearray()
+        self.prefixlens = array('B')
+        self.oifs = array('I')
+        self.metrics = array('I')
+        self.tables = array('I')
+        self.protos = array('B')
+        self.types = array('B')
+
+        # prefix length: (first row, last row + 1)
+        self._ranges: dict = {}
+        self._lengths: list = []
+
+        self.extend(routes)
+
+    @classmethod
+    async def from_dump(
+            cls,
+            table: int | None = rtnl.RT_TABLE_MAIN,
+            family: int = socket.AF_INET,
+            loop=None
+    ):
+        """Builds a snapshot while streaming a dump of the routes."""
+
+        snapshot = cls(family=family)
+        async for route in rtnl.iter_routes(table, family, loop):
+            snapshot.append(route)
+
+        snapshot.sort()
+        return snapshot
+
+    def __len__(self):
+        return len(self.prefixlens)
+
+    def __iter__(self):
+        return (self.route(row) for row in range(len(self)))
+
+    def append(self, route: dict):
+        """Adds a route, call sort once all the routes are added."""
+
+        if route["family"] != self.family:
+            return
+
+        dst, prefixlen = route["dst"].split('/')
+        self.dsts += socket.inet_pton(self.family, dst)
+        self.prefixlens.append(int(prefixlen))
+
+        if route["gateway"]:
+            self.gateways += socket.inet_pton(self.family, route["gateway"])
+        else:
+            self.gateways += bytes(self.width)
+
+        self.oifs.append(route["oif"] or 0)
+        self.metrics.append(route["priority"] or 0)
+        self.tables.append(route["table"])
+        self.protos.append(route["proto"])
+        self.types.append(route["type"])
+
+    def extend(self, routes):
+        for route in routes:
+            self.append(route)
+
+        self.sort()
+
+    def sort(self):
+        """Sorts the rows by prefix length, address and metric, and
+        indexes where each prefix length starts."""
+
+        width = self.width
+        dsts = self.dsts
+        order = sorted(
+                range(len(self)),
+                key=lambda r: (
+                        self.prefixlens[r], dsts[r * width:(r + 1) * width],
+                        self.metrics[r]
+                )
+        )
+
+        self.dsts = bytearray(_reorder(self.dsts, order, width))
+        self.gateways = bytearray(_reorder(self.gateways, order, width))
+        for name in self.COLUMNS:
+            setattr(self, name, _reorder(getattr(self, name), order))
+
+        self._ranges = {}
+        for row, prefixlen in enumerate(self.prefixlens):
+            start, _ = self._ranges.get(prefixlen, (row, row))
+            self._ranges[prefixlen] = (start, row + 1)
+
+        self._lengths = sorted(self._ranges, reverse=True)
+
+    def route(self, row: int) -> dict:
+        """Returns a row as a dictionary like rtnl.parse_route."""
+
+        dst = socket.inet_ntop(self.family, _row(self.dsts, row, self.width))
+        gateway = _row(self.gateways, row, self.width)
+
+        return {
+                "family": self.family,
+                "dst": f"{dst}/{self.prefixlens[row]}",
+                "gateway": _unpack(gateway, self.family),
+                "oif": self.oifs[row] or None,
+                "priority": self.metrics[row] or None,
+                "table": self.tables[row],
+                "proto": self.protos[row],
+                "type": self.types[row],
+        }
+
+    def lookup_row(self, address) -> int | None:
+        """Returns the row of the longest prefix match for an address,
+        with the lowest metric, or None if there isn't a matching route."""
+
+        key = int.from_bytes(_pack(address, self.family), 'big')
+        bits = self.width * 8
+        column = _Column(self.dsts, self.width)
+
+        for prefixlen in self._lengths:
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+            network = (key & mask).to_bytes(self.width, 'big')
+
+            start, end = self._ranges[prefixlen]
+            row = bisect.bisect_left(column, network, start, end)
+            if row < end and column[row] == network:
+                return row
+
+        return None
+
+    def lookup(self, address) -> dict | None:
+        """Returns the route used for an address, or None."""
+
+        row = self.lookup_row(address)
+        return None if row is None else self.route(row)
+
+
+class NeighbourTable:
+    """A snapshot of the neighbours (ARP or NDP entries) of one address
+    family.
+
+    Args:
+        neighbours: an iterable of neighbours from rtnl.parse_neighbour,
+            ie. from AIPRoute.iter_neighbours, neighbours from other
+            families are skipped
+        family: socket.AF_INET or socket.AF_INET6
+    """
+
+    COLUMNS = ("indexes", "states", "confirmed")
+
+    def __init__(self, neighbours=(), family: int = socket.AF_INET):
+        self.family = int(family)
+        self.width = ADDRESS_SIZE[family]
+
+        self.dsts = bytearray()
+        self.lladdrs = bytearray()
+        self.indexes = array('I')
+        self.states = array('H')
+        self.confirmed = array('d')
+
+        self.extend(neighbours)
+
+    @classmethod
+    async def from_dump(
+            cls,
+            device_id: int | None = None,
+            family: int = socket.AF_INET,
+            loop=None
+    ):
+        """Builds a snapshot while streaming a dump of the neighbours."""
+
+        snapshot = cls(family=family)
+        async for neighbour in rtnl.iter_neighbours(device_id, family, loop):
+            snapshot.append(neighbour)
+
+        snapshot.sort()
+        return snapshot
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        return (self.neighbour(row) for row in range(len(self)))
+
+    def append(self, neighbour: dict):
+        """Adds a neighbour, call sort once all the neighbours are added."""
+
+        if neighbour["family"] != self.family or not neighbour["dst"]:
+            return
+
+        self.dsts += socket.inet_pton(self.family, neighbour["dst"])
+
+        if neighbour["lladdr"]:
+            self.lladdrs += bytes(netaddr.EUI(neighbour["lladdr"]).packed)
+        else:
+            self.lladdrs += bytes(MAC_SIZE)
+
+        self.indexes.append(neighbour["index"])
+        self.states.append(neighbour["state"])
+        self.confirmed.append(neighbour["confirmed"] or 0.0)
+
+    def extend(self, neighbours):
+        for neighbour in neighbours:
+            self.append(neighbour)
+
+        self.sort()
+
+    def sort(self):
+        """Sorts the rows by address and interface."""
+
+        width = self.width
+        dsts, indexes = self.dsts, self.indexes
+        order = sorted(
+                range(len(self)),
+                key=lambda r: (dsts[r * width:(r + 1) * width], indexes[r])
+        )
+
+        self.dsts = bytearray(_reorder(self.dsts, order, width))
+        self.lladdrs = bytearray(_reorder(self.lladdrs, order, MAC_SIZE))
+        for name in self.COLUMNS:
+            setattr(self, name, _reorder(getattr(self, name), order))
+
+    def neighbour(self, row: int) -> dict:
+        """Returns a row as a dictionary like rtnl.parse_neighbour."""
+
+        dst = _row(self.dsts, row, self.width)
+        lladdr = _row(self.lladdrs, row, MAC_SIZE)
+
+        return {
+                "family": self.family,
+                "index": self.indexes[row],
+                "state": self.states[row],
+                "dst": socket.inet_ntop(self.family, dst),
+                "lladdr": ':'.join(f"{octet:02x}" for octet in lladdr)
+                if any(lladdr) else None,
+                "confirmed": self.confirmed[row],
+        }
+
+    def lookup(self, address, device_id: int | None = None) -> dict | None:
+        """Returns the neighbour with an address, or None."""
+
+        key = _pack(address, self.family)
+        column = _Column(self.dsts, self.width)
+
+        row = bisect.bisect_left(column, key)
+        while row < len(column) and column[row] == key:
+            if device_id is None or self.indexes[row] == device_id:
+                return self.neighbour(row)
+            row += 1
+
+        return None
+
+    def find_mac(self, mac) -> list:
+        """Returns the neighbours with a MAC address."""
+
+        key = bytes(netaddr.EUI(str(mac)).packed)
+        found = []
+
+        offset = self.lladdrs.find(key)
+        while offset >= 0:
+            if offset % MAC_SIZE == 0:
+                found.append(self.neighbour(offset // MAC_SIZE))
+            offset = self.lladdrs.find(key, offset + 1)
+
+        return found
+
+
+class LinkStats:
+    """A sample of every interface's 64 bit counters, and their rates
+    since a previous sample.
+
+    The counters of row r are counters[r * len(NAMES):(r + 1) * len(NAMES)]
+    in rtnl.STATS_NAMES order, and rates has the same layout, with NaN for
+    interfaces that can't be rated.
+
+    Args:
+        timestamp: time.monotonic() when the sample was taken, defaults
+            to now
+    """
+
+    NAMES = rtnl.STATS_NAMES
+
+    def __init__(self, timestamp: float | None = None):
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.interval = None
+
+        self.indexes = array('I')
+        self.counters = array('Q')
+        self.rates = array('d')
+
+        # index: row
+        self._rows: dict = {}
+
+    @classmethod
+    async def from_dump(cls, previous=None, loop=None):
+        """Samples the counters with one dump, with rates since previous
+        if given."""
+
+        sample = cls()
+        async for index, counters in rtnl.iter_stats(loop):
+            sample.append(index, counters)
+
+        if previous is not None:
+            sample.compute_rates(previous)
+
+        return sample
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        return iter(self.indexes)
+
+    def __contains__(self, index):
+        return index in self._rows
+
+    def append(self, index: int, counters):
+        self._rows[index] = len(self.indexes)
+        self.indexes.append(index)
+        self.counters.extend(counters)
+        self.rates.extend(math.nan for _ in self.NAMES)
+
+    def compute_rates(self, previous):
+        """Fills in the rates per second since a previous sample.
+
+        Interfaces that weren't in the previous sample, or whose counters
+        went backwards (ie. the interface was re-created), aren't rated.
+        """
+
+        self.interval = self.timestamp - previous.timestamp
+        if self.interval <= 0:
+            return
+
+        width = len(self.NAMES)
+        for row, index in enumerate(self.indexes):
+            before = previous.row(index)
+            if before is None:
+                continue
+
+            now = self.counters[row * width:(row + 1) * width]
+            then = previous.counters[before * width:(before + 1) * width]
+            deltas = [n - t for n, t in zip(now, then)]
+            if min(deltas) < 0:
+                continue
+
+            self.rates[row * width:(row + 1) * width] = array(
+                    'd', (delta / self.interval for delta in deltas)
+            )
+
+    def row(self, index: int) -> int | None:
+        """Returns the row of an interface, or None."""
+
+        return self._rows.get(index)
+
+    def _columns(self, column, index: int):
+        row = self.row(index)
+        if row is None:
+            return None
+
+        width = len(self.NAMES)
+        return column[row * width:(row + 1) * width]
+
+    def get(self, index: int) -> dict | None:
+        """Returns an interface's counters as {name: value}, or None."""
+
+        values = self._columns(self.counters, index)
+        if values is None:
+            return None
+
+        return dict(zip(self.NAMES, values))
+
+    def rate(self, index: int) -> dict | None:
+        """Returns an interface's rates as {name: per second}, or None if
+        it couldn't be rated."""
+
+        values = self._columns(self.rates, index)
+        if values is None or math.isnan(values[0]):
+            return None
+
+        return dict(zip(self.NAMES, values))
+
+
+class TcSnapshot:
+    """A snapshot of the traffic control qdiscs, classes and filters, with
+    their statistics, of every interface or of one.
+
+    Each entry is a dictionary from rtnl.parse_tc, keyed by what
+    identifies it to the kernel (see key), so two snapshots can be
+    compared, ie. one taken after the tree was last set up against the
+    live one, to find out if and where the tree has drifted, and a
+    snapshot can plan the operations that set up a tree again.
+    """
+
+    def __init__(self, entries=()):
+        # key: entry
+        self.entries: dict = {}
+
+        for entry in entries:
+            self.entries[self.key(entry)] = entry
+
+    @staticmethod
+    def key(entry: dict) -> tuple:
+        """Returns ("qdisc", index, parent, handle), ("class", index,
+        handle) or ("filter", index, parent, info, handle)."""
+
+        if entry["type"] == "qdisc":
+            return ("qdisc", entry["index"], entry["parent"], entry["handle"])
+
+        if entry["type"] == "class":
+            return ("class", entry["index"], entry["handle"])
+
+        return (
+                "filter", entry["index"], entry["parent"], entry["info"],
+                entry["handle"]
+        )
+
+    @classmethod
+    async def from_dump(cls, device_id: int | None = None, loop=None):
+        """Dumps the qdiscs, then the classes of each interface with any,
+        then the filters attached to each qdisc and class."""
+
+        snapshot = cls()
+
+        async for qdisc in rtnl.iter_tc(
+                rtnl.RTM_GETQDISC, device_id or 0, loop=loop
+        ):
+            if device_id is None or qdisc["index"] == device_id:
+                snapshot.add("qdisc", qdisc)
+
+        parents: dict = {}
+        for qdisc in snapshot.qdiscs:
+            if qdisc["kind"] == "clsact":
+                # its filters hang off pseudo classes, not the qdisc
+                parents.setdefault(qdisc["index"], set()).update(
+                        (
+                                qdisc["handle"] | rtnl.TC_H_MIN_INGRESS,
+                                qdisc["handle"] | rtnl.TC_H_MIN_EGRESS
+                        )
+                )
+            else:
+                parents.setdefault(qdisc["index"], set()).add(qdisc["handle"])
+
+        for index in sorted(parents):
+            async for tc_class in rtnl.iter_tc(
+                    rtnl.RTM_GETTCLASS, index, loop=loop
+            ):
+                snapshot.add("class", tc_class)
+                parents[index].add(tc_class["handle"])
+
+            for parent in sorted(parents[index]):
+                try:
+                    async for tc_filter in rtnl.iter_tc(
+                            rtnl.RTM_GETTFILTER, index, parent, loop
+                    ):
+                        snapshot.add("filter", tc_filter)
+
+                except OSError:
+                    # not every qdisc or class can have filters
+                    continue
+
+        return snapshot
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def add(self, entry_type: str, entry: dict):
+        entry["type"] = entry_type
+        self.entries[self.key(entry)] = entry
+
+    def _of_type(self, entry_type: str) -> list:
+        return [e for e in self.entries.values() if e["type"] == entry_type]
+
+    @property
+    def qdiscs(self) -> list:
+        return self._of_type("qdisc")
+
+    @property
+    def classes(self) -> list:
+        return self._of_type("class")
+
+    @property
+    def filters(self) -> list:
+        return self._of_type("filter")
+
+    def class_stats(self) -> dict:
+        """Returns the statistics of every class, keyed by (index,
+        handle)."""
+
+        return {
+                (entry["index"], entry["handle"]): entry["stats"]
+                for entry in self.classes
+        }
+
+    def diff(self, desired) -> tuple:
+        """Compares this snapshot to another one, by kind and options.
+
+        The entries can't be sent back to the kernel as they are, their
+        options include fields the kernel fills in, so use plan to work
+        out the operations that put a tree right.
+
+        Returns:
+            a tuple of lists of the entries to add, (current, desired)
+            pairs to change, and the entries to delete
+        """
+
+        add, change, delete = [], [], []
+
+        for key, entry in desired.entries.items():
+            current = self.entries.get(key)
+            if current is None:
+                add.append(entry)
+            elif (current["kind"], current["options"]) != (
+                    entry["kind"], entry["options"]
+            ):
+                change.append((current, entry))
+
+        for key, entry in self.entries.items():
+            if key not in desired.entries:
+                delete.append(entry)
+
+        return add, change, delete
+
+    def _find(self, entry: dict, matched: set) -> tuple | None:
+        if entry["handle"]:
+            key = self.key(entry)
+            return key if key in self.entries else None
+
+        # the kernel picks the handle (and a filter's prio if it's 0)
+        for key, current in self.entries.items():
+            if key in matched or current["type"] != entry["type"] or (
+                    current["index"], current["parent"], current["kind"]
+            ) != (entry["index"], entry["parent"], entry["kind"]):
+                continue
+
+            # a prio of 0 is picked by the kernel, so then only the
+            # protocol has to match
+            mask = 0xFFFFFFFF if entry["info"] >> 16 else 0xFFFF
+            if entry["type"] == "filter" and (
+                    (current["info"] ^ entry["info"]) & mask
+                    or not _tc_attrs(entry) <= _tc_attrs(current)
+            ):
+                continue
+
+            return key
+
+        return None
+
+    def _removed_with(self, qdiscs) -> set:
+        """Returns the keys of the entries that go when qdiscs are
+        deleted."""
+
+        majors = {(q["index"], q["handle"] >> 16) for q in qdiscs}
+        removed: set = set()
+
+        while True:
+            found = {
+                    key
+                    for key, entry in self.entries.items()
+                    if key not in removed and (
+                            entry["type"] == "class" and
+                            (entry["index"], entry["handle"] >> 16) in majors
+                            or entry["parent"] not in
+                            (rtnl.TC_H_ROOT, rtnl.TC_H_INGRESS) and
+                            (entry["index"], entry["parent"] >> 16) in majors
+                    )
+            }
+            if not found:
+                return removed
+
+            removed |= found
+            majors |= {
+                    (self.entries[key]["index"],
+                     self.entries[key]["handle"] >> 16)
+                    for key in found if key[0] == "qdisc"
+            }
+
+    def _depth(self, entry: dict) -> int:
+        depth = 0
+        while (
+                "class", entry["index"], entry["parent"]
+        ) in self.entries and depth < 8:
+            entry = self.entries[("class", entry["index"], entry["parent"])]
+            depth += 1
+
+        return depth
+
+    def plan(
+            self,
+            operations: list,
+            previous: list = (),
+            devices=None
+    ) -> tuple:
+        """Works out the tc operations that make this snapshot's tree
+        match the one operations set up.
+
+        Each operation is matched to an entry by what identifies it to
+        the kernel, or for one without a handle by its parent, kind (and
+        a filter's prio, protocol and options). An operation without a
+        matching entry is added, and one whose entry is of another kind
+        replaces it. The kernel dumps options differently than they're
+        sent, ie. with fields it fills in, so a matched entry is only
+        changed if its options don't include the operation's options and
+        the operation differs from the same one in previous, the
+        operations the tree was last set up with. Entries which no
+        operation matches are deleted, less the kernel's default qdiscs
+        and u32 hash tables and anything deleted along with a qdisc.
+
+        Args:
+            operations: a list of (command, kind, device_id, kwargs) like
+                AIPRoute.apply_tc takes, creating the whole tree of each
+                interface in them
+            previous: the operations the tree was last set up with
+            devices: the interface indexes to delete entries from,
+                defaults to those in operations
+
+        Returns:
+            a tuple of lists of the operations to (add, change, delete),
+            to be sent in the order delete, change then add, and the
+            number of operations that are unchanged
+        """
+
+        sent = {}
+        for operation in previous:
+            entry, payload = _tc_operation(operation)
+            if entry["handle"]:
+                sent[self.key(entry)] = payload
+
+        add, change, replaced = [], [], []
+        matched: set = set()
+        unchanged = 0
+
+        for operation in operations:
+            entry, payload = _tc_operation(operation)
+            key = self._find(entry, matched)
+
+            if key is None:
+                add.append(operation)
+                continue
+
+            matched.add(key)
+            current = self.entries[key]
+
+            if current["kind"] != entry["kind"]:
+                replaced.append(current)
+                add.append(operation)
+            elif _tc_attrs(entry) <= _tc_attrs(current) or (
+                    sent.get(self.key(entry)) == payload
+            ):
+                unchanged += 1
+            else:
+                change.append(
+                        (TC_CHANGE[entry["type"]], ) + tuple(operation[1:])
+                )
+
+        if devices is None:
+            devices = {operation[2] for operation in operations}
+
+        stale = [
+                entry for key, entry in self.entries.items()
+                if key not in matched and entry["index"] in devices
+                and not _tc_builtin(entry)
+        ]
+        replaced.extend(stale)
+
+        removed = self._removed_with(
+                entry for entry in replaced if entry["type"] == "qdisc"
+        )
+        # children before their parents
+        delete = sorted(
+                (
+                        entry for entry in replaced
+                        if self.key(entry) not in removed
+                ),
+                key=lambda e: (
+                        ("filter", "class", "qdisc").index(e["type"]),
+                        -self._depth(e), e["parent"] == rtnl.TC_H_ROOT
+                )
+        )
+
+        return add, change, [_tc_delete(entry) for entry in delete], unchanged
+
+
+def _tc_operation(operation) -> tuple:
+    """Returns the entry an operation creates, like rtnl.parse_tc, and
+    the packed request."""
+
+    command, kind, index, kwargs = operation
+    msg_type, _, payload = rtnl.pack_tc(command, kind, index, **dict(kwargs))
+
+    entry = rtnl.parse_tc(payload, 0, len(payload))
+    entry["type"] = TC_TYPES[msg_type]
+    return entry, payload
+
+
+def _tc_attrs(entry: dict) -> set:
+    options = entry["options"]
+    return {
+            bytes(options[offset - codec.RTATTR.size:end])
+            for _, offset, end in codec.iter_rtattr(options, 0, len(options))
+    }
+
+
+def _tc_builtin(entry: dict) -> bool:
+    if entry["type"] == "qdisc":
+        # the kernel's default qdiscs don't have a handle
+        return not entry["handle"]
+
+    # a u32 filter's root and hash tables, rather than its keys
+    return entry["kind"] == "u32" and not entry["handle"] & 0xFFF
+
+
+def _tc_delete(entry: dict) -> tuple:
+    kwargs = {"handle": entry["handle"], "parent": entry["parent"]}
+    if entry["type"] == "filter":
+        kwargs["info"] = entry["info"]
+
+    return (TC_DELETE[entry["type"]], None, entry["index"], kwargs)
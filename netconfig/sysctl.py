@@ -1,14 +1,346 @@
-# Copyright: 2020, CCX Technologies
+# Copyright: 2020-2026, CCX Technologies
+
+import os
+import time
+import resource
+import asyncio
+import fnmatch
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SYSCTL_ROOT = '/proc/sys'
+READ_SIZE = 65536
+
+# trees with more files than this are read in a thread pool
+PARALLEL_THRESHOLD = 256
+PARALLEL_WORKERS = 4
+
+# a session keeps at most this many files open by default, and never
+# more than half of the open file limit
+MAX_HANDLES = 4096
+
+
+def _default_max_handles() -> int:
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return MAX_HANDLES
+
+    return max(1, min(soft // 2, MAX_HANDLES))
+
+
+def _sysctl_split(key):
+    """Splits a key into path components.
+
+    Like sysctl(8) dots in names (ie. vlan interfaces) are written as
+    slashes, so "net.ipv4.conf.eth0/100.rp_filter" is the file
+    net/ipv4/conf/eth0.100/rp_filter, keys that use slashes as the
+    separator are taken as paths.
+    """
+
+    separators = [i for i in (key.find('.'), key.find('/')) if i >= 0]
+    if separators and key[min(separators)] == '/':
+        return [c for c in key.split('/') if c]
+
+    return [c.replace('/', '.') for c in key.split('.') if c]
+
+
+def _sysctl_key(components):
+    return '.'.join(c.replace('.', '/') for c in components)
+
+
+def _sysctl_path(key):
+    return '/'.join((SYSCTL_ROOT, *_sysctl_split(key)))
+
+
+def _sysctl_value(value):
+    # the kernel separates multiple values with tabs but accepts any
+    # whitespace, so compare values with normalised whitespace
+    return ' '.join(str(value).split())
 
 
 def sysctl_read(key):
     try:
-        with open(f'/proc/sys/{key.replace(".", "/")}', mode='r') as fi:
+        with open(_sysctl_path(key), mode='r') as fi:
             return fi.read().strip()
     except FileNotFoundError:
         return None
 
 
 def sysctl_write(key, value):
-    with open(f'/proc/sys/{key.replace(".", "/")}', mode='w') as fo:
+    with open(_sysctl_path(key), mode='w') as fo:
         fo.write(value)
+
+
+def _sysctl_walk(path, components, patterns):
+    try:
+        entries = list(os.scandir(path))
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+
+    for entry in entries:
+        if patterns and not fnmatch.fnmatchcase(entry.name, patterns[0]):
+            continue
+
+        if entry.is_dir(follow_symlinks=False):
+            yield from _sysctl_walk(
+                    entry.path, components + [entry.name], patterns[1:]
+            )
+        elif len(patterns) <= 1:
+            yield components + [entry.name], entry.path
+
+
+def _sysctl_read_file(path):
+    try:
+        with open(path, mode='r') as fi:
+            return fi.read().strip()
+    except OSError:
+        # some sysctls are write only, or can't be read in this context
+        return None
+
+
+def sysctl_read_tree(pattern: str = '', max_workers: int = PARALLEL_WORKERS):
+    """Reads every sysctl under a key, or matching a glob pattern.
+
+    Each component of the pattern can use fnmatch style wildcards,
+    ie. "net.ipv6.conf.*.accept_ra", and everything below a matching
+    directory is included, ie. "net.ipv4.conf" reads the whole subtree.
+    Large trees are read in a small thread pool.
+
+    Returns:
+        a flat dictionary of key: value, keys that couldn't be read
+        are left out
+    """
+
+    files = list(_sysctl_walk(SYSCTL_ROOT, [], _sysctl_split(pattern)))
+
+    paths = [path for _, path in files]
+    if len(paths) > PARALLEL_THRESHOLD and max_workers > 1:
+        with ThreadPoolExecutor(max_workers) as executor:
+            values = list(executor.map(_sysctl_read_file, paths, chunksize=64))
+    else:
+        values = [_sysctl_read_file(path) for path in paths]
+
+    return {
+            _sysctl_key(components): value
+            for (components, _), value in zip(files, values)
+            if value is not None
+    }
+
+
+class SysctlSession:
+    """Reads and writes sysctls through cached file handles.
+
+    Each key's /proc/sys file is opened once for reading and once for
+    writing, as they're first needed, and then read with pread and
+    written with pwrite at offset zero, so repeated access doesn't pay
+    for an open and close every time. The least recently used handles are
+    closed once there are more than max_handles open.
+
+    Keys which can't be read, ie. write only ones like
+    net.ipv4.route.flush, read as None, like keys that don't exist.
+
+    A pass over more keys than max_handles reopens every file, so it
+    should be sized for the workload, ie. the number of interfaces times
+    the keys set for each.
+
+    Args:
+        max_handles: maximum number of files to keep open, defaults to
+            half of the open file limit, up to MAX_HANDLES
+    """
+
+    def __init__(self, max_handles: int | None = None):
+        if max_handles is None:
+            max_handles = _default_max_handles()
+
+        self.max_handles = max_handles
+        self.handles: OrderedDict = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        while self.handles:
+            _, fd = self.handles.popitem()
+            os.close(fd)
+
+    def _open(self, key, flags: int) -> int:
+        try:
+            self.handles.move_to_end((key, flags))
+            return self.handles[(key, flags)]
+        except KeyError:
+            pass
+
+        fd = os.open(_sysctl_path(key), flags | os.O_CLOEXEC)
+        self.handles[(key, flags)] = fd
+
+        while len(self.handles) > self.max_handles:
+            _, old_fd = self.handles.popitem(last=False)
+            os.close(old_fd)
+
+        return fd
+
+    def _forget(self, key):
+        for flags in (os.O_RDONLY, os.O_WRONLY):
+            try:
+                os.close(self.handles.pop((key, flags)))
+            except KeyError:
+                pass
+
+    def _pread(self, key) -> str:
+        fd = self._open(key, os.O_RDONLY)
+        return os.pread(fd, READ_SIZE, 0).decode().strip()
+
+    def _pwrite(self, key, value: str):
+        os.pwrite(self._open(key, os.O_WRONLY), value.encode(), 0)
+
+    def read(self, key) -> str | None:
+        try:
+            return self._pread(key)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            return None
+
+        # the file goes away with its interface, so the cached handle may
+        # be stale if the interface has been re-created since
+        self._forget(key)
+
+        try:
+            return self._pread(key)
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        except PermissionError:
+            return None
+
+    def write(self, key, value):
+        value = str(value)
+
+        try:
+            self._pwrite(key, value)
+            return
+        except FileNotFoundError:
+            self._forget(key)
+
+        self._pwrite(key, value)
+
+    def read_many(self, keys) -> dict:
+        return {key: self.read(key) for key in keys}
+
+    def write_many(self, mapping: dict) -> dict:
+        """Writes only the values that differ from the current ones, keys
+        that can't be read are always written.
+
+        Returns:
+            a dictionary of the keys that were written, with
+            (old value, new value) tuples
+        """
+
+        changed = {}
+        for key, value in mapping.items():
+            current = self.read(key)
+            if current is not None and (
+                    _sysctl_value(current) == _sysctl_value(value)
+            ):
+                continue
+
+            self.write(key, value)
+            changed[key] = (current, str(value))
+
+        return changed
+
+
+class SysctlProfile:
+    """A set of sysctl values which are applied as a transaction.
+
+    Only the keys which differ from the live values (or can't be read)
+    are written, and if any write fails every key already written is
+    restored to its previous value before the error is raised, less the
+    keys that couldn't be read.
+
+    Args:
+        settings: a dictionary of key: value
+        session: the SysctlSession to use, by default a new one
+    """
+
+    def __init__(self, settings: dict, session: SysctlSession = None):
+        self.settings = dict(settings)
+        self.session = SysctlSession() if session is None else session
+
+    def diff(self) -> dict:
+        """Returns the keys to change, with (current, desired) tuples.
+
+        Keys that don't exist or can't be read are included with a
+        current value of None.
+        """
+
+        changes = {}
+        for key, value in self.settings.items():
+            current = self.session.read(key)
+            if current is None or (
+                    _sysctl_value(current) != _sysctl_value(value)
+            ):
+                changes[key] = (current, str(value))
+
+        return changes
+
+    def _rollback(self, applied) -> list:
+        failed = []
+        for key, value in reversed(applied):
+            if value is None:
+                # write only, so there's nothing to restore
+                continue
+
+            try:
+                self.session.write(key, value)
+            except OSError:
+                failed.append(key)
+
+        return failed
+
+    def _apply(self) -> dict:
+        results = {}
+        applied = []
+
+        for key, (current, value) in self.diff().items():
+            started = time.monotonic()
+
+            try:
+                if current is None and not os.path.exists(
+                        _sysctl_path(key)
+                ):
+                    raise FileNotFoundError(f"No sysctl {key}")
+
+                self.session.write(key, value)
+
+            except OSError as exc:
+                failed = self._rollback(applied)
+                if failed:
+                    raise RuntimeError(
+                            f"Failed to write {key}: {exc}, and failed to"
+                            f" roll back {', '.join(failed)}"
+                    ) from exc
+
+                raise RuntimeError(
+                        f"Failed to write {key}: {exc},"
+                        f" rolled back {len(applied)} keys"
+                ) from exc
+
+            applied.append((key, current))
+            results[key] = (current, value, time.monotonic() - started)
+
+        return results
+
+    async def apply(self, loop=None, executor=None) -> dict:
+        """Applies the profile in an executor.
+
+        Returns:
+            a dictionary of the keys that were written, with
+            (old value, new value, seconds taken) tuples
+        """
+
+        loop = asyncio.get_event_loop() if loop is None else loop
+        return await loop.run_in_executor(executor, self._apply)
@@ -0,0 +1,29 @@
+# Copyright: 2026, CCX Technologies
+
+import os
+import ctypes
+
+import pytest
+
+from netconfig import rtnl
+
+
+@pytest.fixture
+def netns():
+    """Runs a test in a new network namespace, and skips it without the
+    privileges to create one."""
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    original = os.open("/proc/self/ns/net", os.O_RDONLY)
+
+    try:
+        if libc.unshare(rtnl.CLONE_NEWNET) != 0:
+            pytest.skip("can't create a network namespace")
+
+        try:
+            yield
+        finally:
+            libc.setns(original, rtnl.CLONE_NEWNET)
+
+    finally:
+        os.close(original)
@@ -0,0 +1,96 @@
+# Copyright: 2026, CCX Technologies
+
+import asyncio
+
+import netaddr
+
+from netconfig import AIPRoute
+from netconfig import rtnl
+
+LOOPBACK = 1
+
+
+def _networks(*addresses):
+    return [netaddr.IPNetwork(address) for address in addresses]
+
+
+def _strings(addresses):
+    # IPNetworks compare by network, so 10.0.0.1/24 == 10.0.0.2/24
+    return [str(address) for address in addresses]
+
+
+def _ipv4(sock):
+    return sorted(
+            str(address)
+            for address in sock.get_addresses().get(LOOPBACK, [])
+            if address.version == 4
+    )
+
+
+def test_diff_addresses():
+    add, delete, unchanged = rtnl.diff_addresses(
+            _networks("10.0.0.1/24", "10.0.0.2/24", "fe80::1/64"),
+            ["10.0.0.2/24", "10.0.0.3/24", "0.0.0.0/0"]
+    )
+
+    assert _strings(add) == ["10.0.0.3/24"]
+    assert _strings(delete) == ["10.0.0.1/24"]
+    assert unchanged == 1
+
+
+def test_diff_addresses_deletes_secondaries_first():
+    _, delete, _ = rtnl.diff_addresses(
+            _networks("10.0.0.1/24", "10.0.1.1/24", "10.0.0.2/24"), []
+    )
+
+    assert _strings(delete) == ["10.0.0.2/24", "10.0.1.1/24", "10.0.0.1/24"]
+
+
+def test_sync_addresses_keeps_secondary(netns):
+    with rtnl.RtnlSocket() as sock:
+        sock.sync_addresses({LOOPBACK: ["10.0.0.1/24", "10.0.0.2/24"]})
+        assert _ipv4(sock) == ["10.0.0.1/24", "10.0.0.2/24"]
+
+        summary = sock.sync_addresses(
+                {LOOPBACK: ["127.0.0.1/8", "10.0.0.2/24", "10.0.0.3/24"]}
+        )[LOOPBACK]
+
+        assert _ipv4(sock) == ["10.0.0.2/24", "10.0.0.3/24", "127.0.0.1/8"]
+        assert _strings(summary["deleted"]) == ["10.0.0.1/24"]
+        assert not summary["failed"]
+
+
+def test_sync_addresses_deletes_secondaries(netns):
+    with rtnl.RtnlSocket() as sock:
+        sock.sync_addresses(
+                {LOOPBACK: ["10.0.0.1/24", "10.0.0.2/24", "10.0.0.3/24"]}
+        )
+
+        summary = sock.sync_addresses({LOOPBACK: ["127.0.0.1/8"]})[LOOPBACK]
+
+        assert _ipv4(sock) == ["127.0.0.1/8"]
+        assert not summary["failed"]
+
+
+def test_aiproute_sync_addresses_keeps_secondary(netns):
+
+    async def sync():
+        aipr = AIPRoute()
+        try:
+            await aipr.sync_addresses(
+                    LOOPBACK, ["127.0.0.1/8", "10.0.0.1/24", "10.0.0.2/24"]
+            )
+            return await aipr.sync_addresses(
+                    LOOPBACK, ["127.0.0.1/8", "10.0.0.2/24", "10.0.0.3/24"]
+            )
+        finally:
+            aipr.close()
+
+    summary = asyncio.run(sync())
+
+    with rtnl.RtnlSocket() as sock:
+        assert _ipv4(sock) == ["10.0.0.2/24", "10.0.0.3/24", "127.0.0.1/8"]
+
+    assert _strings(summary["deleted"]) == ["10.0.0.1/24"]
+    # 10.0.0.2/24 is added back if it went with its primary
+    assert "10.0.0.3/24" in _strings(summary["added"])
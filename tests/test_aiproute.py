@@ -0,0 +1,117 @@
+# Copyright: 2026, CCX Technologies
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from netconfig import aiproute
+from netconfig import AIPRoute
+
+
+def test_benchmark_pool(netns):
+    result = aiproute.benchmark_pool(0.3, 0.005, 4, 2, (1, 3))
+
+    # with one socket every read waits for a write to finish
+    assert result[1]["p50_latency"] > 0.001
+    assert result[3]["p50_latency"] < result[1]["p50_latency"]
+    assert result[3]["reads_per_sec"] > result[1]["reads_per_sec"]
+    for counts in result.values():
+        assert counts["writes_per_sec"] > 0
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_batch_forgets_link_state(netns):
+
+    async def batch():
+        aipr = AIPRoute(up_ttl=60.0)
+        try:
+            device_id = await aipr.add_device("test0", "bridge")
+            await aipr.set_up(device_id, True)
+            assert await aipr.get_name(device_id) == "test0"
+            await aipr.get_up(device_id)
+
+            async with aipr.batch() as operations:
+                operations.set_up(device_id, False)
+                operations.set_device_name(device_id, "test1")
+
+            # without waiting for the events
+            results = (
+                    await aipr.get_up(device_id), await
+                    aipr.get_name(device_id), await aipr.get_id("test0")
+            )
+
+            async with aipr.batch() as operations:
+                operations.delete_device(device_name="test1")
+
+            return results + (await aipr.get_id("test1"), )
+
+        finally:
+            aipr.close()
+
+    assert _run(batch()) == (False, "test1", 0, 0)
+
+
+def test_routine_forgets_link_state(netns):
+
+    def rename(device_id):
+
+        def routine(ipr):
+            ipr.link("set", index=device_id, ifname="test1")
+            ipr.link("set", index=device_id, state="up")
+
+        return routine
+
+    async def routine():
+        aipr = AIPRoute(up_ttl=60.0)
+        try:
+            device_id = await aipr.add_device("test0", "bridge")
+            assert await aipr.get_name(device_id) == "test0"
+            assert not await aipr.get_up(device_id)
+
+            await aipr.run_routine(rename(device_id))
+            results = (
+                    await aipr.get_up(device_id), await
+                    aipr.get_name(device_id), await aipr.get_id("test0")
+            )
+
+            await aipr.run_routine(
+                    lambda ipr: ipr.link("del", index=device_id)
+            )
+            return results + (await aipr.get_id("test1"), )
+
+        finally:
+            aipr.close()
+
+    assert _run(routine()) == (True, "test1", 0, 0)
+
+
+def test_link_getters_skip_pool(netns):
+
+    async def get():
+        aipr = AIPRoute(pool_size=1)
+        try:
+            async with aipr.lock:
+                return await asyncio.wait_for(aipr.get_name(1), 5.0)
+        finally:
+            aipr.close()
+
+    assert _run(get()) == "lo"
+
+
+def test_link_socket_reconnect(netns):
+
+    async def get():
+        aipr = AIPRoute(executor=ThreadPoolExecutor(1))
+        try:
+            assert await aipr._run(aipr._get_name, 1) == "lo"
+
+            for sock in aipr._link_sockets:
+                sock.sock.close()
+
+            return await aipr._run(aipr._get_name, 1), len(aipr._link_sockets)
+        finally:
+            aipr.close()
+
+    assert _run(get()) == ("lo", 1)
@@ -0,0 +1,169 @@
+# Copyright: 2026, CCX Technologies
+
+import random
+
+import pytest
+
+from netconfig import codec
+
+SEED = 20260
+
+
+def _random_attrs(rng, depth=0):
+    """Returns a list of (rta_type, payload or nested list) and the packed
+    attributes."""
+
+    attrs, packed = [], []
+
+    for _ in range(rng.randrange(0, 6)):
+        rta_type = rng.randrange(1, 0x3FFF)
+
+        if depth < 3 and rng.random() < 0.3:
+            nested, payload = _random_attrs(rng, depth + 1)
+            attrs.append((rta_type, nested))
+            packed.append(codec.pack_nested(rta_type, payload))
+        else:
+            payload = rng.randbytes(rng.randrange(0, 40))
+            attrs.append((rta_type, payload))
+            packed.append(codec.pack_rtattr(rta_type, payload))
+
+    return attrs, b"".join(packed)
+
+
+def _unpack_attrs(data, offset, end, expected):
+    attrs = []
+
+    for (rta_type, start, stop), (_, value) in zip(
+            codec.iter_rtattr(data, offset, end), expected
+    ):
+        if isinstance(value, list):
+            attrs.append((rta_type, _unpack_attrs(data, start, stop, value)))
+        else:
+            attrs.append((rta_type, bytes(data[start:stop])))
+
+    return attrs
+
+
+def _random_messages(rng, count):
+    messages, packed = [], []
+
+    for seq in range(count):
+        msg_type = rng.randrange(16, 100)
+        attrs, payload = _random_attrs(rng)
+        messages.append((msg_type, seq, attrs))
+        packed.append(
+                codec.pack_nlmsg(
+                        msg_type, 0, seq, 0,
+                        codec.pack_ifinfomsg(index=seq) + payload
+                )
+        )
+
+    return messages, b"".join(packed)
+
+
+def test_round_trip():
+    rng = random.Random(SEED)
+
+    for _ in range(200):
+        messages, data = _random_messages(rng, rng.randrange(1, 8))
+        data = memoryview(data)
+
+        parsed = [
+                (
+                        msg_type, seq,
+                        _unpack_attrs(
+                                data, offset + codec.IFINFOMSG.size, end,
+                                messages[seq][2]
+                        )
+                ) for msg_type, _, seq, _, offset, end in
+                codec.iter_nlmsg(data)
+        ]
+
+        assert parsed == messages
+
+
+def test_nested_flags_masked():
+    data = codec.pack_nested(5, codec.pack_u32(6, 7))
+    ((rta_type, start, stop), ) = codec.iter_rtattr(data, 0, len(data))
+    ((inner, value_start, value_end), ) = codec.iter_rtattr(data, start, stop)
+
+    assert (rta_type, inner) == (5, 6)
+    assert codec.get_u32(data, value_start, value_end) == 7
+
+
+def test_truncated():
+    rng = random.Random(SEED)
+    messages, data = _random_messages(rng, 20)
+    ends = [end for *_, end in codec.iter_nlmsg(data)]
+
+    for length in range(len(data)):
+        truncated = data[:length]
+        parsed = list(codec.iter_nlmsg(truncated))
+
+        # only whole messages, and every attribute inside them
+        assert [end for *_, end in parsed] == [
+                end for end in ends if end <= length
+        ]
+        for *_, offset, end in parsed:
+            list(codec.iter_rtattr(truncated, offset, end))
+
+        # attributes cut off part way are dropped, not misread
+        for rta_type, start, stop in codec.iter_rtattr(
+                truncated, codec.NLMSGHDR.size + codec.IFINFOMSG.size, length
+        ):
+            assert stop <= length
+
+
+def test_corrupt_lengths():
+    rng = random.Random(SEED)
+
+    for _ in range(2000):
+        data = rng.randbytes(rng.randrange(0, 64))
+
+        for *_, offset, end in codec.iter_nlmsg(data):
+            assert codec.NLMSGHDR.size <= end <= len(data)
+            for _, start, stop in codec.iter_rtattr(data, offset, end):
+                assert offset <= start <= stop <= end
+
+
+def test_arp_round_trip():
+    rng = random.Random(SEED)
+
+    for _ in range(100):
+        op = rng.choice((codec.ARPOP_REQUEST, codec.ARPOP_REPLY))
+        src_hw, dst_hw, eth_dst = (rng.randbytes(6) for _ in range(3))
+        src_ip, dst_ip = rng.randbytes(4), rng.randbytes(4)
+
+        frame = codec.pack_arp(op, src_hw, src_ip, dst_hw, dst_ip, eth_dst)
+
+        assert frame[:6] == eth_dst
+        assert codec.parse_arp(frame) == (op, src_hw, src_ip, dst_hw, dst_ip)
+
+
+@pytest.mark.parametrize("length", range(0, 42))
+def test_arp_truncated(length):
+    frame = codec.pack_arp(
+            codec.ARPOP_REPLY, b"\x02" * 6, b"\x0a\0\0\x01", b"\x02" * 6,
+            b"\x0a\0\0\x02", b"\xff" * 6
+    )
+
+    assert codec.parse_arp(frame[:length]) is None
+
+
+def test_arp_other_ethertype():
+    frame = bytearray(
+            codec.pack_arp(
+                    codec.ARPOP_REPLY, bytes(6), bytes(4), bytes(6), bytes(4),
+                    bytes(6)
+            )
+    )
+    frame[12:14] = codec.BE16.pack(codec.ETH_P_IP)
+
+    assert codec.parse_arp(frame) is None
+
+
+def test_benchmark():
+    result = codec.benchmark(100)
+
+    assert result["nlmsg"] > 0
+    assert result["arp"] > 0
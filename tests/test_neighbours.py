@@ -0,0 +1,81 @@
+# Copyright: 2026, CCX Technologies
+
+import time
+import asyncio
+import subprocess
+
+from netconfig import AIPRoute
+from netconfig import NeighbourCache
+
+MAC = "02:00:00:00:00:02"
+
+
+def _ip(*args):
+    subprocess.run(["ip", *args], check=True)
+
+
+def _reachable(command):
+    # confirms the neighbour, which the kernel doesn't send an event for
+    # unless its state changes
+    _ip(
+            "neigh", command, "10.0.0.2", "lladdr", MAC, "dev", "br0", "nud",
+            "reachable"
+    )
+
+
+def test_refresh_shortens_interval(netns):
+
+    async def refresh():
+        cache = NeighbourCache()
+        try:
+            await cache.start()
+            resyncs = [cache.resyncs]
+
+            # the last dump is fresh enough
+            await cache.refresh(1.0)
+            resyncs.append(cache.resyncs)
+
+            await asyncio.sleep(1.2)
+            await cache.refresh(1.0)
+            resyncs.append(cache.resyncs)
+
+            return resyncs, cache.resync_interval
+
+        finally:
+            cache.close()
+
+    resyncs, interval = asyncio.run(refresh())
+
+    assert resyncs == [1, 1, 2]
+    assert interval == 1.0
+
+
+def test_arp_cache_stale_timeout_below_resync(netns):
+    _ip("link", "add", "br0", "type", "bridge")
+    _ip("link", "set", "br0", "up")
+    _ip("addr", "add", "10.0.0.1/24", "dev", "br0")
+    _reachable("add")
+
+    async def arp_cache():
+        aipr = AIPRoute()
+        try:
+            index = await aipr.get_id("br0")
+            caches = [await aipr.get_arp_cache(index, stale_timeout=3)]
+
+            await asyncio.sleep(2.0)
+            _reachable("change")
+            await asyncio.sleep(2.0)
+
+            # confirmed 2s ago, but 4s after the last dump
+            caches.append(await aipr.get_arp_cache(index, stale_timeout=3))
+            return caches, aipr.neighbours.resync_interval
+
+        finally:
+            aipr.close()
+
+    started = time.monotonic()
+    caches, interval = asyncio.run(arp_cache())
+
+    assert caches == [{MAC: "10.0.0.2"}, {MAC: "10.0.0.2"}]
+    assert interval == 1.5
+    assert time.monotonic() - started < 10
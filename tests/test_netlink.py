@@ -0,0 +1,305 @@
+# Copyright: 2026, CCX Technologies
+
+import asyncio
+
+import pytest
+
+from netconfig import netlink
+
+UP = {"up": True, "lower_up": True}
+DOWN = {"up": True, "lower_up": False}
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_subscription_unknown_policy():
+    with pytest.raises(ValueError):
+        netlink.Subscription("eth0", "sometimes")
+
+
+def test_subscription_drop_oldest():
+
+    async def deliver():
+        subscription = netlink.Subscription(
+                "eth0", netlink.POLICY_DROP_OLDEST, 2
+        )
+        for i in range(5):
+            await subscription.put({"seq": i})
+
+        return subscription, [
+                subscription.get_nowait() for _ in range(subscription.lag)
+        ]
+
+    subscription, messages = _run(deliver())
+
+    assert messages == [{"seq": 3}, {"seq": 4}]
+    assert subscription.dropped == 3
+    assert subscription.delivered == 5
+    assert subscription.max_lag == 2
+
+
+def test_subscription_coalesce():
+
+    async def deliver():
+        subscription = netlink.Subscription("eth0", netlink.POLICY_COALESCE)
+        subscription.put_nowait({"up": True})
+        subscription.put_nowait({"lower_up": True})
+        subscription.put_nowait({"up": False})
+
+        return subscription, [
+                subscription.get_nowait() for _ in range(subscription.lag)
+        ]
+
+    subscription, messages = _run(deliver())
+
+    assert messages == [{"up": False, "lower_up": True}]
+    assert subscription.coalesced == 2
+
+
+def test_subscription_block():
+
+    async def deliver():
+        subscription = netlink.Subscription("eth0", netlink.POLICY_BLOCK, 1)
+        await subscription.put({"seq": 0})
+
+        blocked = asyncio.ensure_future(subscription.put({"seq": 1}))
+        await asyncio.sleep(0)
+        waiting = not blocked.done()
+
+        first = await subscription.get()
+        await blocked
+
+        return waiting, first, await subscription.get()
+
+    waiting, first, second = _run(deliver())
+
+    assert waiting
+    assert (first, second) == ({"seq": 0}, {"seq": 1})
+
+
+def test_dampening_hold():
+    dampening = netlink.Dampening(hold_up=2.0, hold_down=1.0)
+
+    # the first state is reported straight away
+    assert dampening.update(UP, 0.0) == (dict(UP, suppressed=0), None)
+
+    assert dampening.update(DOWN, 10.0) == (None, 11.0)
+    assert dampening.settle(10.5) == (None, 11.0)
+    assert dampening.settle(11.0) == (dict(DOWN, suppressed=0), None)
+
+    # back to the reported state before the hold time, nothing is sent
+    assert dampening.update(UP, 20.0) == (None, 22.0)
+    assert dampening.update(DOWN, 21.0) == (None, None)
+    assert dampening.settle(22.0) == (None, None)
+
+    assert dampening.update(UP, 30.0) == (None, 32.0)
+    message, deadline = dampening.settle(32.0)
+    assert deadline is None
+    assert message == dict(UP, suppressed=2)
+
+
+def test_dampening_suppress():
+    dampening = netlink.Dampening(
+            penalty=1000.0, suppress=2000.0, reuse=500.0, half_life=10.0
+    )
+
+    dampening.update(UP, 0.0)
+    assert dampening.update(DOWN, 0.0)[0] == dict(DOWN, suppressed=0)
+
+    # the second transition reaches suppress, and is held until the
+    # penalty has halved twice, to reuse
+    message, deadline = dampening.update(UP, 0.0)
+    assert message is None
+    assert dampening.suppressed
+    assert deadline == pytest.approx(20.0)
+
+    assert dampening.settle(10.0)[0] is None
+    message, _ = dampening.settle(20.0 + 1e-6)
+    assert message == dict(UP, suppressed=0)
+    assert not dampening.suppressed
+    assert dampening.stats()["transitions"] == 2
+
+
+def test_dampening_reuse():
+    with pytest.raises(ValueError):
+        netlink.Dampening(suppress=100.0, reuse=200.0)
+
+
+def test_link_cache_events():
+    cache = netlink.LinkCache()
+
+    cache._handle(netlink.RTM_NEWLINK, 2, 0, "eth0")
+    assert cache.get_index("eth0") == 2
+    assert cache.get_name(2) == "eth0"
+
+    # a rename replaces the old name
+    cache._handle(netlink.RTM_NEWLINK, 2, 0, "wan0")
+    assert cache.get_index("eth0") is None
+    assert cache.get_index("wan0") == 2
+
+    cache._handle(netlink.RTM_DELLINK, 2, 0, "wan0")
+    assert cache.get_index("wan0") is None
+    assert cache.get_name(2) is None
+
+
+def test_link_cache_learn():
+
+    async def learn():
+        cache = netlink.LinkCache()
+        cache._task = asyncio.get_running_loop().create_future()
+
+        generation = cache.generation
+        cache.learn("eth0", 2, generation)
+
+        # an event arrived since the lookup, so its result may be stale
+        generation = cache.generation
+        cache._handle(netlink.RTM_NEWLINK, 3, 0, "eth1")
+        cache.learn("eth2", 4, generation)
+
+        cache._task.cancel()
+        return cache
+
+    cache = _run(learn())
+
+    assert cache.get_index("eth0") == 2
+    assert cache.get_index("eth1") == 3
+    assert cache.get_index("eth2") is None
+
+
+def test_link_cache_learn_not_running():
+    cache = netlink.LinkCache()
+    cache.learn("eth0", 2, cache.generation)
+
+    assert cache.get_index("eth0") is None
+
+
+def test_link_cache_wait_for():
+
+    async def wait():
+        cache = netlink.LinkCache()
+        added = cache.wait_for("eth0")
+        deleted = cache.wait_for("eth0", netlink.RTM_DELLINK, 2)
+        lost = cache.wait_for("eth1")
+
+        cache._handle(netlink.RTM_NEWLINK, 2, 0, "eth0")
+        deleted_early = deleted.done()
+        cache._handle(netlink.RTM_DELLINK, 3, 0, "eth0")
+        wrong_index = deleted.done()
+        cache._handle(netlink.RTM_DELLINK, 2, 0, "eth0")
+
+        # events were lost, so the waiters are woken to check
+        cache.clear()
+
+        unused = cache.wait_for("eth2")
+        cache.discard("eth2", unused)
+
+        return (
+                await added, deleted_early, wrong_index, await deleted,
+                await lost, unused.cancelled(), cache._waiters
+        )
+
+    assert _run(wait()) == (2, False, False, 2, None, True, {})
+
+
+def test_link_cache_forget():
+    cache = netlink.LinkCache()
+    cache._handle(netlink.RTM_NEWLINK, 2, 0, "eth0")
+    cache._handle(netlink.RTM_NEWLINK, 3, 0, "eth1")
+    generation = cache.generation
+
+    assert cache.forget(name="eth0") == 2
+    assert cache.get_name(2) is None
+
+    # a rename, by index and the new name
+    assert cache.forget(name="eth0", index=3) == 3
+    assert cache.get_index("eth1") is None
+
+    assert cache.generation > generation
+    assert not cache.names and not cache.indexes
+
+
+def test_subscription_deliver_backlog():
+
+    async def deliver():
+        subscription = netlink.Subscription("eth0", netlink.POLICY_BLOCK, 1)
+        for i in range(3):
+            subscription.deliver({"seq": i})
+
+        lag = subscription.lag
+        messages = [await subscription.get() for _ in range(3)]
+        await asyncio.sleep(0)
+
+        return subscription, lag, messages
+
+    subscription, lag, messages = _run(deliver())
+
+    assert lag == 3
+    assert messages == [{"seq": 0}, {"seq": 1}, {"seq": 2}]
+    assert not subscription.backlog
+    assert subscription.delivered == 3
+
+
+def test_state_monitor_slow_subscriber():
+
+    async def publish():
+        monitor = netlink.StateMonitor(sock=object())
+        slow = monitor.subscribe("eth0", netlink.POLICY_BLOCK, 1)
+        fast = monitor.subscribe("eth0", netlink.POLICY_BLOCK)
+        latest = monitor.subscribe("eth0", netlink.POLICY_DROP_OLDEST, 1)
+
+        for i in range(3):
+            # returns without waiting for the slow subscriber
+            monitor._publish("eth0", {"seq": i})
+
+        messages = [fast.get_nowait() for _ in range(fast.lag)]
+        slow_lag = slow.lag
+        task = slow._task
+
+        monitor.unsubscribe(slow)
+        await asyncio.sleep(0)
+
+        return messages, latest.get_nowait(), slow_lag, task
+
+    messages, latest, slow_lag, task = _run(publish())
+
+    assert messages == [{"seq": 0}, {"seq": 1}, {"seq": 2}]
+    assert latest == {"seq": 2}
+    assert slow_lag == 3
+    assert task.cancelled()
+
+
+def test_subscription_backlog_bounded():
+
+    async def flood(maxsize):
+        subscription = netlink.Subscription(
+                "eth0", netlink.POLICY_BLOCK, maxsize
+        )
+        for i in range(COUNT):
+            subscription.deliver({"seq": i, f"key{i % 3}": i})
+
+        lag = subscription.lag
+        messages = []
+        while subscription.lag:
+            messages.append(await subscription.get())
+            await asyncio.sleep(0)
+
+        subscription.close()
+        return subscription, lag, messages
+
+    COUNT = 20 * netlink.MAX_BACKLOG
+
+    for maxsize in (0, 4):
+        subscription, lag, messages = _run(flood(maxsize))
+        queued = maxsize or netlink.MAX_BACKLOG
+
+        assert lag == queued + netlink.MAX_BACKLOG
+        assert len(messages) == lag
+        assert subscription.coalesced == COUNT - lag
+        # the oldest are in order, and the newest state isn't lost
+        assert [m["seq"] for m in messages[:-1]] == list(range(lag - 1))
+        assert messages[-1] == dict(
+                {f"key{i % 3}": i for i in range(COUNT - 3, COUNT)},
+                seq=COUNT - 1
+        )
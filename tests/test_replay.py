@@ -0,0 +1,95 @@
+# Copyright: 2026, CCX Technologies
+
+import asyncio
+
+from netconfig import replay
+
+NETLINK_GENERIC = 16
+
+
+def _records(count):
+    return [
+            (float(timestamp), data)
+            for timestamp, data in replay.link_storm(count, interval=1.0)
+    ]
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / "links.pcap")
+    records = _records(4)
+
+    with replay.NetlinkRecorder(path) as recorder:
+        for timestamp, data in records:
+            recorder.write(timestamp, data)
+
+    assert [data for _, data in replay.read_recording(path)
+            ] == [data for _, data in records]
+
+
+def test_recording_has_nlmon_header(tmp_path):
+    path = str(tmp_path / "links.pcap")
+    data = _records(1)[0][1]
+
+    with replay.NetlinkRecorder(path) as recorder:
+        recorder.write(0.0, data)
+
+    with open(path, "rb") as fi:
+        fi.seek(replay.PCAP_HEADER.size)
+        _, _, length, _ = replay.PCAP_RECORD.unpack(
+                fi.read(replay.PCAP_RECORD.size)
+        )
+        header = fi.read(replay.NLMON_HEADER.size)
+
+    assert length == replay.NLMON_HEADER.size + len(data)
+    assert header == bytes.fromhex("0007 0338 0000 0000000000000000 0000")
+
+
+def test_read_recording_skips_other_families(tmp_path):
+    path = str(tmp_path / "mixed.pcap")
+    route, generic = _records(2)
+
+    with replay.NetlinkRecorder(path) as recorder:
+        recorder.write(*route)
+
+        # as nlmon would capture a generic netlink datagram
+        header = replay.NLMON_HEADER.pack(
+                replay.PACKET_USER, replay.ARPHRD_NETLINK, 0, b"",
+                NETLINK_GENERIC
+        )
+        recorder.fo.write(
+                replay.PCAP_RECORD.pack(
+                        0, 0,
+                        len(header) + len(generic[1]),
+                        len(header) + len(generic[1])
+                ) + header + generic[1]
+        )
+
+    assert [data for _, data in replay.read_recording(path)] == [route[1]]
+
+
+def test_read_recording_without_header(tmp_path):
+    path = str(tmp_path / "bare.pcap")
+    records = _records(3)
+
+    with replay.NetlinkRecorder(path) as recorder:
+        for _, data in records:
+            recorder.fo.write(
+                    replay.PCAP_RECORD.pack(0, 0, len(data), len(data)) + data
+            )
+
+    assert [data for _, data in replay.read_recording(path)
+            ] == [data for _, data in records]
+
+
+def test_benchmark_stops_monitor():
+
+    async def run():
+        result = await replay.benchmark(_records(200))
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        return result, pending
+
+    result, pending = asyncio.run(run())
+
+    assert result["events"] == 200
+    # the monitor has stopped, not just been asked to
+    assert not pending
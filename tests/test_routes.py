@@ -0,0 +1,81 @@
+# Copyright: 2026, CCX Technologies
+
+import socket
+
+from netconfig import codec
+from netconfig import rtnl
+
+RTNL_FAMILY_IPMR = 128
+RTPROT_BIRD = 12
+
+
+def _route(dst, proto=rtnl.RTPROT_STATIC, **kwargs):
+    return rtnl.normalise_route(dict(kwargs, dst=dst, proto=proto))
+
+
+def _dsts(routes):
+    return sorted(route["dst"] for route in routes)
+
+
+CURRENT = [
+        _route("10.1.0.0/16", gateway="192.0.2.1"),
+        _route("10.2.0.0/16", gateway="192.0.2.1"),
+        _route("10.3.0.0/16", proto=RTPROT_BIRD, gateway="192.0.2.1"),
+        _route("10.4.0.0/16", proto=rtnl.RTPROT_KERNEL, oif=2),
+        _route("2001:db8::/32", gateway="2001:db8:ffff::1"),
+]
+
+
+def test_diff_routes():
+    add, replace, delete, unchanged = rtnl.diff_routes(
+            CURRENT, [
+                    _route("10.1.0.0/16", gateway="192.0.2.1"),
+                    _route("10.2.0.0/16", gateway="192.0.2.2"),
+                    _route("10.5.0.0/16", gateway="192.0.2.1"),
+            ]
+    )
+
+    assert _dsts(add) == ["10.5.0.0/16"]
+    assert _dsts(replace) == ["10.2.0.0/16"]
+    # not the other protocol, the kernel's route or the IPv6 route
+    assert _dsts(delete) == []
+    assert unchanged == 1
+
+
+def test_diff_routes_deletes_in_desired_families():
+    _, _, delete, _ = rtnl.diff_routes(
+            CURRENT, [_route("10.1.0.0/16", gateway="192.0.2.1")]
+    )
+    assert _dsts(delete) == ["10.2.0.0/16"]
+
+    _, _, delete, _ = rtnl.diff_routes(
+            CURRENT, [_route("10.1.0.0/16", gateway="192.0.2.1")],
+            family=socket.AF_UNSPEC
+    )
+    assert _dsts(delete) == ["10.2.0.0/16", "2001:db8::/32"]
+
+
+def test_diff_routes_proto():
+    _, _, delete, _ = rtnl.diff_routes(
+            CURRENT, [], proto=RTPROT_BIRD, family=socket.AF_INET
+    )
+    assert _dsts(delete) == ["10.3.0.0/16"]
+
+    # nothing desired, so no families to delete from
+    _, _, delete, _ = rtnl.diff_routes(CURRENT, [], proto=RTPROT_BIRD)
+    assert _dsts(delete) == []
+
+
+def test_get_routes_skips_other_families(monkeypatch):
+    ipmr = codec.pack_rtmsg(
+            family=RTNL_FAMILY_IPMR, dst_len=32, table=rtnl.RT_TABLE_MAIN
+    ) + codec.pack_rtattr(rtnl.RTA_DST, bytes(4) + bytes(12))
+    route = rtnl.pack_route({"dst": "10.1.0.0/16", "gateway": "192.0.2.1"})
+
+    def dump(msg_type, payload):
+        for data in (ipmr, route):
+            yield rtnl.RTM_NEWROUTE, data, 0, len(data)
+
+    with rtnl.RtnlSocket() as sock:
+        monkeypatch.setattr(sock, "dump", dump)
+        assert _dsts(sock.get_routes()) == ["10.1.0.0/16"]
@@ -0,0 +1,107 @@
+# Copyright: 2026, CCX Technologies
+
+import socket
+
+from netconfig import rtnl
+
+RTPROT_BIRD = 12
+
+
+def _rule(priority, **kwargs):
+    return rtnl.normalise_rule(dict(kwargs, priority=priority))
+
+
+def _priorities(rules):
+    return sorted(rule["priority"] for rule in rules)
+
+
+CURRENT = [
+        _rule(0, table=rtnl.RT_TABLE_LOCAL),
+        _rule(100, src="10.1.0.0/16", table=100),
+        _rule(200, fwmark=1, table=200),
+        _rule(300, iifname="eth1", table=300, protocol=RTPROT_BIRD),
+        _rule(32766, table=rtnl.RT_TABLE_MAIN),
+        _rule(32767, table=rtnl.RT_TABLE_DEFAULT),
+]
+
+
+def test_normalise_rule():
+    rule = _rule(200, fwmark=1, table=200)
+
+    assert rule["fwmask"] == 0xFFFFFFFF
+    assert rule["src"] is None
+    assert _rule(100, src="10.1.0.0/16", table=100)["src"] == "10.1.0.0/16"
+
+
+def test_diff_rules():
+    add, replace, delete, unchanged = rtnl.diff_rules(
+            CURRENT, [
+                    _rule(100, src="10.1.0.0/16", table=100),
+                    _rule(200, fwmark=1, table=201),
+                    _rule(400, dst="10.2.0.0/16", table=400),
+            ]
+    )
+
+    assert _priorities(add) == [400]
+    assert [(old["table"], new["table"]) for old, new in replace
+            ] == [(200, 201)]
+    # never the default rules, or another daemon's
+    assert not delete
+    assert unchanged == 1
+
+
+def test_diff_rules_selectors():
+    # a different selector is a different rule, not a replacement
+    add, replace, delete, _ = rtnl.diff_rules(
+            CURRENT, [_rule(100, src="10.9.0.0/16", table=100)]
+    )
+
+    assert _priorities(add) == [100]
+    assert not replace
+    assert _priorities(delete) == [100, 200]
+
+
+def test_diff_rules_protocol():
+    _, _, delete, _ = rtnl.diff_rules(CURRENT, [], RTPROT_BIRD)
+
+    assert not delete
+
+    _, _, delete, _ = rtnl.diff_rules(
+            CURRENT, [], RTPROT_BIRD, socket.AF_UNSPEC
+    )
+
+    assert _priorities(delete) == [300]
+
+
+def test_diff_rules_family():
+    _, _, delete, _ = rtnl.diff_rules(
+            CURRENT, [_rule(400, dst="2001:db8::/32", table=400)]
+    )
+
+    # only IPv6 rules are in desired
+    assert not delete
+
+
+def test_sync_rules_keeps_foreign_rules(netns):
+    with rtnl.RtnlSocket() as sock:
+        sock.sync_rules(
+                [
+                        dict(
+                                priority=300, iifname="lo", table=300,
+                                protocol=RTPROT_BIRD
+                        )
+                ]
+        )
+
+        summary = sock.sync_rules(
+                [dict(priority=100, src="10.1.0.0/16", table=100)]
+        )
+        rules = _priorities(
+                rule for rule in sock.get_rules()
+                if rule["family"] == socket.AF_INET
+        )
+
+    assert _priorities(summary["added"]) == [100]
+    assert not summary["deleted"]
+    assert not summary["failed"]
+    assert 300 in rules
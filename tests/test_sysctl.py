@@ -0,0 +1,73 @@
+# Copyright: 2026, CCX Technologies
+
+import os
+import asyncio
+import resource
+
+import pytest
+
+from netconfig import sysctl
+from netconfig import SysctlSession
+from netconfig import SysctlProfile
+
+# write only, it flushes the route cache
+FLUSH = "net.ipv4.route.flush"
+
+
+@pytest.mark.parametrize(
+        "soft, expected", [
+                (1024, 512),
+                (20000, sysctl.MAX_HANDLES),
+                (1, 1),
+                (resource.RLIM_INFINITY, sysctl.MAX_HANDLES),
+        ]
+)
+def test_default_max_handles(monkeypatch, soft, expected):
+    monkeypatch.setattr(
+            resource, "getrlimit", lambda limit: (soft, resource.RLIM_INFINITY)
+    )
+
+    with SysctlSession() as session:
+        assert session.max_handles == expected
+
+
+def test_session_evicts():
+    keys = [
+            "net.ipv4.ip_forward", "net.core.somaxconn",
+            "net.ipv4.tcp_syncookies", "kernel.ostype"
+    ]
+
+    with SysctlSession(max_handles=2) as session:
+        values = session.read_many(keys)
+
+        assert values == {key: sysctl.sysctl_read(key) for key in keys}
+        assert list(session.handles) == [
+                (key, os.O_RDONLY) for key in keys[2:]
+        ]
+
+    assert not session.handles
+
+
+def test_session_write_only(netns):
+    with SysctlSession() as session:
+        assert session.read(FLUSH) is None
+        assert session.write_many({FLUSH: 1}) == {FLUSH: (None, "1")}
+        assert list(session.handles) == [(FLUSH, os.O_WRONLY)]
+
+        # a write never goes through a handle opened to read
+        forwarding = "net.ipv4.ip_forward"
+        current = session.read(forwarding)
+        session.write(forwarding, current)
+        assert list(session.handles)[-2:] == [
+                (forwarding, os.O_RDONLY), (forwarding, os.O_WRONLY)
+        ]
+
+
+def test_profile_write_only(netns):
+    profile = SysctlProfile({FLUSH: 1})
+
+    assert profile.diff() == {FLUSH: (None, "1")}
+    assert list(asyncio.run(profile.apply())) == [FLUSH]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(SysctlProfile({"net.ipv4.no_such_key": 1}).apply())
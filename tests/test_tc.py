@@ -0,0 +1,225 @@
+# Copyright: 2026, CCX Technologies
+
+import asyncio
+import subprocess
+
+import pytest
+
+from netconfig import rtnl
+from netconfig import AIPRoute
+from netconfig import TcSnapshot
+
+
+@pytest.mark.parametrize(
+        "keys, words", [
+                (["0xc0a80000/0xffffff00+16"], [(0xffffff00, 0xc0a80000, 16)]),
+                (["0/0+0"], [(0, 0, 0)]),
+                (["0x1/0xff+9@0"], [(0xff000000, 0x01000000, 9)]),
+                # the leading zero bytes of the mask move the offset
+                (
+                        ["0x00160000/0x00ff0000+20"],
+                        [(0xff000000, 0x16000000, 21)]
+                ),
+                # keys for neighbouring bytes are merged into one word
+                (
+                        [
+                                "0x0a000000/0xff000000+12",
+                                "0x00010000/0x00ff0000+12"
+                        ],
+                        [(0xffff0000, 0x0a010000, 12)],
+                ),
+                # later keys for the same byte win
+                (
+                        [
+                                "0x0a000000/0xff000000+12",
+                                "0x0b000000/0xff000000+12"
+                        ],
+                        [(0xff000000, 0x0b000000, 12)],
+                ),
+                (
+                        ["0x06/0xff+9", "0x0a000001/0xffffffff+16"],
+                        [
+                                (0xff000000, 0x06000000, 9),
+                                (0xffffffff, 0x0a000001, 16),
+                        ],
+                ),
+        ]
+)
+def test_u32_keys(keys, words):
+    assert rtnl._u32_keys(keys) == words
+
+
+def test_u32_keys_empty():
+    with pytest.raises(ValueError):
+        rtnl._u32_keys([])
+
+
+def _entry(entry_type, handle, parent, options=b"", info=0, kind="htb"):
+    return {
+            "type": entry_type,
+            "index": 2,
+            "handle": handle,
+            "parent": parent,
+            "info": info,
+            "kind": kind,
+            "options": options,
+            "stats": None,
+    }
+
+
+def test_tc_snapshot_diff():
+    qdisc = _entry("qdisc", 0x10000, rtnl.TC_H_ROOT)
+    slow = _entry("class", 0x10001, rtnl.TC_H_ROOT, b"slow")
+    fast = _entry("class", 0x10001, rtnl.TC_H_ROOT, b"fast")
+    extra = _entry("class", 0x10002, 0x10001)
+    u32 = _entry("filter", 0x800800, 0x10000, b"keys", 0x10800, "u32")
+
+    current = TcSnapshot([qdisc, slow, extra])
+    desired = TcSnapshot([qdisc, fast, u32])
+
+    assert current.diff(desired) == ([u32], [(slow, fast)], [extra])
+    assert desired.diff(desired) == ([], [], [])
+
+
+HTB = [
+        ("add", "htb", 2, {
+                "handle": "1:",
+                "parent": rtnl.TC_H_ROOT
+        }),
+        ("add-class", "htb", 2, {
+                "handle": "1:10",
+                "parent": "1:",
+                "rate": "10mbit"
+        }),
+]
+
+
+def test_tc_snapshot_plan_deletes():
+    current = TcSnapshot(
+            [
+                    _entry("qdisc", 0x10000, rtnl.TC_H_ROOT),
+                    _entry("class", 0x10010, 0x10000),
+                    _entry("class", 0x10020, 0x10000),
+                    _entry("class", 0x10030, 0x10020),
+                    # the u32 root and hash table
+                    _entry("filter", 0, 0x10000, info=0x10008, kind="u32"),
+                    _entry(
+                            "filter", 0x80000000, 0x10000, info=0x10008,
+                            kind="u32"
+                    ),
+                    _entry(
+                            "filter", 0x80000800, 0x10000, b"keys", 0x10008,
+                            "u32"
+                    ),
+            ]
+    )
+
+    add, change, delete, unchanged = current.plan(HTB, HTB)
+
+    assert not add and not change
+    assert unchanged == 2
+    assert delete == [
+            ("del-filter", None, 2, {
+                    "handle": 0x80000800, "parent": 0x10000, "info": 0x10008
+            }),
+            # children before their parents
+            ("del-class", None, 2, {"handle": 0x10030, "parent": 0x10020}),
+            ("del-class", None, 2, {"handle": 0x10020, "parent": 0x10000}),
+    ]
+
+    # everything else goes with the qdisc
+    assert current.plan([], devices={2}) == (
+            [], [], [
+                    ("del", None, 2, {
+                            "handle": 0x10000, "parent": rtnl.TC_H_ROOT
+                    })
+            ], 0
+    )
+
+
+def _tree(index, rate="10mbit", hosts=(1, 2, 3)):
+    return [
+            ("add", "htb", index, {
+                    "handle": "1:",
+                    "parent": rtnl.TC_H_ROOT,
+                    "default": 0x10
+            }),
+            ("add-class", "htb", index, {
+                    "handle": "1:10",
+                    "parent": "1:",
+                    "rate": rate
+            }),
+            ("add-class", "htb", index, {
+                    "handle": "1:20",
+                    "parent": "1:",
+                    "rate": "5mbit"
+            }),
+    ] + [
+            ("add-filter", "u32", index, {
+                    "parent": "1:",
+                    "prio": 1,
+                    "protocol": 0x800,
+                    "target": "1:10",
+                    "keys": [f"0x0a0000{host:02x}/0xffffffff+16"]
+            }) for host in hosts
+    ]
+
+
+def test_sync_tc(netns):
+    subprocess.run(
+            ["ip", "link", "add", "br0", "type", "bridge"], check=True
+    )
+
+    async def sync():
+        aipr = AIPRoute()
+        try:
+            index = await aipr.get_id("br0")
+            summaries = [
+                    await aipr.sync_tc(_tree(index)),
+                    await aipr.sync_tc(_tree(index)),
+                    await aipr.sync_tc(_tree(index, "8mbit", (1, 4))),
+            ]
+            snapshot = await aipr.get_tc_snapshot(index)
+
+            summaries.append(
+                    await aipr.sync_tc(
+                            [
+                                    ("add", "pfifo", index, {
+                                            "handle": "2:",
+                                            "parent": rtnl.TC_H_ROOT
+                                    })
+                            ]
+                    )
+            )
+            return summaries, snapshot, await aipr.get_tc_snapshot(index)
+
+        finally:
+            aipr.close()
+
+    summaries, changed, replaced = asyncio.run(sync())
+    counts = [
+            {k: len(v) if isinstance(v, list) else v for k, v in s.items()}
+            for s in summaries
+    ]
+
+    assert counts[0] == dict(
+            added=6, changed=0, deleted=0, unchanged=0, failed=0
+    )
+    # nothing is sent when the tree matches
+    assert counts[1] == dict(
+            added=0, changed=0, deleted=0, unchanged=6, failed=0
+    )
+    assert counts[2] == dict(
+            added=1, changed=1, deleted=2, unchanged=3, failed=0
+    )
+    assert summaries[2]["changed"][0][3]["rate"] == "8mbit"
+    assert sorted(
+            e["handle"] & 0xFFF for e in changed.filters if e["handle"]
+    ) == [0, 0x800, 0x801]
+
+    assert counts[3] == dict(
+            added=1, changed=0, deleted=1, unchanged=0, failed=0
+    )
+    assert [(e["kind"], e["handle"]) for e in replaced] == [
+            ("pfifo", 0x20000)
+    ]